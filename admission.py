@@ -0,0 +1,185 @@
+"""
+准入控制
+
+限制同时执行的转换请求数量。超出并发上限的请求进入有界等待队列，
+队列已满或等待超时时拒绝请求（由调用方返回429和 Retry-After）。
+可选按请求开销排序：队列按 "到达时间 + 开销 × 权重" 出队，开销小的请求
+（小图、预设、预览档位）优先，开销大的请求最多多等待与其开销成正比的时间，不会饿死。
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"请求未被准入: {reason}")
+        # 'queue_full' 或 'timeout'
+        self.reason = reason
+        # 建议的重试等待秒数
+        self.retry_after = retry_after
+
+
+class AdmissionConfig:
+    """准入控制配置"""
+
+    def __init__(self,
+                 max_concurrent=None,
+                 max_queue=64,
+                 queue_timeout=30.0,
+                 priority_weight=1.0):
+        """
+        初始化准入控制配置
+
+        Args:
+            max_concurrent: 同时执行的请求上限，默认CPU核数的2倍，0表示不限制
+            max_queue: 等待队列的最大长度
+            queue_timeout: 在队列中等待的最长秒数
+            priority_weight: 每MB开销推迟出队的秒数，0表示严格先到先服务
+        """
+        if max_concurrent is None:
+            max_concurrent = 2 * (os.cpu_count() or 1)
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.priority_weight = priority_weight
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取配置"""
+        max_concurrent = os.environ.get("PNG2SVG_MAX_CONCURRENT")
+        return cls(
+            max_concurrent=int(max_concurrent) if max_concurrent else None,
+            max_queue=int(os.environ.get("PNG2SVG_MAX_QUEUE", 64)),
+            queue_timeout=float(os.environ.get("PNG2SVG_QUEUE_TIMEOUT", 30)),
+            priority_weight=float(os.environ.get("PNG2SVG_PRIORITY_WEIGHT", 1.0)),
+        )
+
+
+class AdmissionController:
+    """基于asyncio的有界准入队列（只在事件循环线程中使用）"""
+
+    def __init__(self, config=None):
+        self.config = config or AdmissionConfig.from_env()
+        self._active = 0
+        self._waiters = []
+        self._sequence = itertools.count()
+        # 平均服务时间（指数移动平均），用于估算 Retry-After
+        self._service_time = None
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def enabled(self):
+        return self.config.max_concurrent > 0
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    def retry_after(self):
+        """按平均服务时间和排队长度估算重试等待秒数"""
+        service_time = self._service_time or 1.0
+        estimate = service_time * (self.queued + 1) / max(self.config.max_concurrent, 1)
+        return max(1, math.ceil(estimate))
+
+    def _admit(self, waited):
+        self.admitted += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return waited
+
+    def _discard(self, entry):
+        try:
+            self._waiters.remove(entry)
+        except ValueError:
+            return
+        heapq.heapify(self._waiters)
+
+    async def acquire(self, cost=0.0):
+        """
+        等待执行名额
+
+        Args:
+            cost: 请求开销（MB），决定排队优先级
+
+        Returns:
+            在队列中等待的秒数
+
+        Raises:
+            AdmissionRejected: 队列已满或等待超时
+        """
+        if not self.enabled:
+            return 0.0
+        if self._active < self.config.max_concurrent and not self._waiters:
+            self._active += 1
+            return self._admit(0.0)
+        if len(self._waiters) >= self.config.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected('queue_full', self.retry_after())
+
+        start = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = [start + cost * self.config.priority_weight, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        try:
+            await asyncio.wait_for(future, self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(entry)
+            self.rejected_timeout += 1
+            raise AdmissionRejected('timeout', self.retry_after()) from None
+        except BaseException:
+            # 客户端断开等原因被取消：已分到名额则归还
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._discard(entry)
+            raise
+        # 名额由 release() 直接转交，_active 不变
+        return self._admit(time.monotonic() - start)
+
+    def release(self, service_time=None):
+        """归还名额，优先转交给队列中优先级最高的请求"""
+        if not self.enabled:
+            return
+        if service_time is not None:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time = 0.8 * self._service_time + 0.2 * service_time
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self):
+        """返回准入统计信息"""
+        return {
+            'max_concurrent': self.config.max_concurrent,
+            'max_queue': self.config.max_queue,
+            'queue_timeout': self.config.queue_timeout,
+            'active': self._active,
+            'queued': self.queued,
+            'admitted': self.admitted,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_timeout': self.rejected_timeout,
+            'avg_wait_seconds': self._wait_total / self.admitted if self.admitted else 0.0,
+            'max_wait_seconds': self._wait_max,
+            'avg_service_seconds': self._service_time or 0.0,
+        }
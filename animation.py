@@ -0,0 +1,156 @@
+"""
+多帧（动画）输入的增量追踪
+
+相邻帧通常只有一小块区域变化。每帧先计算与上一帧差异的包围盒：
+没有变化的帧直接复用上一帧的结果；变化区域较小时，只对该区域加上边缘余量
+（与分块处理相同的 HALO）重新做预处理、阈值和形态学操作，写回上一帧的二值掩码，
+再整幅填充孔洞（与完整追踪相同，变化区域可能改变边界背景的连通性）并查找轮廓，
+包围盒不接触填充后掩码变化像素的轮廓复用上一帧的面积和简化结果。
+变化区域过大的帧作为关键帧完整追踪。从一个关键帧开始的连续帧构成一条依赖链，
+不同的链之间没有依赖，可以并行处理。
+"""
+
+import cv2
+import numpy as np
+
+from tiling import HALO, _with_halo
+
+# 变化区域超过帧面积的该比例时作为关键帧完整追踪
+KEYFRAME_RATIO = 0.5
+# GIF 未指定或为0的帧时长按此值处理（毫秒），与常见浏览器一致
+DEFAULT_FRAME_DURATION = 100
+
+
+def changed_region(previous, current):
+    """
+    两帧之间变化像素的包围盒
+
+    Returns:
+        (x0, y0, x1, y1)，不包含右下边界；没有变化时返回 None
+    """
+    diff = cv2.absdiff(previous, current)
+    if diff.ndim == 3:
+        diff = diff.max(axis=2)
+    points = cv2.findNonZero(diff)
+    if points is None:
+        return None
+    x, y, w, h = cv2.boundingRect(points)
+    return x, y, x + w, y + h
+
+
+def plan_chains(frames, delta_allowed=True, keyframe_ratio=KEYFRAME_RATIO):
+    """
+    把帧序列划分为依赖链
+
+    Args:
+        frames: 处理分辨率下的帧数组列表
+        delta_allowed: 是否允许增量更新（不允许时每帧都是关键帧）
+        keyframe_ratio: 变化面积比例超过该值时作为关键帧
+
+    Returns:
+        链的列表，每条链是 (帧序号, 变化区域) 的列表；链的第一帧变化区域为 'key'
+    """
+    chains = []
+    for index, frame in enumerate(frames):
+        if index == 0 or not delta_allowed:
+            chains.append([(index, 'key')])
+            continue
+        region = changed_region(frames[index - 1], frame)
+        if region is not None:
+            x0, y0, x1, y1 = region
+            height, width = frame.shape[:2]
+            if (x1 - x0) * (y1 - y0) > keyframe_ratio * width * height:
+                chains.append([(index, 'key')])
+                continue
+        chains[-1].append((index, region))
+    return chains
+
+
+def _intersects(box, region):
+    """轮廓包围盒 (x, y, w, h) 是否接触区域 (x0, y0, x1, y1)（含相邻一圈像素）"""
+    x, y, w, h = box
+    x0, y0, x1, y1 = region
+    return x <= x1 and y <= y1 and x + w >= x0 and y + h >= y0
+
+
+def _find_external(mask):
+    result = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return result[1] if len(result) == 3 else result[0]
+
+
+class DeltaTracer:
+    """单色模式下沿一条依赖链增量追踪，保存上一帧的二值掩码（填充前后）和轮廓信息"""
+
+    def __init__(self, converter, min_area):
+        self.converter = converter
+        self.min_area = min_area
+        # 未填充孔洞的掩码（变化区域写回这里）和填充后的掩码（查找轮廓）
+        self.mask = None
+        self.filled = None
+        # (包围盒, 起点) -> [面积, 简化后的轮廓或None]
+        self._entries = {}
+        # 最近一帧的输出轮廓
+        self.contours = None
+        # 复用上一帧面积和简化结果的轮廓数量
+        self.reused = 0
+
+    def keyframe(self, gray):
+        """完整追踪一帧"""
+        # 流水线返回的是线程缓冲区池中的数组，需要复制保存
+        self.mask = self.converter.plan.run(gray, fill=False).copy()
+        self.filled = self.converter.fill_holes(self.mask)
+        self._entries = {}
+        return self._prepare(None)
+
+    def update(self, gray, region):
+        """只重新处理变化区域（加边缘余量）"""
+        if region is None:
+            return self.contours
+        height, width = gray.shape[:2]
+        x0, y0, x1, y1 = region
+        # core: 输出可能变化的像素；window: 计算 core 所需的输入范围
+        cy0, cy1, cx0, cx1 = _with_halo(y0, y1, x0, x1, height, width, HALO)
+        wy0, wy1, wx0, wx1 = _with_halo(cy0, cy1, cx0, cx1, height, width, HALO)
+        converter = self.converter
+        window = np.ascontiguousarray(gray[wy0:wy1, wx0:wx1])
+        binary = converter.apply_threshold(converter.preprocess_image(window))
+        # 孔洞填充依赖整幅连通性（接触边界的背景、(0,0)为前景），在写回后对整幅掩码执行
+        improved = converter.improve_morphology(binary, fill=False)
+        self.mask[cy0:cy1, cx0:cx1] = improved[cy0 - wy0:cy1 - wy0, cx0 - wx0:cx1 - wx0]
+        filled = converter.fill_holes(self.mask)
+        # 填充结果的变化可能超出重新处理的区域，按实际变化的像素判断轮廓能否复用
+        dirty = changed_region(self.filled, filled)
+        self.filled = filled
+        if dirty is None:
+            return self.contours
+        return self._prepare(dirty)
+
+    def _prepare(self, dirty):
+        """与 prepare_contours 相同的排序、过滤和简化，未变化的轮廓复用上一帧的结果"""
+        entries = {}
+        items = []
+        for contour in _find_external(self.filled):
+            box = cv2.boundingRect(contour)
+            key = (box, tuple(contour[0, 0].tolist()))
+            entry = None
+            if dirty is not None and not _intersects(box, dirty):
+                entry = self._entries.get(key)
+            if entry is None:
+                entry = [cv2.contourArea(contour), None]
+            else:
+                self.reused += 1
+            entries[key] = entry
+            items.append((contour, entry))
+        self._entries = entries
+
+        items.sort(key=lambda item: item[1][0])
+        contours = []
+        for contour, entry in items:
+            if entry[0] < self.min_area:
+                continue
+            if entry[1] is None:
+                entry[1] = self.converter.simplify_contour(contour)
+            contours.append(entry[1])
+        self.contours = contours
+        return contours
+
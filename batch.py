@@ -0,0 +1,219 @@
+"""
+批量转换辅助工具
+
+解析批量请求（多个文件或单个ZIP包，共享配置或逐文件配置），
+并把逐个完成的转换结果以流式ZIP或multipart形式输出。
+文件数量、ZIP中单个文件和解压总大小受 BatchLimits 限制，在解压之前按ZIP目录中的大小检查。
+"""
+
+import io
+import json
+import os
+import posixpath
+import re
+import uuid
+import zipfile
+
+SUPPORTED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+MB = 1024 * 1024
+
+
+class BatchTooLarge(ValueError):
+    """批量请求超出文件数量或大小限制"""
+
+
+class BatchLimits:
+    """批量请求的限制"""
+
+    def __init__(self, max_items=256, max_file_mb=64, max_total_mb=512, concurrency=None):
+        """
+        初始化批量请求限制
+
+        Args:
+            max_items: 每个请求最多转换的文件数
+            max_file_mb: ZIP中单个文件解压后的最大大小
+            max_total_mb: ZIP中所有图片解压后的总大小上限
+            concurrency: 每个请求同时转换的文件数，None表示与工作者数量相同
+        """
+        self.max_items = max_items
+        self.max_file_bytes = int(max_file_mb * MB)
+        self.max_total_bytes = int(max_total_mb * MB)
+        self.concurrency = concurrency
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取配置"""
+        concurrency = os.environ.get("PNG2SVG_BATCH_CONCURRENCY")
+        return cls(
+            max_items=int(os.environ.get("PNG2SVG_BATCH_MAX_ITEMS", 256)),
+            max_file_mb=float(os.environ.get("PNG2SVG_BATCH_MAX_FILE_MB", 64)),
+            max_total_mb=float(os.environ.get("PNG2SVG_BATCH_MAX_TOTAL_MB", 512)),
+            concurrency=int(concurrency) if concurrency else None,
+        )
+
+    def check_count(self, count):
+        if count > self.max_items:
+            raise BatchTooLarge(f"文件数量({count})超过上限 {self.max_items}")
+
+
+def is_supported(filename):
+    """检查文件扩展名是否受支持"""
+    return bool(filename) and filename.lower().endswith(SUPPORTED_EXTENSIONS)
+
+
+def is_zip(filename):
+    return bool(filename) and filename.lower().endswith('.zip')
+
+
+def extract_zip_images(data, limits=None):
+    """
+    从ZIP数据中提取受支持的图片，返回 [(文件名, 字节)]，跳过目录和隐藏文件
+
+    解压任何文件之前先按ZIP目录中记录的解压后大小检查文件数量、单个文件和总大小，
+    超出 limits 时抛出 BatchTooLarge（zipfile 读取时不会输出超过记录大小的数据）。
+    """
+    limits = limits or BatchLimits()
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        entries = []
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename
+            base = posixpath.basename(name)
+            if base.startswith('.') or name.startswith('__MACOSX/'):
+                continue
+            if not is_supported(base):
+                continue
+            if info.file_size > limits.max_file_bytes:
+                raise BatchTooLarge(f"ZIP中的文件 {name} 解压后超过 {limits.max_file_bytes // MB}MB")
+            entries.append(info)
+        limits.check_count(len(entries))
+        total = sum(info.file_size for info in entries)
+        if total > limits.max_total_bytes:
+            raise BatchTooLarge(f"ZIP中的图片解压后共 {total // MB}MB，超过 {limits.max_total_bytes // MB}MB")
+        return [(info.filename, archive.read(info)) for info in entries]
+
+
+def parse_batch_configs(names, config_json=None, configs_json=None):
+    """
+    计算每个文件使用的配置
+
+    Args:
+        names: 文件名列表
+        config_json: 所有文件共享的配置（JSON对象）
+        configs_json: 逐文件配置，JSON数组（与文件顺序一致）或以文件名为键的JSON对象，
+                      会覆盖共享配置中的同名字段
+
+    Returns:
+        与 names 等长的配置字典列表
+    """
+    shared = json.loads(config_json) if config_json else {}
+    if not isinstance(shared, dict):
+        raise ValueError("config 必须是JSON对象")
+
+    per_file = json.loads(configs_json) if configs_json else None
+    if per_file is None:
+        overrides = [{} for _ in names]
+    elif isinstance(per_file, list):
+        if len(per_file) != len(names):
+            raise ValueError(f"configs 数量({len(per_file)})与文件数量({len(names)})不一致")
+        overrides = [item or {} for item in per_file]
+    elif isinstance(per_file, dict):
+        overrides = [per_file.get(name) or per_file.get(posixpath.basename(name)) or {}
+                     for name in names]
+    else:
+        raise ValueError("configs 必须是JSON数组或对象")
+
+    return [{**shared, **override} for override in overrides]
+
+
+def safe_basename(name):
+    """
+    去掉客户端提供的文件名中的目录部分（包括 ..、绝对路径和盘符），
+    避免输出的ZIP在解压时写到目标目录之外
+    """
+    base = posixpath.basename(re.sub(r'^[A-Za-z]:', '', name.replace('\\', '/')))
+    return base if base not in ('', '.', '..') else 'file'
+
+
+def output_names(names, suffix='.svg', keep_dirs=False):
+    """
+    根据输入文件名生成不重复的输出文件名
+
+    默认只保留文件名（见 safe_basename）；keep_dirs 为True时保留相对路径，
+    只用于本地生成、不含 .. 的名称（如命令行工具遍历目录得到的相对路径）。
+    """
+    used = set()
+    result = []
+    for name in names:
+        if not keep_dirs:
+            name = safe_basename(name)
+        stem = name.rsplit('.', 1)[0]
+        candidate = f"{stem}{suffix}"
+        index = 1
+        while candidate in used:
+            candidate = f"{stem}_{index}{suffix}"
+            index += 1
+        used.add(candidate)
+        result.append(candidate)
+    return result
+
+
+class _ChunkBuffer:
+    """只支持写入的缓冲区，供zipfile以不可寻址流的方式写入"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class ZipStreamWriter:
+    """逐个写入文件并立即取出已生成的ZIP字节"""
+
+    media_type = 'application/zip'
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED):
+        self._buffer = _ChunkBuffer()
+        self._zip = zipfile.ZipFile(self._buffer, mode='w', compression=compression)
+
+    def add(self, name, data, content_type=None):
+        """添加一个文件，返回新生成的字节"""
+        self._zip.writestr(name, data)
+        return self._buffer.drain()
+
+    def close(self):
+        """写入中央目录，返回剩余字节"""
+        self._zip.close()
+        return self._buffer.drain()
+
+
+class MultipartStreamWriter:
+    """生成 multipart/mixed 响应体，每个结果一个部分"""
+
+    def __init__(self, boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.media_type = f"multipart/mixed; boundary={self.boundary}"
+
+    def add(self, name, data, content_type='image/svg+xml'):
+        header = (
+            f"--{self.boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f'Content-Disposition: attachment; filename="{name}"\r\n'
+            f"Content-Length: {len(data)}\r\n\r\n"
+        )
+        return header.encode('utf-8') + data + b"\r\n"
+
+    def close(self):
+        return f"--{self.boundary}--\r\n".encode('utf-8')
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+转换流水线基准测试
+
+使用固定随机种子生成的合成图像集（线稿、文字、照片、噪声扫描件，64px 到 8k），
+分别统计解码、预处理、阈值、形态学、轮廓查找、轮廓简化和SVG生成各阶段的耗时，
+并记录峰值内存。结果可保存为基线JSON，之后的运行与基线比较并按阈值判定性能回退。
+--thread-splits 模式在进程池中并发转换图像集，比较不同的 工作者数×算子线程数 拆分下的
+吞吐量和延迟分位数。
+--startup 模式在新的解释器进程中测量冷启动：导入转换器和服务模块、命令行 --help 的耗时，
+以及首次和第二次转换的延迟（首次转换包含库的惰性初始化，即预热要消除的开销）。
+
+用法:
+    python benchmark.py --quick                         # 只跑小尺寸
+    python benchmark.py --save-baseline bench.json      # 保存基线
+    python benchmark.py --baseline bench.json           # 与基线比较，回退时返回非零退出码
+    python benchmark.py --quality preview --check-latency  # 检查质量档位耗时目标
+    python benchmark.py --thread-splits 8x1 4x2 2x4 --sizes 1024  # 比较核数拆分
+    python benchmark.py --startup                       # 冷启动耗时
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from converter import ImageToSVGConverter, QUALITY_TIERS
+from executor import ConversionExecutor, ExecutorConfig
+from threads import available_cores
+
+CORPUS_KINDS = ('line_art', 'text', 'photo', 'noisy_scan')
+DEFAULT_SIZES = (64, 256, 1024, 4096, 8192)
+QUICK_SIZES = (64, 256, 1024)
+STAGES = ('decode', 'preprocess', 'threshold', 'morphology', 'contours', 'simplify', 'svg')
+# 质量档位耗时目标对应的输入尺寸
+LATENCY_REFERENCE_SIZE = 2048
+
+
+# ----------------------------------------------------------------------
+# 合成图像集
+# ----------------------------------------------------------------------
+def _line_art(rng, size):
+    image = np.full((size, size, 3), 255, np.uint8)
+    thickness = max(1, size // 128)
+    for _ in range(max(4, size // 16)):
+        kind = rng.integers(0, 3)
+        p1 = tuple(int(v) for v in rng.integers(0, size, 2))
+        p2 = tuple(int(v) for v in rng.integers(0, size, 2))
+        if kind == 0:
+            cv2.line(image, p1, p2, (0, 0, 0), thickness, cv2.LINE_AA)
+        elif kind == 1:
+            radius = int(rng.integers(size // 64 + 1, size // 6 + 2))
+            cv2.circle(image, p1, radius, (0, 0, 0), thickness, cv2.LINE_AA)
+        else:
+            cv2.rectangle(image, p1, p2, (0, 0, 0), -1)
+    return image
+
+
+def _text(rng, size):
+    image = np.full((size, size, 3), 255, np.uint8)
+    scale = max(size / 512.0, 0.25)
+    line_height = max(int(30 * scale), 8)
+    letters = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"))
+    chars_per_line = max(size // max(int(18 * scale), 4), 1)
+    for y in range(line_height, size, line_height):
+        text = ''.join(rng.choice(letters, chars_per_line))
+        cv2.putText(image, text, (2, y), cv2.FONT_HERSHEY_SIMPLEX, scale, (0, 0, 0),
+                    max(1, int(2 * scale)), cv2.LINE_AA)
+    return image
+
+
+def _photo(rng, size):
+    # 低频随机场放大后叠加少量高频噪声，模拟照片的平滑渐变和纹理
+    low = rng.integers(0, 256, (8, 8, 3)).astype(np.uint8)
+    image = cv2.resize(low, (size, size), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 8, (size, size, 3))
+    return np.clip(image + noise, 0, 255).astype(np.uint8)
+
+
+def _noisy_scan(rng, size):
+    image = _text(rng, size).astype(np.float32)
+    # 不均匀光照和扫描噪声
+    gradient = np.linspace(0.75, 1.0, size, dtype=np.float32)[None, :, None]
+    image *= gradient
+    image += rng.normal(0, 18, image.shape).astype(np.float32)
+    return np.clip(image, 0, 255).astype(np.uint8)
+
+
+_GENERATORS = {
+    'line_art': _line_art,
+    'text': _text,
+    'photo': _photo,
+    'noisy_scan': _noisy_scan,
+}
+
+
+def make_image(kind, size, seed=0):
+    """生成确定性的合成BGR图像"""
+    rng = np.random.default_rng([seed, CORPUS_KINDS.index(kind), size])
+    return _GENERATORS[kind](rng, size)
+
+
+def encode_image(kind, image):
+    """照片编码为JPEG，其余编码为PNG"""
+    ext = '.jpg' if kind == 'photo' else '.png'
+    params = [cv2.IMWRITE_JPEG_QUALITY, 90] if ext == '.jpg' else [cv2.IMWRITE_PNG_COMPRESSION, 3]
+    ok, encoded = cv2.imencode(ext, image, params)
+    if not ok:
+        raise RuntimeError(f"无法编码测试图像: {kind}")
+    return encoded.tobytes()
+
+
+def make_corpus(sizes, kinds=CORPUS_KINDS, seed=0):
+    """生成测试图像集，返回 [(用例名, 图像字节)]"""
+    return [
+        (f"{kind}_{size}", encode_image(kind, make_image(kind, size, seed)))
+        for size in sizes
+        for kind in kinds
+    ]
+
+
+# ----------------------------------------------------------------------
+# 计时
+# ----------------------------------------------------------------------
+def run_once(image_data, config):
+    """执行一次完整转换，返回各阶段耗时（秒）和SVG长度"""
+    converter = ImageToSVGConverter(**config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trace = converter.trace(image_data)
+        start = time.perf_counter()
+        svg_length = sum(len(chunk) for chunk in converter.iter_svg(trace))
+        svg_time = time.perf_counter() - start
+    timings = dict(trace.stage_timings)
+    timings['svg'] = svg_time
+    timings['total'] = sum(timings.values())
+    return timings, svg_length
+
+
+def measure_peak_memory(image_data, config):
+    """用tracemalloc测量一次转换的峰值内存（字节）"""
+    tracemalloc.start()
+    try:
+        run_once(image_data, config)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_case(image_data, config, repeats):
+    """重复执行并取各阶段耗时的中位数"""
+    # 预热一次，排除首次调用的初始化开销
+    run_once(image_data, config)
+    samples = []
+    svg_length = 0
+    for _ in range(repeats):
+        timings, svg_length = run_once(image_data, config)
+        samples.append(timings)
+    stages = sorted({name for sample in samples for name in sample})
+    median_ms = {
+        name: statistics.median(sample.get(name, 0.0) for sample in samples) * 1000
+        for name in stages
+    }
+    return {
+        'stages_ms': median_ms,
+        'peak_memory_mb': measure_peak_memory(image_data, config) / (1024 * 1024),
+        'svg_chars': svg_length,
+        'input_bytes': len(image_data),
+    }
+
+
+def repeats_for(size, base_repeats):
+    """大图重复次数减少，保证总耗时可控"""
+    if size >= 4096:
+        return 1
+    if size >= 1024:
+        return max(1, base_repeats // 2)
+    return base_repeats
+
+
+def run_suite(sizes, kinds, config, repeats, seed=0):
+    results = {}
+    for name, image_data in make_corpus(sizes, kinds, seed):
+        size = int(name.rsplit('_', 1)[1])
+        results[name] = bench_case(image_data, config, repeats_for(size, repeats))
+        stages = results[name]['stages_ms']
+        print(f"  {name:<18} total {stages['total']:9.2f}ms  "
+              f"peak {results[name]['peak_memory_mb']:8.1f}MB  "
+              + "  ".join(f"{stage}={stages.get(stage, 0.0):.2f}" for stage in STAGES))
+    return results
+
+
+# ----------------------------------------------------------------------
+# 核数拆分
+# ----------------------------------------------------------------------
+def parse_split(text):
+    """解析 '工作者数x算子线程数'（如 '4x2'）"""
+    try:
+        workers, threads = (int(part) for part in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"拆分格式应为 工作者数x算子线程数: {text}")
+    if workers < 1 or threads < 1:
+        raise argparse.ArgumentTypeError(f"工作者数和算子线程数至少为1: {text}")
+    return workers, threads
+
+
+def _convert_quietly(image_data, config):
+    """在工作进程中完成一次转换（含解码），返回SVG长度"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return len(ImageToSVGConverter(**config).convert(image_data))
+
+
+async def _drive(executor, images, config, requests, concurrency):
+    """concurrency 个客户端循环提交请求，返回各请求延迟（秒）和总耗时"""
+    latencies = []
+    next_index = 0
+
+    async def client():
+        nonlocal next_index
+        while next_index < requests:
+            image_data = images[next_index % len(images)]
+            next_index += 1
+            start = time.perf_counter()
+            await executor.call(_convert_quietly, image_data, config)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+
+def bench_thread_split(images, config, workers, threads, requests, concurrency=None):
+    """
+    在 workers 个工作进程（每个 threads 个算子线程）中转换 requests 个图像
+
+    并发客户端数默认为工作者数的两倍，使工作者始终有排队的请求。
+    """
+    executor = ConversionExecutor(ExecutorConfig(mode='process', max_workers=workers,
+                                                 intra_op_threads=threads, warmup=True))
+    executor.start()
+    try:
+        latencies, elapsed = asyncio.run(
+            _drive(executor, images, config, requests, concurrency or 2 * workers))
+    finally:
+        executor.shutdown()
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'workers': workers,
+        'intra_op_threads': threads,
+        'requests': requests,
+        'throughput_rps': requests / elapsed,
+        'latency_ms': {
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p95': float(np.percentile(latencies_ms, 95)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'max': float(latencies_ms.max()),
+        },
+    }
+
+
+def run_thread_splits(splits, sizes, kinds, config, requests, concurrency=None, seed=0):
+    images = [image_data for _, image_data in make_corpus(sizes, kinds, seed)]
+    cores = available_cores()
+    results = []
+    for workers, threads in splits:
+        result = bench_thread_split(images, config, workers, threads, requests, concurrency)
+        results.append(result)
+        latency = result['latency_ms']
+        note = "  (超出可用核数)" if workers * threads > cores else ""
+        print(f"  {workers:>3} 工作者 × {threads:<3} 线程  {result['throughput_rps']:8.2f} 次/秒  "
+              f"p50 {latency['p50']:8.2f}ms  p95 {latency['p95']:8.2f}ms  "
+              f"p99 {latency['p99']:8.2f}ms{note}")
+    return results
+
+
+# ----------------------------------------------------------------------
+# 冷启动
+# ----------------------------------------------------------------------
+# 在新进程中测量的启动用例: 名称 -> 解释器参数
+STARTUP_CASES = {
+    'interpreter': ['-c', 'pass'],
+    'import_converter': ['-c', 'import converter'],
+    'import_main': ['-c', 'import main'],
+    'cli_help': ['cli.py', '--help'],
+}
+
+# 在新进程中依次转换同一张小图两次，输出两次的耗时（秒）
+CONVERSION_SCRIPT = """
+import contextlib, io, json, time
+from benchmark import encode_image, make_image
+from converter import ImageToSVGConverter
+png = encode_image('line_art', make_image('line_art', 64))
+timings = []
+for _ in range(2):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        ImageToSVGConverter().convert(png)
+    timings.append(time.perf_counter() - start)
+print(json.dumps(timings))
+"""
+
+
+def _run_fresh(args):
+    """在项目目录下启动新的解释器进程，返回 (墙钟耗时, 标准输出)"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, *args], cwd=Path(__file__).resolve().parent,
+                               capture_output=True, text=True, check=True)
+    return time.perf_counter() - start, completed.stdout
+
+
+def run_startup(repeats):
+    """各启动用例和首次/第二次转换延迟的中位数（毫秒）"""
+    results = {}
+    for name, args in STARTUP_CASES.items():
+        results[name] = statistics.median(_run_fresh(args)[0] for _ in range(repeats)) * 1000
+        print(f"  {name:<20} {results[name]:8.1f}ms")
+    conversions = [json.loads(_run_fresh(['-c', CONVERSION_SCRIPT])[1]) for _ in range(repeats)]
+    for index, name in enumerate(('first_conversion', 'second_conversion')):
+        results[name] = statistics.median(timings[index] for timings in conversions) * 1000
+        print(f"  {name:<20} {results[name]:8.1f}ms")
+    return results
+
+
+# ----------------------------------------------------------------------
+# 基线比较
+# ----------------------------------------------------------------------
+def compare_with_baseline(results, baseline, threshold, min_delta_ms, memory_threshold):
+    """返回回退列表 [(用例, 指标, 基线值, 当前值)]"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        for stage, value in current['stages_ms'].items():
+            old = base['stages_ms'].get(stage)
+            if old is None:
+                continue
+            if value - old > min_delta_ms and value > old * (1 + threshold):
+                regressions.append((name, stage, old, value))
+        old_mem = base.get('peak_memory_mb')
+        new_mem = current['peak_memory_mb']
+        if old_mem and new_mem > old_mem * (1 + memory_threshold) and new_mem - old_mem > 1:
+            regressions.append((name, 'peak_memory_mb', old_mem, new_mem))
+    return regressions
+
+
+def check_latency_targets(results, quality):
+    """
+    检查参考尺寸用例除解码外的处理耗时是否满足质量档位的目标
+
+    Returns:
+        超出目标的用例列表 [(用例, 目标毫秒, 实际毫秒)]
+    """
+    target = QUALITY_TIERS[quality]['latency_target_ms']
+    failures = []
+    for name, case in results.items():
+        if int(name.rsplit('_', 1)[1]) != LATENCY_REFERENCE_SIZE:
+            continue
+        stages = case['stages_ms']
+        processing = stages['total'] - stages.get('decode', 0.0)
+        if processing > target:
+            failures.append((name, target, processing))
+    return failures
+
+
+def environment_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'cores': available_cores(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="图片转SVG流水线基准测试")
+    parser.add_argument('--sizes', type=int, nargs='+', help="图像边长列表")
+    parser.add_argument('--quick', action='store_true', help=f"只测试 {QUICK_SIZES}")
+    parser.add_argument('--kinds', nargs='+', choices=CORPUS_KINDS, default=list(CORPUS_KINDS))
+    parser.add_argument('--repeats', type=int, default=5, help="每个用例重复次数（取中位数）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', default='{}', help="转换配置（JSON对象）")
+    parser.add_argument('--quality', choices=tuple(QUALITY_TIERS), help="质量档位（覆盖 --config 中的设置）")
+    parser.add_argument('--check-latency', action='store_true',
+                        help=f"检查 {LATENCY_REFERENCE_SIZE}px 用例是否满足质量档位的耗时目标")
+    parser.add_argument('--output', help="结果输出JSON路径")
+    parser.add_argument('--save-baseline', help="把本次结果保存为基线")
+    parser.add_argument('--baseline', help="与该基线JSON比较")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="耗时回退阈值（相对基线的比例，默认0.25）")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0,
+                        help="小于该绝对差值（毫秒）的耗时变化不视为回退")
+    parser.add_argument('--memory-threshold', type=float, default=0.10,
+                        help="峰值内存回退阈值（相对基线的比例）")
+    parser.add_argument('--thread-splits', type=parse_split, nargs='+', metavar='WxT',
+                        help="比较核数拆分（工作者数x算子线程数）的吞吐量和延迟，代替分阶段测试")
+    parser.add_argument('--requests', type=int, default=32, help="每种拆分转换的图像数")
+    parser.add_argument('--concurrency', type=int, help="并发客户端数（默认为工作者数的两倍）")
+    parser.add_argument('--startup', action='store_true',
+                        help="在新进程中测量导入、--help 和首次转换的冷启动耗时，代替分阶段测试")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = json.loads(args.config)
+    if args.quality:
+        config['quality'] = args.quality
+    if args.sizes:
+        sizes = args.sizes
+    elif args.check_latency:
+        sizes = (LATENCY_REFERENCE_SIZE,)
+    elif args.thread_splits:
+        sizes = (1024,)
+    else:
+        sizes = QUICK_SIZES if args.quick else DEFAULT_SIZES
+
+    if args.startup:
+        print(f"🚀 冷启动: 每个用例 {args.repeats} 个新进程（取中位数）")
+        report = {
+            'environment': environment_info(),
+            'startup': run_startup(args.repeats),
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"💾 结果已保存: {args.output}")
+        return 0
+
+    if args.thread_splits:
+        print(f"🧵 核数拆分: {available_cores()} 个可用核, 尺寸 {list(sizes)}, "
+              f"类型 {args.kinds}, 每种拆分 {args.requests} 次转换")
+        report = {
+            'environment': environment_info(),
+            'config': config,
+            'seed': args.seed,
+            'thread_splits': run_thread_splits(args.thread_splits, sizes, args.kinds, config,
+                                               args.requests, args.concurrency, args.seed),
+        }
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"💾 结果已保存: {args.output}")
+        return 0
+
+    print(f"🏁 基准测试: 尺寸 {list(sizes)}, 类型 {args.kinds}, 配置 {config}")
+    results = run_suite(sizes, args.kinds, config, args.repeats, args.seed)
+    report = {
+        'environment': environment_info(),
+        'config': config,
+        'seed': args.seed,
+        'results': results,
+    }
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存: {path}")
+
+    status = 0
+    if args.check_latency:
+        quality = str(config.get('quality', 'standard')).lower()
+        failures = check_latency_targets(results, quality)
+        target = QUALITY_TIERS[quality]['latency_target_ms']
+        if failures:
+            print(f"\n❌ {len(failures)} 个用例超出 {quality} 档位耗时目标 {target}ms（不含解码）:")
+            for name, _, actual in failures:
+                print(f"  {name}: {actual:.2f}ms")
+            status = 1
+        else:
+            print(f"\n✅ 满足 {quality} 档位耗时目标 {target}ms（不含解码）")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(results, baseline, args.threshold,
+                                            args.min_delta_ms, args.memory_threshold)
+        if regressions:
+            print(f"\n❌ 发现 {len(regressions)} 项性能回退:")
+            for name, metric, old, new in regressions:
+                print(f"  {name} {metric}: {old:.2f} -> {new:.2f} ({(new / old - 1) * 100:+.1f}%)")
+            return 1
+        print("\n✅ 与基线相比没有性能回退")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+输出大小预算
+
+固定的简化容差（轮廓周长的2%）下输出大小随图像内容变化很大。设置 max_bytes / max_points
+预算后，在已简化的轮廓上按一组逐档增大的容差（相对各轮廓周长）再做 Douglas-Peucker 简化，
+二分查找满足预算的最小一档，再把上一档中节省最多的轮廓逐个换成这一档的结果，
+使各轮廓的容差尽量小；最大一档仍超出预算时从面积最小的轮廓开始丢弃。外轮廓简化到
+不足3个点时保留为三角形，轮廓只会因预算被丢弃，不会因简化而消失。
+
+各环的周长只计算一次，每一档的简化结果和字节数、点数按需计算并缓存，二分查找只需计算
+少数几档，逐轮廓调整和丢弃轮廓只使用缓存的结果。
+
+曲线拟合模式下由调用方提供简化函数，各档按相应的容差重新拟合曲线。
+"""
+
+import cv2
+import numpy as np
+
+# 搜索的容差档位（相对轮廓周长），相邻两档相差 √2 倍。最大一档为 0.16（约 1/2π），
+# 再大时圆形等凸形状会被简化为两个点而整个消失，超出预算的部分改为按面积丢弃轮廓
+EPSILON_LEVELS = tuple(0.0025 * 2 ** (k / 2) for k in range(13))
+
+
+def _triangle(ring):
+    """退化的外轮廓保留三个点：起点、离起点最远的点和离两点连线最远的点（按原顺序）"""
+    points = ring.reshape(-1, 2).astype(np.int64)
+    far = int(np.argmax(((points - points[0]) ** 2).sum(axis=1)))
+    direction = points[far] - points[0]
+    offsets = np.abs(direction[0] * (points[:, 1] - points[0, 1])
+                     - direction[1] * (points[:, 0] - points[0, 0]))
+    apex = int(np.argmax(offsets))
+    if not offsets[apex]:
+        # 所有点共线
+        return None
+    return ring[sorted((0, far, apex))]
+
+
+def _approx_rings(rings, tolerances):
+    """默认的简化函数：按绝对容差对每个环做 Douglas-Peucker 简化"""
+    return [cv2.approxPolyDP(ring, tolerance, True) for ring, tolerance in zip(rings, tolerances)]
+
+
+class BudgetSearch:
+    """
+    在一组轮廓上搜索满足预算的简化容差
+
+    轮廓以环的序列表示（第一个环为外轮廓，其余为孔洞），measure(轮廓列表) 返回输出各轮廓的
+    [字节数, 点数] 数组。第0档是输入的轮廓本身，之后各档是大于 base_epsilon 的容差档位。
+    simplify(环列表, 绝对容差数组) 返回简化后的环列表，默认为 Douglas-Peucker 简化。
+    """
+
+    def __init__(self, rings, measure, base_epsilon=0.0, simplify=None):
+        self.rings = rings
+        self.measure = measure
+        self.simplify = simplify or _approx_rings
+        self.epsilons = [base_epsilon] + [e for e in EPSILON_LEVELS if e > base_epsilon]
+        # 各环的周长，所有档位共用
+        self.lengths = np.array([cv2.arcLength(ring, True) for contour in rings for ring in contour])
+        self._levels = {}
+
+    def level(self, k):
+        """第 k 档的 (简化后的环序列, 每个轮廓的 [字节数, 点数])"""
+        if k not in self._levels:
+            if k == 0:
+                simplified = self.rings
+            else:
+                flat = self.simplify([ring for contour in self.rings for ring in contour],
+                                     self.epsilons[k] * self.lengths)
+                simplified = []
+                start = 0
+                for contour in self.rings:
+                    simplified.append(self._assemble(contour, flat[start:start + len(contour)]))
+                    start += len(contour)
+            sizes = np.asarray(self.measure(simplified), np.int64).reshape(-1, 2)
+            self._levels[k] = (simplified, sizes)
+        return self._levels[k]
+
+    @staticmethod
+    def _assemble(contour, simplified):
+        """组合简化后的各环；不足3个点的孔洞丢弃，外轮廓退化时保留为三角形"""
+        rings = []
+        for ring, approx in zip(contour, simplified):
+            if len(approx) < 3 and not rings:
+                approx = _triangle(ring)
+                if approx is None:
+                    return ()
+            if len(approx) >= 3:
+                rings.append(approx)
+        return tuple(rings)
+
+    def fit(self, max_bytes=None, max_points=None, fixed_bytes=0, areas=None, empty_bytes=0):
+        """
+        搜索满足预算的简化结果
+
+        Args:
+            fixed_bytes: 路径元素以外的字节数（文档头、分组标签等）
+            empty_bytes: 所有轮廓都为空时额外输出的字节数（提示文字）
+            areas: 各轮廓的面积，最大一档仍超出预算时按面积从小到大丢弃轮廓
+
+        Returns:
+            (每个轮廓的环序列, 每个轮廓的 [字节数, 点数], 报告)
+        """
+        limits = np.array([np.inf if max_bytes is None else max_bytes,
+                           np.inf if max_points is None else max_points])
+        limits[0] -= fixed_bytes
+
+        def fits(sizes):
+            total = sizes.sum(axis=0)
+            if not total[0]:
+                total[0] = empty_bytes
+            return bool((total <= limits).all())
+
+        last = len(self.epsilons) - 1
+        if fits(self.level(0)[1]) or (limits < 0).any():
+            # 满足预算，或固定部分已超出预算（任何简化都无法满足）时保持原样
+            k = 0
+        elif not fits(self.level(last)[1]):
+            k = last
+        else:
+            # 二分查找满足预算的最小档位（lo 超出预算，hi 满足预算）
+            lo, hi = 0, last
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if fits(self.level(mid)[1]):
+                    hi = mid
+                else:
+                    lo = mid
+            k = hi
+
+        rings, sizes = self.level(k)
+        rings, sizes = list(rings), sizes.copy()
+        simplified = len(rings)
+        if 0 < k and fits(sizes):
+            # 从上一档出发，只把节省最多的轮廓换成这一档的结果
+            previous_rings, previous = self.level(k - 1)
+            excess = previous.sum(axis=0) - limits
+            savings = previous - sizes
+            # 按节省量占超出量的比例排序，只考虑超出的那一项（或两项）预算
+            weights = savings * np.where(excess > 0, 1 / np.maximum(excess, 1), 0)
+            order = np.argsort(-weights.sum(axis=1), kind='stable')
+            remaining = previous.sum(axis=0) - np.cumsum(savings[order], axis=0)
+            count = int(np.argmax((remaining <= limits).all(axis=1))) + 1
+            keep = order[count:]
+            for i in keep.tolist():
+                rings[i] = previous_rings[i]
+            sizes[keep] = previous[keep]
+            simplified = count
+
+        dropped = 0
+        if not fits(sizes) and areas is not None:
+            # 最大一档仍超出预算：丢弃面积最小的轮廓
+            order = np.argsort(np.asarray(areas), kind='stable')
+            remaining = sizes.sum(axis=0) - np.cumsum(sizes[order], axis=0)
+            remaining[remaining[:, 0] == 0, 0] = empty_bytes
+            fitting = (remaining <= limits).all(axis=1)
+            if fitting.any():
+                dropped = int(np.argmax(fitting)) + 1
+                for i in order[:dropped].tolist():
+                    rings[i] = ()
+                sizes[order[:dropped]] = 0
+            else:
+                # 丢弃轮廓也无法满足（提示文字本身超出预算），保持原样
+                k = simplified = 0
+                rings, sizes = self.level(0)
+                rings, sizes = list(rings), sizes.copy()
+
+        report = {
+            'epsilon': round(self.epsilons[k], 6),
+            'simplified_contours': simplified if k else 0,
+            'dropped_contours': dropped,
+            'levels_evaluated': len(self._levels),
+            'met': fits(sizes),
+        }
+        return rings, sizes, report
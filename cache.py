@@ -0,0 +1,307 @@
+"""
+转换结果缓存
+
+以输入字节的哈希加规范化后的转换配置作为键，缓存SVG结果。
+包含有界的内存LRU层和可选的磁盘层（按总大小淘汰），
+并发的相同请求会被合并，只执行一次转换。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+# 转换算法变化时递增，使旧的缓存结果失效
+CACHE_VERSION = 2
+
+
+def make_cache_key(image_data, config):
+    """根据输入字节和规范化配置计算缓存键"""
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_VERSION}\0".encode())
+    digest.update(json.dumps(config, sort_keys=True, separators=(',', ':')).encode())
+    digest.update(b"\0")
+    digest.update(image_data)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """两级（内存 + 磁盘）SVG结果缓存，支持并发请求合并"""
+
+    def __init__(self,
+                 max_entries=256,
+                 max_memory_bytes=64 * 1024 * 1024,
+                 disk_dir=None,
+                 max_disk_bytes=512 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 内存层最多保存的条目数
+            max_memory_bytes: 内存层最多占用的字节数
+            disk_dir: 磁盘层目录，None表示不启用磁盘层
+            max_disk_bytes: 磁盘层最多占用的字节数
+        """
+        self.max_entries = max_entries
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # 键 -> (值, UTF-8编码后的字节数)
+        self._memory_bytes = 0
+        self._disk_index = OrderedDict()
+        self._disk_bytes = 0
+        self._inflight = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取缓存配置"""
+        return cls(
+            max_entries=int(os.environ.get("PNG2SVG_CACHE_ENTRIES", 256)),
+            max_memory_bytes=int(os.environ.get("PNG2SVG_CACHE_MEMORY_MB", 64)) * 1024 * 1024,
+            disk_dir=os.environ.get("PNG2SVG_CACHE_DIR") or None,
+            max_disk_bytes=int(os.environ.get("PNG2SVG_CACHE_DISK_MB", 512)) * 1024 * 1024,
+        )
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 or self.disk_dir is not None
+
+    # ------------------------------------------------------------------
+    # 磁盘层
+    # ------------------------------------------------------------------
+    def _disk_path(self, key):
+        return self.disk_dir / key[:2] / f"{key}.svg"
+
+    def _load_disk_index(self):
+        """启动时扫描磁盘层，按修改时间重建LRU顺序"""
+        entries = []
+        for path in self.disk_dir.glob("*/*.svg"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        for _, key, size in entries:
+            self._disk_index[key] = size
+            self._disk_bytes += size
+        self._evict_disk()
+
+    def _disk_get(self, key):
+        if self.disk_dir is None:
+            return None
+        with self._lock:
+            if key not in self._disk_index:
+                return None
+            self._disk_index.move_to_end(key)
+        path = self._disk_path(key)
+        try:
+            value = path.read_text(encoding='utf-8')
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                size = self._disk_index.pop(key, 0)
+                self._disk_bytes -= size
+            return None
+        return value
+
+    def _disk_put(self, key, value):
+        if self.disk_dir is None:
+            return
+        data = value.encode('utf-8')
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._disk_path(key)
+        path.parent.mkdir(exist_ok=True)
+        # 先写临时文件再重命名，避免读到不完整的结果
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            self._disk_index[key] = len(data)
+            self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        victims = []
+        with self._lock:
+            while self._disk_bytes > self.max_disk_bytes and self._disk_index:
+                key, size = self._disk_index.popitem(last=False)
+                self._disk_bytes -= size
+                self.disk_evictions += 1
+                victims.append(key)
+        for key in victims:
+            try:
+                self._disk_path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    # ------------------------------------------------------------------
+    # 内存层
+    # ------------------------------------------------------------------
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            self._memory.move_to_end(key)
+            return entry[0]
+
+    def _memory_put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        # 按编码后的字节数计算占用，非ASCII内容的字符数小于实际字节数
+        size = len(value.encode('utf-8'))
+        if size > self.max_memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= old[1]
+            self._memory[key] = (value, size)
+            self._memory_bytes += size
+            while (len(self._memory) > self.max_entries
+                   or self._memory_bytes > self.max_memory_bytes):
+                _, (_, evicted_size) = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted_size
+                self.evictions += 1
+
+    # ------------------------------------------------------------------
+    # 公共接口
+    # ------------------------------------------------------------------
+    def get(self, key):
+        """查询缓存，未命中返回None"""
+        value = self._memory_get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        value = self._disk_get(key)
+        if value is not None:
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory_put(key, value)
+            return value
+        return None
+
+    def put(self, key, value):
+        """写入缓存"""
+        self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def _claim(self, key):
+        """登记进行中的计算，返回 (future, 是否由当前调用者负责计算)"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.misses += 1
+            return future, True
+
+    def _release(self, key, future, value=None, error=None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def get_or_compute(self, key, compute):
+        """同步版本：命中直接返回，否则调用 compute() 计算并缓存"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        future, leader = self._claim(key)
+        if not leader:
+            return future.result()
+        try:
+            value = compute()
+        except BaseException as e:
+            self._release(key, future, error=e)
+            raise
+        self.put(key, value)
+        self._release(key, future, value)
+        return value
+
+    async def aget(self, key):
+        """异步查询缓存，未命中返回None（不计入未命中次数）"""
+        value = self._memory_get(key)
+        if value is None and self.disk_dir is not None:
+            # 磁盘读取放到线程池中，避免阻塞事件循环
+            loop = asyncio.get_running_loop()
+            value = await loop.run_in_executor(None, self._disk_get, key)
+            if value is not None:
+                self.disk_hits += 1
+                self._memory_put(key, value)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    async def aput(self, key, value):
+        """异步写入缓存"""
+        self._memory_put(key, value)
+        if self.disk_dir is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._disk_put, key, value)
+
+    async def acoalesce(self, key, compute):
+        """合并并发的相同计算：只有第一个调用者执行 compute()，其余等待同一结果，结果不写入缓存"""
+        future, leader = self._claim(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            value = await compute()
+        except BaseException as e:
+            self._release(key, future, error=e)
+            raise
+        self._release(key, future, value)
+        return value
+
+    async def aget_or_compute(self, key, compute):
+        """异步版本：compute 为返回协程的无参函数"""
+        value = await self.aget(key)
+        if value is not None:
+            return value
+
+        async def compute_and_store():
+            result = await compute()
+            await self.aput(key, result)
+            return result
+
+        return await self.acoalesce(key, compute_and_store)
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "disk_evictions": self.disk_evictions,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+                "inflight": len(self._inflight),
+            }
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+批量转换命令行工具
+
+遍历目录或通配符匹配的图片，在工作进程池中用全部CPU核并行转换，输出到目标目录（保持相对路径）。
+转换按流水线进行：同时在处理中的文件数比工作者数多出预取数量，工作者转换当前图像时，
+后续文件已经在读取、计算哈希和解码（解码在线程中进行，像素通过共享内存交给工作进程），
+SVG在工作进程中生成并直接写入输出文件。
+清单文件记录每个输出对应的输入哈希和规范化配置，重新运行时跳过未变化的文件。
+结束时报告吞吐量和逐文件耗时的统计。
+
+用法:
+    python cli.py scans/ -o out/                          # 转换目录下的图片
+    python cli.py 'photos/**/*.jpg' -o out/ --quality high
+    python cli.py scans/ -o out/ -r --workers 8 --prefetch 16
+    python cli.py huge/ -o out/ --memory-map              # 超大扫描件：工作进程内存映射读取
+"""
+
+import argparse
+import asyncio
+import functools
+import glob
+import json
+import mmap
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from batch import is_supported, output_names
+from cache import make_cache_key
+from compression import OUTPUT_FORMATS, iter_compressed
+from executor import ConversionExecutor, ExecutorConfig
+from svg_writer import iter_encoded
+from threads import split_cores
+from tiers import QUALITY_TIERS
+
+MANIFEST_NAME = 'manifest.json'
+# 每完成多少个文件保存一次清单，中断后重新运行时已完成的文件不必重做
+MANIFEST_FLUSH_INTERVAL = 50
+
+
+def collect_inputs(patterns, recursive=False):
+    """
+    展开输入参数（文件、目录或通配符）
+
+    Returns:
+        [(输入路径, 相对名称)]，相对名称用于生成输出路径，按名称排序并去重
+    """
+    items = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            walk = path.rglob('*') if recursive else path.glob('*')
+            for child in walk:
+                if child.is_file() and is_supported(child.name):
+                    items.setdefault(child.resolve(), child.relative_to(path).as_posix())
+        elif any(char in pattern for char in '*?['):
+            for match in glob.glob(pattern, recursive=True):
+                match = Path(match)
+                if match.is_file() and is_supported(match.name):
+                    items.setdefault(match.resolve(), match.name)
+        elif path.is_file():
+            items.setdefault(path.resolve(), path.name)
+        else:
+            raise FileNotFoundError(f"输入不存在: {pattern}")
+    return sorted(items.items(), key=lambda item: (item[1], str(item[0])))
+
+
+def load_manifest(path):
+    """读取清单：{输出名称: {'input', 'key', 'bytes', 'seconds'}}"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_manifest(path, entries):
+    partial = Path(f"{path}.part")
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump({'files': entries}, f, ensure_ascii=False, indent=2, sort_keys=True)
+    partial.replace(path)
+
+
+def _hash_file(path, config):
+    """以内存映射方式计算输入文件的缓存键（输入哈希 + 规范化配置）"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return make_cache_key(b'', config)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return make_cache_key(mapped, config)
+
+
+def _write_output(chunks, output_path, output_format):
+    """分块写入SVG（或 .svgz），返回写入的字节数"""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    chunks = iter_encoded(chunks)
+    if output_format == 'svgz':
+        chunks = iter_compressed(chunks, 'gzip')
+    partial = output_path.with_name(output_path.name + '.part')
+    size = 0
+    with open(partial, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+    partial.replace(output_path)
+    return size
+
+
+class _Written:
+    """工作者写出SVG后返回的结果：写入的字节数和各阶段耗时"""
+
+    def __init__(self, size, stage_timings):
+        self.size = size
+        self.stage_timings = stage_timings
+
+
+def _write_trace(output_path, output_format, converter, trace):
+    """在工作者中由追踪结果生成SVG并写出（executor.trace_then 的 finish），返回 _Written"""
+    start = time.perf_counter()
+    size = _write_output(converter.iter_svg(trace), Path(output_path), output_format)
+    return _Written(size, {**trace.stage_timings, 'svg': time.perf_counter() - start})
+
+
+def _convert_path(input_path, output_path, output_format, config):
+    """在工作进程中用 convert_file（内存映射读取）转换一个文件，返回写入的字节数"""
+    from converter import convert_file
+
+    svg = convert_file(input_path, memory_map=True, **config)
+    return _write_output((svg,), Path(output_path), output_format)
+
+
+class BatchRunner:
+    """按流水线批量转换文件"""
+
+    def __init__(self, output_dir, config=None, workers=None, prefetch=None,
+                 output_format='svg', memory_map=False, force=False, manifest_path=None,
+                 intra_op_threads=None):
+        """
+        Args:
+            output_dir: 输出目录
+            config: 转换配置
+            workers: 工作进程数，默认为 核数 / 算子线程数
+            prefetch: 工作者之外同时读取和解码的文件数，默认与工作者数相同
+            output_format: 'svg' 或 'svgz'
+            memory_map: 在工作进程中内存映射读取和解码（不在主进程预先解码，适合超大扫描件）
+            force: 忽略清单，全部重新转换
+            manifest_path: 清单路径，默认输出目录下的 manifest.json
+            intra_op_threads: 每个工作进程的算子线程数（OpenCV、BLAS/OpenMP），默认为 核数 / 工作进程数
+        """
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的输出格式: {output_format}，可选 {OUTPUT_FORMATS}")
+        from converter import ImageToSVGConverter
+
+        self.output_dir = Path(output_dir)
+        self.config = dict(config or {})
+        # 提前校验配置，并得到用于清单比较的规范化配置
+        self.normalized = ImageToSVGConverter(**self.config).config_dict()
+        self.workers, self.intra_op_threads = split_cores(None, workers, intra_op_threads)
+        self.prefetch = self.workers if prefetch is None else prefetch
+        self.output_format = output_format
+        self.memory_map = memory_map
+        self.force = force
+        self.manifest_path = Path(manifest_path) if manifest_path else self.output_dir / MANIFEST_NAME
+
+    async def run(self, inputs):
+        """
+        转换全部输入
+
+        Args:
+            inputs: collect_inputs 的结果
+
+        Returns:
+            每个文件的结果字典列表（与 inputs 顺序一致）
+        """
+        suffix = '.svgz' if self.output_format == 'svgz' else '.svg'
+        names = output_names([name for _, name in inputs], suffix, keep_dirs=True)
+        manifest = {} if self.force else load_manifest(self.manifest_path)
+        executor = ConversionExecutor(ExecutorConfig(mode='process', max_workers=self.workers,
+                                                     intra_op_threads=self.intra_op_threads,
+                                                     warmup=False))
+        # 处理中的文件数上限：工作者之外的名额用于预先读取和解码
+        slots = asyncio.Semaphore(self.workers + self.prefetch)
+        completed = 0
+
+        async def process(input_path, output_name):
+            nonlocal completed
+            async with slots:
+                result = await self._process(executor, input_path, output_name, manifest)
+            if result['status'] == 'converted':
+                manifest[output_name] = {key: result[key] for key in
+                                         ('input', 'key', 'bytes', 'seconds')}
+                completed += 1
+                if completed % MANIFEST_FLUSH_INTERVAL == 0:
+                    await asyncio.to_thread(save_manifest, self.manifest_path, manifest)
+            status = {'converted': '✅', 'skipped': '⏭', 'failed': '❌'}[result['status']]
+            detail = result.get('error') or f"{result['seconds'] * 1000:.0f}ms"
+            print(f"{status} {result['input']} -> {output_name} ({detail})")
+            return result
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            results = await asyncio.gather(*(
+                process(path, name) for (path, _), name in zip(inputs, names)))
+        finally:
+            executor.shutdown()
+            await asyncio.to_thread(save_manifest, self.manifest_path, manifest)
+        return results
+
+    async def _process(self, executor, input_path, output_name, manifest):
+        start = time.perf_counter()
+        result = {'input': str(input_path), 'output': output_name, 'status': 'converted'}
+        output_path = self.output_dir / output_name
+        try:
+            image_data = None
+            if self.memory_map:
+                key = await asyncio.to_thread(_hash_file, input_path, self.normalized)
+            else:
+                image_data = await asyncio.to_thread(Path(input_path).read_bytes)
+                key = await asyncio.to_thread(make_cache_key, image_data, self.normalized)
+            result['key'] = key
+            entry = manifest.get(output_name)
+            if entry and entry.get('key') == key and output_path.exists():
+                result.update(status='skipped', seconds=time.perf_counter() - start)
+                return result
+
+            if self.memory_map:
+                result['bytes'] = await executor.call(
+                    _convert_path, str(input_path), str(output_path), self.output_format,
+                    self.config)
+            else:
+                # 追踪和SVG生成都在工作者中完成，本进程只负责读取、哈希和解码
+                written = await executor.trace_then(
+                    functools.partial(_write_trace, str(output_path), self.output_format),
+                    image_data, **self.config)
+                del image_data
+                result['stages'] = dict(written.stage_timings)
+                result['bytes'] = written.size
+            result['input_bytes'] = Path(input_path).stat().st_size
+        except Exception as e:
+            result.update(status='failed', error=str(e))
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+
+def summarize(results, elapsed):
+    """汇总吞吐量和逐文件耗时"""
+    converted = [r for r in results if r['status'] == 'converted']
+    seconds = sorted(r['seconds'] for r in converted)
+    input_bytes = sum(r['input_bytes'] for r in converted)
+    summary = {
+        'files': len(results),
+        'converted': len(converted),
+        'skipped': sum(r['status'] == 'skipped' for r in results),
+        'failed': sum(r['status'] == 'failed' for r in results),
+        'elapsed_seconds': elapsed,
+        'files_per_second': len(converted) / elapsed if elapsed > 0 else 0.0,
+        'input_mb_per_second': input_bytes / (1024 * 1024) / elapsed if elapsed > 0 else 0.0,
+        'output_bytes': sum(r['bytes'] for r in converted),
+    }
+    if seconds:
+        summary['per_file_ms'] = {
+            'median': statistics.median(seconds) * 1000,
+            'p95': seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))] * 1000,
+            'max': seconds[-1] * 1000,
+        }
+        slowest = sorted(converted, key=lambda r: r['seconds'], reverse=True)[:5]
+        summary['slowest'] = [{'input': r['input'], 'ms': r['seconds'] * 1000} for r in slowest]
+    # 各阶段在全部文件上的累计耗时（内存映射模式下阶段耗时在工作进程中，不统计）
+    stages = {}
+    for result in converted:
+        for stage, seconds in result.get('stages', {}).items():
+            stages[stage] = stages.get(stage, 0.0) + seconds * 1000
+    if stages:
+        summary['stage_totals_ms'] = stages
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n📊 共 {summary['files']} 个文件: 转换 {summary['converted']}, "
+          f"跳过 {summary['skipped']}, 失败 {summary['failed']}")
+    print(f"⏱ 总耗时 {summary['elapsed_seconds']:.2f}s, "
+          f"吞吐量 {summary['files_per_second']:.2f} 文件/s, "
+          f"{summary['input_mb_per_second']:.2f} MB/s（输入）")
+    if 'per_file_ms' in summary:
+        timing = summary['per_file_ms']
+        print(f"   单文件耗时（含等待工作者）: 中位数 {timing['median']:.0f}ms, "
+              f"P95 {timing['p95']:.0f}ms, 最长 {timing['max']:.0f}ms")
+        for item in summary['slowest']:
+            print(f"   {item['ms']:8.0f}ms  {item['input']}")
+    if 'stage_totals_ms' in summary:
+        stages = sorted(summary['stage_totals_ms'].items(), key=lambda item: -item[1])
+        print("   各阶段累计: " + ", ".join(f"{stage} {ms:.0f}ms" for stage, ms in stages))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="批量把图片转换为SVG")
+    parser.add_argument('inputs', nargs='+', help="输入文件、目录或通配符（支持 **）")
+    parser.add_argument('-o', '--output-dir', required=True, help="输出目录")
+    parser.add_argument('-r', '--recursive', action='store_true', help="递归遍历目录")
+    parser.add_argument('--config', default='{}', help="转换配置（JSON对象）")
+    parser.add_argument('--quality', choices=tuple(QUALITY_TIERS), help="质量档位（覆盖 --config 中的设置）")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='svg', help="输出格式")
+    parser.add_argument('--workers', type=int, help="工作进程数（默认为 核数 / 算子线程数）")
+    parser.add_argument('--intra-op-threads', type=int,
+                        help="每个工作进程的算子线程数（OpenCV、BLAS/OpenMP，默认为 核数 / 工作进程数）")
+    parser.add_argument('--prefetch', type=int, help="提前读取和解码的文件数（默认等于工作进程数）")
+    parser.add_argument('--memory-map', action='store_true',
+                        help="在工作进程中内存映射读取（超大扫描件，不预先解码）")
+    parser.add_argument('--force', action='store_true', help="忽略清单，重新转换全部文件")
+    parser.add_argument('--manifest', help=f"清单路径（默认输出目录下的 {MANIFEST_NAME}）")
+    parser.add_argument('--report', help="把汇总和逐文件结果保存为JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = json.loads(args.config)
+    if args.quality:
+        config['quality'] = args.quality
+    inputs = collect_inputs(args.inputs, args.recursive)
+    runner = BatchRunner(args.output_dir, config, workers=args.workers, prefetch=args.prefetch,
+                         output_format=args.format, memory_map=args.memory_map,
+                         force=args.force, manifest_path=args.manifest,
+                         intra_op_threads=args.intra_op_threads)
+    print(f"🚀 批量转换: {len(inputs)} 个文件, {runner.workers} 个工作进程 × "
+          f"{runner.intra_op_threads} 个算子线程, 预取 {runner.prefetch}, 配置 {config}")
+
+    start = time.perf_counter()
+    results = asyncio.run(runner.run(inputs))
+    summary = summarize(results, time.perf_counter() - start)
+    print_summary(summary)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'files': results}, f, ensure_ascii=False, indent=2)
+        print(f"💾 结果已保存: {args.report}")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+响应压缩
+
+按 Accept-Encoding 协商压缩编码（br、gzip），或按请求输出 .svgz（gzip压缩的SVG）。
+压缩在SVG分块生成的同时逐块进行，不需要先拼出完整的SVG字符串。
+brotli 为可选依赖，未安装时只协商 gzip。
+"""
+
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # 可选依赖
+    brotli = None
+
+# 协商时编码的优先顺序（客户端权重相同时）
+ENCODING_PREFERENCE = ('br', 'gzip')
+OUTPUT_FORMATS = ('svg', 'svgz')
+
+
+class CompressionConfig:
+    """压缩配置"""
+
+    def __init__(self, gzip_level=6, brotli_quality=4):
+        """
+        初始化压缩配置
+
+        Args:
+            gzip_level: gzip压缩级别（1-9），越高压缩率越高、CPU开销越大
+            brotli_quality: brotli压缩质量（0-11），流式输出建议4-6
+        """
+        if not 1 <= gzip_level <= 9:
+            raise ValueError(f"gzip压缩级别必须在 1 到 9 之间: {gzip_level}")
+        if not 0 <= brotli_quality <= 11:
+            raise ValueError(f"brotli压缩质量必须在 0 到 11 之间: {brotli_quality}")
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取配置"""
+        return cls(
+            gzip_level=int(os.environ.get("PNG2SVG_GZIP_LEVEL", 6)),
+            brotli_quality=int(os.environ.get("PNG2SVG_BROTLI_QUALITY", 4)),
+        )
+
+
+def available_encodings():
+    """当前环境支持的压缩编码，按优先顺序排列"""
+    return tuple(e for e in ENCODING_PREFERENCE if e != 'br' or brotli is not None)
+
+
+def negotiate(accept_encoding, available=None):
+    """
+    根据 Accept-Encoding 请求头选择压缩编码
+
+    Args:
+        accept_encoding: Accept-Encoding 请求头的值
+        available: 可选的编码序列，默认 available_encodings()
+
+    Returns:
+        选中的编码（'br' 或 'gzip'），不压缩时返回 None
+    """
+    if available is None:
+        available = available_encodings()
+    weights = {}
+    wildcard = None
+    for item in (accept_encoding or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if coding == '*':
+            wildcard = weight
+        else:
+            weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in available:
+        weight = weights.get(coding, wildcard or 0.0)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def iter_compressed(chunks, encoding, config=None):
+    """
+    逐块压缩字节分块
+
+    Args:
+        chunks: 字节分块的可迭代对象
+        encoding: 'gzip' 或 'br'
+        config: CompressionConfig，默认使用默认配置
+    """
+    config = config or CompressionConfig()
+    if encoding == 'gzip':
+        # wbits=31: 带gzip文件头，输出即 .svgz 文件
+        compressor = zlib.compressobj(config.gzip_level, zlib.DEFLATED, 31)
+        compress, finish = compressor.compress, compressor.flush
+    elif encoding == 'br':
+        if brotli is None:
+            raise RuntimeError("brotli 未安装，无法使用 br 压缩")
+        compressor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=config.brotli_quality)
+        compress, finish = compressor.process, compressor.finish
+    else:
+        raise ValueError(f"不支持的压缩编码: {encoding}")
+
+    for chunk in chunks:
+        data = compress(chunk)
+        if data:
+            yield data
+    yield finish()
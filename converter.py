@@ -1,9 +1,97 @@
-import io
+import mmap
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import numpy as np
-from PIL import Image
 import cv2
 from pathlib import Path
-import svgwrite
+
+from animation import DEFAULT_FRAME_DURATION, DeltaTracer, plan_chains
+from budget import BudgetSearch
+from cache import make_cache_key
+from curve_fit import fit_contours, merge_reports, sample_curves
+from decoding import decode_frames, decode_image, is_animated
+from instancing import INSTANCING_MODES, build_index
+from pipeline import THRESHOLD_METHODS, buffer_pool, compile_plan
+from router import ROUTE_MODES, analyze, route_settings
+from svg_path import CompactPathEncoder, encode_contour, encode_polyline, encoded_lengths
+from svg_writer import (COMPACT_EVENODD_STYLE, COMPACT_MONO_STYLE, EvenOddPath, UseRef,
+                        document_size, iter_animated_svg, iter_compact_svg, iter_layered_svg,
+                        iter_svg, layer_elements, path_element_overhead, path_elements,
+                        shape_definitions, short_hex)
+from quantize import quantize, TRANSPARENT
+from threads import apply_thread_limits, pool_threads
+from tiers import QUALITY_TIERS
+from tiling import binarize_tiled, find_contours_tiled
+
+
+# 多帧输入的处理方式：'first' 只转换第一帧，'frames' 每帧一个 <g>，'smil' 帧序列加SMIL动画
+ANIMATION_MODES = ('first', 'frames', 'smil')
+
+
+class CompoundContour:
+    """孔洞模式下的复合轮廓：外轮廓和其中的孔洞，输出为一个 evenodd 填充的路径"""
+
+    __slots__ = ('rings',)
+
+    def __init__(self, rings):
+        # 第一个环为外轮廓，其余为孔洞
+        self.rings = rings
+
+
+def contour_rings(contour):
+    """轮廓包含的环（普通轮廓只有一个环）"""
+    return contour.rings if isinstance(contour, CompoundContour) else (contour,)
+
+
+class TraceResult:
+    """轮廓追踪结果：已排序、过滤和简化的轮廓及图像信息"""
+    
+    def __init__(self, contours, width, height, has_transparency=False, stage_timings=None,
+                 layers=None):
+        self.contours = contours
+        self.width = width
+        self.height = height
+        self.has_transparency = has_transparency
+        # 各处理阶段耗时（秒）
+        self.stage_timings = stage_timings or {}
+        # 多色模式下的分层结果 [(填充色, 轮廓列表)]，按绘制顺序排列；单色模式为None
+        self.layers = layers
+        # 设置输出预算时的搜索结果（选定的容差、输出字节数和点数），未设置预算为None
+        self.budget = None
+        # 曲线拟合模式下的拟合报告（容差、最大和平均误差、曲线段数），否则为None
+        self.curve_fit = None
+        # route='auto' 时的路由决策（输入类别和分析特征），否则为None
+        self.route = None
+
+
+class AnimationTrace:
+    """多帧输入的追踪结果：每帧一个 TraceResult"""
+
+    def __init__(self, frames, width, height, has_transparency=False, durations=None, loop=0,
+                 stage_timings=None, delta_frames=0):
+        self.frames = frames
+        self.width = width
+        self.height = height
+        self.has_transparency = has_transparency
+        # 各帧显示时长（毫秒）
+        self.durations = durations or [DEFAULT_FRAME_DURATION] * len(frames)
+        # 播放次数，0表示无限循环
+        self.loop = loop
+        self.stage_timings = stage_timings or {}
+        # 只重新追踪了变化区域（或完全未变化）的帧数
+        self.delta_frames = delta_frames
+        self.layers = None
+        self.budget = None
+        self.curve_fit = None
+        self.route = None
+
+    @property
+    def contours(self):
+        """所有帧的轮廓"""
+        return [contour for frame in self.frames for contour in frame.contours]
+
 
 class ImageToSVGConverter:
     """高级图片转SVG转换器"""
@@ -13,7 +101,24 @@ class ImageToSVGConverter:
                  simplify_contours=True,
                  min_contour_area=50,
                  edge_detection=True,
-                 preserve_transparency=True):
+                 preserve_transparency=True,
+                 tile_size=None,
+                 svg_backend='stream',
+                 cache=None,
+                 color_mode='mono',
+                 num_colors=8,
+                 quantize_method='kmeans',
+                 quality='standard',
+                 compact=False,
+                 precision=None,
+                 animation='first',
+                 instancing='off',
+                 holes=False,
+                 max_bytes=None,
+                 max_points=None,
+                 fit_tolerance=None,
+                 route='fixed',
+                 threads=None):
         """
         初始化转换器
         
@@ -23,20 +128,160 @@ class ImageToSVGConverter:
             min_contour_area: 最小轮廓面积
             edge_detection: 是否使用边缘检测
             preserve_transparency: 是否保留透明度
+            tile_size: 分块大小（像素），图像宽或高超过该值时分块处理以限制内存，None表示不分块
+            svg_backend: SVG生成后端 ('stream' 流式写入, 'svgwrite' 兼容后端)，两者输出一致
+            cache: 可选的结果缓存 (cache.ConversionCache)
+            color_mode: 颜色模式 ('mono' 单色黑色路径, 'color' 多色分层)
+            num_colors: 多色模式下量化的颜色数
+            quantize_method: 多色模式下的量化方法 ('kmeans', 'median_cut')
+            quality: 质量档位 ('preview' 缩小处理的快速预览, 'standard', 'high' 保留更多细节)
+            compact: 是否输出紧凑SVG（相对坐标与简写命令、同样式路径合并、样式提升到 <g>）
+            precision: 坐标保留的小数位数，None表示整数坐标原样输出、浮点坐标保留2位
+            animation: 多帧输入（GIF/APNG等）的处理方式 ('first' 只转换第一帧,
+                       'frames' 每帧一个 <g>, 'smil' 帧序列加SMIL动画)
+            instancing: 重复形状实例化 ('off', 'translate' 按平移匹配, 'rotate' 再按90°旋转匹配,
+                        'full' 再按整数倍缩放匹配)，重复的形状写入 <defs> 并用 <use> 引用
+            holes: 是否保留孔洞：按轮廓层次结构(RETR_CCOMP)把外轮廓和孔洞输出为 evenodd 复合路径，
+                   不再执行漫水填充（分块处理和动画输入不使用）
+            max_bytes: 输出字节数预算，None表示不限制。超出时搜索更大的简化容差（按标准输出计算）
+            max_points: 输出轮廓点数预算，None表示不限制（多帧动画输出不使用预算）
+            fit_tolerance: 曲线拟合容差（处理分辨率下的像素），None表示不拟合。设置后用最小二乘
+                           三次贝塞尔曲线拟合原始轮廓，代替 Douglas-Peucker 简化；实例化只按平移匹配
+            route: 流水线选择 ('fixed' 按配置执行完整流水线, 'auto' 先分析图像内容，为线稿、文字
+                   和扫描件选择更省的阈值方法并跳过不需要的步骤，照片仍按配置处理；只用于单色模式)
+            threads: 算子线程数（OpenCV内部并行、BLAS/OpenMP、分层和多帧线程池），None表示保持
+                     当前设置。这是进程全局的设置，服务中由工作池按核数拆分统一设置
         """
+        threshold_method = str(threshold_method).lower()
+        if threshold_method not in THRESHOLD_METHODS:
+            raise ValueError(f"不支持的阈值方法: {threshold_method}，可选 {THRESHOLD_METHODS}")
+        quality = str(quality).lower()
+        if quality not in QUALITY_TIERS:
+            raise ValueError(f"不支持的质量档位: {quality}，可选 {tuple(QUALITY_TIERS)}")
+        animation = str(animation).lower()
+        if animation not in ANIMATION_MODES:
+            raise ValueError(f"不支持的动画处理方式: {animation}，可选 {ANIMATION_MODES}")
+        instancing = str(instancing).lower()
+        if instancing not in INSTANCING_MODES:
+            raise ValueError(f"不支持的实例化方式: {instancing}，可选 {INSTANCING_MODES}")
+        route = str(route).lower()
+        if route not in ROUTE_MODES:
+            raise ValueError(f"不支持的流水线选择方式: {route}，可选 {ROUTE_MODES}")
         self.threshold_method = threshold_method
         self.simplify_contours = simplify_contours
         self.min_contour_area = min_contour_area
         self.edge_detection = edge_detection
         self.preserve_transparency = preserve_transparency
+        if tile_size is not None and int(tile_size) <= 0:
+            raise ValueError(f"分块大小必须为正整数: {tile_size}")
+        self.tile_size = int(tile_size) if tile_size else None
+        self.svg_backend = svg_backend
+        self.cache = cache
+        self.color_mode = color_mode
+        self.num_colors = int(num_colors)
+        self.quantize_method = quantize_method
+        self.quality = quality
+        self.tier = QUALITY_TIERS[quality]
+        self.compact = bool(compact)
+        self.precision = None if precision is None else int(precision)
+        self.animation = animation
+        self.instancing = instancing
+        self.holes = bool(holes)
+        self.max_bytes = int(max_bytes) if max_bytes else None
+        self.max_points = int(max_points) if max_points else None
+        self.fit_tolerance = float(fit_tolerance) if fit_tolerance else None
+        self.route = route
+        if threads:
+            apply_thread_limits(threads)
+        # 最近一次内容分析的路由决策（route='auto' 的单色转换中设置）
+        self.route_decision = None
+        # 最近一次紧凑输出节省的字节数（紧凑SVG全部生成后设置）
+        self.compact_report = None
+        # 分块模式下是否把中间掩码放到磁盘内存映射中（由 convert_file 设置）
+        self.memmap_intermediates = False
+        # 最近一次解码的原图尺寸 (宽, 高)
+        self.source_size = None
+        # 最近一次转换各阶段的耗时（秒）
+        self.stage_timings = {}
+        # 每个阶段开始时以阶段名调用的回调（由异步任务设置，用于报告进度和取消）
+        self.stage_listener = None
+
+    @contextmanager
+    def stage(self, name):
+        """记录一个处理阶段的耗时"""
+        if self.stage_listener is not None:
+            self.stage_listener(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stage_timings[name] = self.stage_timings.get(name, 0.0) + elapsed
+
+    def config_dict(self):
+        """返回规范化后的转换配置，用作缓存键的一部分"""
+        return {
+            'threshold_method': str(self.threshold_method).lower(),
+            'simplify_contours': bool(self.simplify_contours),
+            'min_contour_area': int(self.min_contour_area),
+            'edge_detection': bool(self.edge_detection),
+            'preserve_transparency': bool(self.preserve_transparency),
+            'tile_size': self.tile_size,
+            'color_mode': str(self.color_mode).lower(),
+            'num_colors': self.num_colors,
+            'quantize_method': str(self.quantize_method).lower(),
+            'compact': self.compact,
+            'precision': self.precision,
+            'animation': self.animation,
+            'instancing': self.instancing,
+            'holes': self.holes,
+            'max_bytes': self.max_bytes,
+            'max_points': self.max_points,
+            'fit_tolerance': self.fit_tolerance,
+            'route': self.route,
+            'quality': self.quality,
+        }
+
+    @property
+    def plan(self):
+        """按当前配置（和路由决策）编译的流水线计划（相同配置共享同一个计划）"""
+        settings = {
+            'threshold_method': self.threshold_method,
+            'edge_detection': self.edge_detection and self.tier['edge_detection'],
+            'median_ksize': self.tier['median_ksize'],
+            'close_ksize': self.tier['close_ksize'],
+        }
+        if self.route_decision is not None:
+            settings = route_settings(self.route_decision['kind'], settings)
+        return compile_plan(**settings)
+
+    def choose_route(self, gray_array):
+        """route='auto' 时分析单色输入的内容并记录路由决策，之后的流水线计划按决策编译"""
+        if self.route != 'auto' or self.is_color:
+            return None
+        with self.stage('analyze'):
+            self.route_decision = analyze(gray_array)
+        plan = self.plan
+        print(f"流水线路由: {self.route_decision['kind']} "
+              f"(阈值 {plan.threshold_method}, 边缘增强 {plan.edge_detection}, "
+              f"中值滤波 {plan.median_ksize}, 闭操作 {plan.close_ksize})")
+        return self.route_decision
+
+    @property
+    def is_color(self):
+        return str(self.color_mode).lower() == 'color'
 
     def preprocess_image(self, image_array):
         """预处理图像"""
-        # 降噪处理
-        denoised = cv2.medianBlur(image_array, 5)
+        plan = self.plan
+        
+        # 降噪处理（路由为干净的输入跳过）
+        denoised = image_array
+        if plan.median_ksize > 1:
+            denoised = cv2.medianBlur(image_array, plan.median_ksize)
         
         # 如果启用边缘检测，先进行边缘增强
-        if self.edge_detection:
+        if plan.edge_detection:
             # 使用Canny边缘检测
             edges = cv2.Canny(denoised, 50, 150)
             # 将边缘信息与原图像结合
@@ -46,13 +291,14 @@ class ImageToSVGConverter:
 
     def apply_threshold(self, image_array):
         """应用阈值处理"""
-        if self.threshold_method == 'adaptive':
+        threshold_method = self.plan.threshold_method
+        if threshold_method == 'adaptive':
             # 自适应阈值，能更好地处理光照不均的图像
             binary = cv2.adaptiveThreshold(
                 image_array, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
                 cv2.THRESH_BINARY_INV, 11, 2
             )
-        elif self.threshold_method == 'otsu':
+        elif threshold_method == 'otsu':
             # Otsu自动阈值选择
             _, binary = cv2.threshold(
                 image_array, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
@@ -65,17 +311,21 @@ class ImageToSVGConverter:
         
         return binary
 
-    def improve_morphology(self, binary_image):
+    def improve_morphology(self, binary_image, fill=True):
         """改进形态学操作"""
-        # 使用更复杂的形态学操作序列
-        kernel_small = np.ones((3, 3), np.uint8)
-        kernel_medium = np.ones((5, 5), np.uint8)
+        # 使用更复杂的形态学操作序列（结构元素在流水线计划中预先创建）
+        plan = self.plan
         
-        # 闭操作：连接邻近的区域
-        closed = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, kernel_medium)
+        opened = binary_image
+        if plan.close_kernel is not None:
+            # 闭操作：连接邻近的区域
+            closed = cv2.morphologyEx(binary_image, cv2.MORPH_CLOSE, plan.close_kernel)
+            
+            # 开操作：去除小噪点
+            opened = cv2.morphologyEx(closed, cv2.MORPH_OPEN, plan.open_kernel)
         
-        # 开操作：去除小噪点
-        opened = cv2.morphologyEx(closed, cv2.MORPH_OPEN, kernel_small)
+        if not fill:
+            return opened
         
         # 填充孔洞
         filled = self.fill_holes(opened)
@@ -97,52 +347,98 @@ class ImageToSVGConverter:
         return cv2.bitwise_or(binary_image, filled_inv)
 
     def simplify_contour(self, contour):
-        """简化轮廓点"""
+        """简化轮廓点（曲线拟合模式下拟合为三次贝塞尔曲线）"""
+        if self.fit_tolerance:
+            return self.simplify_all([contour])[0]
         if not self.simplify_contours:
             return contour
         
         # 使用Douglas-Peucker算法简化轮廓
-        epsilon = 0.02 * cv2.arcLength(contour, True)
+        epsilon = self.tier['epsilon'] * cv2.arcLength(contour, True)
         simplified = cv2.approxPolyDP(contour, epsilon, True)
         
         return simplified
 
+    def simplify_all(self, contours, reports=None):
+        """
+        简化一组轮廓
+
+        曲线拟合模式下一次向量化拟合全部轮廓，拟合报告追加到 reports 列表中。
+        """
+        if not self.fit_tolerance:
+            return [self.simplify_contour(contour) for contour in contours]
+        fitted, report = fit_contours(contours, self.fit_tolerance, integer=self.precision is None)
+        if reports is not None:
+            reports.append(report)
+        return fitted
+
     def contour_to_svg_path(self, contour):
         """将轮廓转换为SVG路径，支持曲线"""
-        if len(contour) < 3:
-            return ""
-        
-        path_data = ""
-        contour = contour.reshape(-1, 2)
-        
-        # 移动到起始点
-        path_data += f"M{contour[0][0]},{contour[0][1]} "
-        
-        # 如果点数较少，使用直线连接
-        if len(contour) <= 4:
-            for point in contour[1:]:
-                path_data += f"L{point[0]},{point[1]} "
-        else:
-            # 使用平滑曲线连接
-            for i in range(1, len(contour)):
-                if i % 3 == 1 and i + 2 < len(contour):
-                    # 使用三次贝塞尔曲线
-                    cp1 = contour[i]
-                    cp2 = contour[i + 1]
-                    end = contour[i + 2]
-                    path_data += f"C{cp1[0]},{cp1[1]} {cp2[0]},{cp2[1]} {end[0]},{end[1]} "
-                elif i % 3 != 1:
-                    continue
-                else:
-                    # 剩余点用直线连接
-                    path_data += f"L{contour[i][0]},{contour[i][1]} "
+        if isinstance(contour, CompoundContour):
+            return EvenOddPath(' '.join(encode_contour(ring, self.precision)
+                                        for ring in contour.rings))
+        return encode_contour(contour, self.precision)
+
+    def find_contours(self, mask):
+        """
+        查找二值掩码的轮廓
+
+        Returns:
+            (轮廓, 层次结构)；孔洞模式下使用 RETR_CCOMP 两层结构，否则只查找外轮廓，层次结构为 None
+        """
+        mode = cv2.RETR_CCOMP if self.holes else cv2.RETR_EXTERNAL
+        result = cv2.findContours(mask, mode, cv2.CHAIN_APPROX_SIMPLE)
+        # 处理不同OpenCV版本的返回值
+        contours, hierarchy = result[1:] if len(result) == 3 else result
+        return contours, hierarchy if self.holes else None
+
+    def prepare_contours(self, contours, min_area=None, hierarchy=None, reports=None):
+        """
+        按面积排序、过滤小轮廓并简化，返回可直接输出的轮廓列表
+
+        提供 RETR_CCOMP 层次结构时，外轮廓与其中面积不小于 min_area 的孔洞组成 CompoundContour。
+        曲线拟合模式下的拟合报告追加到 reports 列表中。
+        """
+        if min_area is None:
+            min_area = self.min_contour_area
+        if hierarchy is not None:
+            return self._prepare_compound(contours, hierarchy, min_area, reports)
+        # 按面积排序轮廓，大的在后面（确保层次正确）
+        contours_with_area = [(contour, cv2.contourArea(contour)) for contour in contours]
+        contours_with_area.sort(key=lambda x: x[1])
         
-        path_data += "Z"
-        return path_data
+        return self.simplify_all(
+            [contour for contour, area in contours_with_area if area >= min_area], reports)
 
-    def create_optimized_svg(self, contours, width, height, has_transparency=False):
-        """创建优化的SVG"""
-        # 使用svgwrite库创建更标准的SVG
+    def _prepare_compound(self, contours, hierarchy, min_area, reports=None):
+        """按层次结构把孔洞归入外轮廓；按外轮廓面积排序和过滤"""
+        areas = [cv2.contourArea(contour) for contour in contours]
+        groups = group_rings(hierarchy, [area >= min_area for area in areas])
+        groups.sort(key=lambda group: areas[group[0]])
+
+        simplified = iter(self.simplify_all(
+            [contours[i] for outer, holes in groups for i in [outer] + holes], reports))
+        prepared = []
+        for outer, holes in groups:
+            rings = [next(simplified) for _ in range(1 + len(holes))]
+            prepared.append(CompoundContour(rings) if holes else rings[0])
+        return prepared
+
+    def iter_path_data(self, prepared_contours):
+        """逐个生成路径数据"""
+        for contour in prepared_contours:
+            yield self.contour_to_svg_path(contour)
+
+    def iter_svg_chunks(self, prepared_contours, width, height, has_transparency=False):
+        """按分块生成SVG文本"""
+        if self.svg_backend == 'svgwrite':
+            yield self._svgwrite_document(prepared_contours, width, height, has_transparency)
+            return
+        yield from iter_svg(self.iter_path_data(prepared_contours), width, height, has_transparency)
+
+    def _svgwrite_document(self, prepared_contours, width, height, has_transparency=False):
+        """使用svgwrite构建SVG文档（兼容后端）"""
+        svgwrite = _import_svgwrite()
         dwg = svgwrite.Drawing(size=(width, height))
         dwg.viewbox(0, 0, width, height)
         
@@ -150,25 +446,14 @@ class ImageToSVGConverter:
         if not has_transparency:
             dwg.add(dwg.rect(insert=(0, 0), size=(width, height), fill='white'))
         
-        # 按面积排序轮廓，大的在后面（确保层次正确）
-        contours_with_area = [(contour, cv2.contourArea(contour)) for contour in contours]
-        contours_with_area.sort(key=lambda x: x[1])
-        
         valid_contours = 0
-        for contour, area in contours_with_area:
-            if area < self.min_contour_area:
-                continue
-            
-            # 简化轮廓
-            simplified_contour = self.simplify_contour(contour)
-            
-            # 转换为SVG路径
-            path_data = self.contour_to_svg_path(simplified_contour)
-            
+        for path_data in self.iter_path_data(prepared_contours):
             if path_data:
                 # 添加路径到SVG
                 path = dwg.path(d=path_data)
                 path.fill('black', opacity=0.9)
+                if isinstance(path_data, EvenOddPath):
+                    path['fill-rule'] = 'evenodd'
                 path.stroke('none')
                 dwg.add(path)
                 valid_contours += 1
@@ -192,6 +477,11 @@ class ImageToSVGConverter:
         
         return dwg.tostring()
 
+    def create_optimized_svg(self, contours, width, height, has_transparency=False):
+        """创建优化的SVG"""
+        prepared = self.prepare_contours(contours)
+        return ''.join(self.iter_svg_chunks(prepared, width, height, has_transparency))
+
     def process_transparency(self, image):
         """处理透明度信息"""
         if image.mode == 'RGBA':
@@ -212,58 +502,560 @@ class ImageToSVGConverter:
         else:
             return np.array(image.convert('L')), False
 
-    def convert(self, image_data):
-        """主转换函数"""
-        try:
-            # 加载图像
-            image = Image.open(io.BytesIO(image_data))
-            width, height = image.size
-            
-            print(f"处理图像: {width}x{height}, 模式: {image.mode}")
-            
-            # 处理透明度
-            if self.preserve_transparency:
-                gray_array, has_transparency = self.process_transparency(image)
+    def decode(self, image_data):
+        """
+        解码图像数据，返回像素数组和是否包含透明度
+
+        单色模式返回灰度数组；多色模式返回 HxWx3 RGB 数组，包含透明度时返回 HxWx4 RGBA 数组。
+        预览档位下 JPEG 可能以降低的分辨率解码，原图尺寸记录在 source_size 中。
+        """
+        with self.stage('decode'):
+            decoded = decode_image(image_data, color=self.is_color,
+                                   preserve_transparency=self.preserve_transparency,
+                                   max_side=self.tier['max_side'])
+            self.source_size = (decoded.width, decoded.height)
+            print(f"处理图像: {decoded.width}x{decoded.height}")
+        
+        return decoded.pixels, decoded.has_transparency
+
+    def processing_size(self, width, height):
+        """按质量档位计算实际处理的分辨率"""
+        max_side = self.tier['max_side']
+        if not max_side or max(width, height) <= max_side:
+            return width, height
+        scale = max_side / max(width, height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def trace_array(self, image_array, has_transparency=False, source_size=None, budget=True,
+                    route=True):
+        """
+        对已解码的灰度数组（多色模式下为彩色数组）执行图像处理和轮廓追踪
+        
+        预览档位先缩小图像再处理，轮廓坐标放大回原图坐标，输出的 viewBox 不变。
+        source_size 为原图尺寸 (宽, 高)，数组以降低的分辨率解码时需要提供。
+        budget 为 False 时不应用输出预算，route 为 False 时沿用已有的路由决策（多帧动画的单帧追踪）。
+        """
+        width, height = source_size or (image_array.shape[1], image_array.shape[0])
+        image_array, fx, fy = self._processing_array(image_array, (width, height))
+        # 面积阈值按缩放比例换算到处理分辨率
+        min_area = self.min_contour_area / (fx * fy)
+        if route:
+            self.choose_route(image_array)
+        
+        if self.is_color:
+            result = self.trace_color(image_array, has_transparency, min_area)
+        else:
+            result = self.trace_gray(image_array, has_transparency, min_area)
+        
+        result = self._restore_scale(result, fx, fy, width, height)
+        result.route = self.route_decision
+        if budget and (self.max_bytes or self.max_points):
+            result = self.apply_budget(result)
+        return result
+
+    def _processing_array(self, image_array, source_size, pooled=True):
+        """按质量档位把数组缩小到处理分辨率，返回 (数组, 横向放大倍数, 纵向放大倍数)"""
+        width, height = source_size
+        small_width, small_height = self.processing_size(width, height)
+        fx, fy = width / small_width, height / small_height
+        if image_array.shape[:2] != (small_height, small_width):
+            with self.stage('downscale'):
+                small_shape = (small_height, small_width) + image_array.shape[2:]
+                dst = buffer_pool().get('downscale', small_shape) if pooled else None
+                image_array = cv2.resize(image_array, (small_width, small_height), dst=dst,
+                                         interpolation=cv2.INTER_AREA)
+        return image_array, fx, fy
+
+    def _restore_scale(self, result, fx, fy, width, height):
+        """把处理分辨率下的轮廓放大回原图坐标"""
+        if (fx, fy) != (1.0, 1.0):
+            with self.stage('rescale'):
+                if result.layers is not None:
+                    result.layers = [(fill, rescale_contours(contours, fx, fy))
+                                     for fill, contours in result.layers]
+                    result.contours = [c for _, layer in result.layers for c in layer]
+                else:
+                    result.contours = rescale_contours(result.contours, fx, fy)
+            result.width, result.height = width, height
+            result.stage_timings = dict(self.stage_timings)
+        return result
+
+    def apply_budget(self, result):
+        """
+        按 max_bytes / max_points 预算进一步简化轮廓
+
+        预算按标准输出（非紧凑、不实例化）的字节数计算，紧凑输出和实例化输出在此基础上更小。
+        选定的容差、输出字节数和点数记录在 result.budget 中。
+        """
+        with self.stage('budget'):
+            layered = result.layers is not None
+            groups = result.layers if layered else [(None, result.contours)]
+            contours = [contour for _, layer in groups for contour in layer]
+
+            overhead = (path_element_overhead(False, layered),
+                        path_element_overhead(True, layered))
+
+            def measure(candidates):
+                # 不实际编码：按坐标位数计算各环的路径数据长度，复合路径的各环以空格分隔
+                counts = np.array([len(rings) for rings in candidates], np.int64)
+                rings = [ring for rings in candidates for ring in rings]
+                owner = np.repeat(np.arange(len(candidates)), counts)
+                data = np.bincount(owner, encoded_lengths(rings, self.precision),
+                                   len(candidates)).astype(np.int64)
+                data += np.maximum(counts - 1, 0)
+                points = np.bincount(owner, [len(ring) for ring in rings],
+                                     len(candidates)).astype(np.int64)
+                sizes = np.where(counts > 1, overhead[1], overhead[0]) + data
+                return np.stack([sizes, points], axis=1) * (data > 0)[:, None]
+
+            if self.fit_tolerance:
+                # 曲线拟合模式：各档对当前曲线的采样点按更大的容差重新拟合
+                def refit(rings, tolerances):
+                    samples = [sample_curves(ring) for ring in rings]
+                    return fit_contours(samples, np.maximum(tolerances, self.fit_tolerance),
+                                        integer=self.precision is None)[0]
+                search = BudgetSearch([tuple(contour_rings(c)) for c in contours], measure,
+                                      simplify=refit)
             else:
-                gray_array = np.array(image.convert('L'))
-                has_transparency = False
-            
-            # 确保数据类型正确
-            if gray_array.dtype != np.uint8:
-                gray_array = gray_array.astype(np.uint8)
-            
-            print(f"灰度图像范围: {gray_array.min()} - {gray_array.max()}")
-            
-            # 预处理
-            preprocessed = self.preprocess_image(gray_array)
-            
-            # 应用阈值
-            binary = self.apply_threshold(preprocessed)
-            
-            # 改进形态学操作
-            improved = self.improve_morphology(binary)
+                base = self.tier['epsilon'] if self.simplify_contours else 0.0
+                search = BudgetSearch([tuple(contour_rings(c)) for c in contours], measure, base)
+            fills = [fill for fill, layer in groups if layer] if layered else ()
+            fixed = document_size(result.width, result.height, result.has_transparency, fills)
+            areas = [cv2.contourArea(contour_rings(c)[0]) for c in contours]
+            empty = document_size(result.width, result.height, has_paths=False) - \
+                document_size(result.width, result.height)
+            rings, sizes, report = search.fit(self.max_bytes, self.max_points, fixed, areas, empty)
+
+            fitted = [(r[0] if len(r) == 1 else CompoundContour(list(r))) if r else None
+                      for r in rings]
+            layers = []
+            start = 0
+            nonempty = []
+            for fill, layer in groups:
+                end = start + len(layer)
+                layers.append((fill, [c for c in fitted[start:end] if c is not None]))
+                if sizes[start:end, 0].sum():
+                    nonempty.append(fill)
+                start = end
+
+        path_bytes, points = (int(total) for total in sizes.sum(axis=0))
+        total_bytes = path_bytes + document_size(result.width, result.height,
+                                                 result.has_transparency,
+                                                 nonempty if layered else (), path_bytes > 0)
+        report.update({
+            'max_bytes': self.max_bytes,
+            'max_points': self.max_points,
+            'bytes': total_bytes,
+            'points': points,
+            'met': ((self.max_bytes is None or total_bytes <= self.max_bytes)
+                    and (self.max_points is None or points <= self.max_points)),
+        })
+        print(f"输出预算: 容差 {report['epsilon']}, {total_bytes} 字节, {points} 个点")
+
+        if layered:
+            result.layers = layers
+            result.contours = [contour for _, layer in layers for contour in layer]
+        else:
+            result.contours = layers[0][1]
+        result.budget = report
+        result.stage_timings = dict(self.stage_timings)
+        return result
+
+    def trace_gray(self, gray_array, has_transparency=False, min_area=None):
+        """单色模式：对灰度数组执行图像处理和轮廓追踪"""
+        height, width = gray_array.shape[:2]
+        
+        print(f"灰度图像范围: {gray_array.min()} - {gray_array.max()}")
+        
+        if self.tile_size and max(height, width) > self.tile_size:
+            # 分块处理，限制峰值内存
+            print(f"分块处理: 分块大小 {self.tile_size}")
+            with self.stage('tiled_binarize'):
+                improved = binarize_tiled(self, gray_array, self.tile_size,
+                                          memmap=self.memmap_intermediates, fill=not self.holes)
+            with self.stage('contours'):
+                # 分块查找只支持外轮廓，孔洞模式不适用
+                contours = find_contours_tiled(improved, self.tile_size)
+                hierarchy = None
+        else:
+            # 预处理 → 阈值 → 形态学，在复用的缓冲区中就地执行
+            # 孔洞模式下由轮廓层次结构处理孔洞，跳过漫水填充
+            improved = self.plan.run(gray_array, stage=self.stage, fill=not self.holes)
             
             # 查找轮廓
-            contours_result = cv2.findContours(improved, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # 处理不同OpenCV版本的返回值
-            if len(contours_result) == 3:
-                _, contours, _ = contours_result
+            with self.stage('contours'):
+                contours, hierarchy = self.find_contours(improved)
+        
+        print(f"找到 {len(contours)} 个轮廓")
+        
+        reports = []
+        with self.stage('simplify'):
+            prepared = self.prepare_contours(contours, min_area, hierarchy, reports)
+        
+        result = TraceResult(prepared, width, height, has_transparency, dict(self.stage_timings))
+        result.curve_fit = merge_reports(reports)
+        return result
+
+    def trace_layer(self, labels, index, min_area=None, reports=None):
+        """追踪单个颜色层的轮廓"""
+        # 不填充孔洞：只查找外轮廓时孔洞由上层颜色覆盖；孔洞模式下孔洞露出下层颜色
+        improved = self.plan.trace_layer_mask(labels, index)
+        contours, hierarchy = self.find_contours(improved)
+        return self.prepare_contours(contours, min_area, hierarchy, reports)
+
+    def trace_color(self, image_array, has_transparency=False, min_area=None):
+        """
+        多色分层追踪
+        
+        降噪和颜色量化只执行一次，之后各颜色层的掩码在线程池中并发追踪
+        （OpenCV 和 NumPy 在计算时释放GIL）。像素最多的颜色先绘制，位于最下层。
+        多色模式不使用分块处理。
+        """
+        height, width = image_array.shape[:2]
+        
+        pool = buffer_pool()
+        with self.stage('preprocess'):
+            alpha = None
+            rgb = image_array
+            if image_array.shape[2] == 4:
+                alpha = image_array[..., 3]
+                rgb = cv2.cvtColor(image_array, cv2.COLOR_RGBA2RGB,
+                                   dst=pool.get('color_rgb', (height, width, 3)))
+            denoised = cv2.medianBlur(rgb, self.tier['median_ksize'],
+                                      dst=pool.get('color_denoised', rgb.shape))
+        
+        with self.stage('quantize'):
+            labels, palette = quantize(denoised, self.num_colors, self.quantize_method, alpha)
+            counts = np.bincount(labels.ravel(), minlength=TRANSPARENT + 1)[:len(palette)]
+            order = [int(i) for i in np.argsort(-counts, kind='stable') if counts[i] > 0]
+        
+        print(f"量化为 {len(order)} 种颜色")
+        
+        reports = []
+        with self.stage('layers'):
+            traced = list(_layer_executor().map(
+                lambda index: self.trace_layer(labels, index, min_area, reports), order))
+        
+        layers = [
+            ('#%02x%02x%02x' % tuple(int(c) for c in palette[index]), contours)
+            for index, contours in zip(order, traced)
+        ]
+        contours = [contour for _, layer in layers for contour in layer]
+        print(f"找到 {len(contours)} 个轮廓")
+        
+        result = TraceResult(contours, width, height, has_transparency,
+                             dict(self.stage_timings), layers=layers)
+        result.curve_fit = merge_reports(reports)
+        return result
+
+    def trace_animation(self, image_data):
+        """
+        解码并追踪多帧输入的每一帧
+        
+        单色模式（不分块、非Otsu全局阈值）下相邻帧只重新追踪变化区域并复用未变化的轮廓；
+        从关键帧开始的各条依赖链在线程池中并行处理。多色模式的调色板按帧计算，各帧独立并行追踪。
+        """
+        with self.stage('decode'):
+            animation = decode_frames(image_data, color=self.is_color,
+                                      preserve_transparency=self.preserve_transparency)
+            self.source_size = (animation.width, animation.height)
+        width, height = self.source_size
+        print(f"处理动画: {width}x{height}, {len(animation.frames)} 帧")
+        
+        frames = []
+        fx = fy = 1.0
+        for frame in animation.frames:
+            small, fx, fy = self._processing_array(frame, self.source_size, pooled=False)
+            frames.append(small)
+        min_area = self.min_contour_area / (fx * fy)
+        # 按第一帧选择所有帧共用的流水线
+        self.choose_route(frames[0])
+        
+        tiled = self.tile_size and max(frames[0].shape[:2]) > self.tile_size
+        delta = not self.is_color and not tiled and self.plan.threshold_method != 'otsu'
+        with self.stage('frame_diff'):
+            chains = plan_chains(frames, delta_allowed=delta)
+        
+        has_transparency = animation.has_transparency
+        with self.stage('frames'):
+            traced = list(_frame_executor().map(
+                lambda chain: self._trace_chain(frames, chain, has_transparency, min_area),
+                chains))
+        results = [self._restore_scale(result, fx, fy, width, height)
+                   for chain in traced for result in chain]
+        delta_frames = len(results) - len(chains)
+        print(f"增量追踪: {delta_frames}/{len(results)} 帧")
+        
+        durations = [d or DEFAULT_FRAME_DURATION for d in animation.durations]
+        trace = AnimationTrace(results, width, height, has_transparency, durations,
+                               animation.loop, dict(self.stage_timings), delta_frames)
+        trace.route = self.route_decision
+        return trace
+
+    def _trace_chain(self, frames, chain, has_transparency, min_area):
+        """追踪一条依赖链：第一帧完整追踪，之后的帧只更新变化区域"""
+        index, _ = chain[0]
+        height, width = frames[index].shape[:2]
+        if len(chain) == 1 and (self.is_color or self.tile_size):
+            return [self.trace_array(frames[index], has_transparency, budget=False, route=False)]
+        tracer = DeltaTracer(self, min_area)
+        results = []
+        for index, region in chain:
+            if region == 'key':
+                contours = tracer.keyframe(frames[index])
             else:
-                contours, _ = contours_result
-            
-            print(f"找到 {len(contours)} 个轮廓")
-            
-            # 创建优化的SVG
-            svg_content = self.create_optimized_svg(contours, width, height, has_transparency)
-            
-            return svg_content
+                contours = tracer.update(frames[index], region)
+            results.append(TraceResult(contours, width, height, has_transparency))
+        return results
+
+    def trace(self, image_data):
+        """解码并追踪轮廓（多帧输入按 animation 设置处理）"""
+        if self.animation != 'first' and is_animated(image_data):
+            return self.trace_animation(image_data)
+        gray_array, has_transparency = self.decode(image_data)
+        return self.trace_array(gray_array, has_transparency, self.source_size)
+
+    def iter_svg(self, trace_result):
+        """根据追踪结果流式生成SVG分块"""
+        if isinstance(trace_result, AnimationTrace):
+            return self._iter_animated_svg(trace_result)
+        if self.compact:
+            return self._iter_compact_svg(trace_result)
+        return self._iter_standard_svg(trace_result)
+
+    def _iter_standard_svg(self, trace_result):
+        if self.instancing != 'off':
+            return self._iter_instanced_svg(trace_result)
+        if trace_result.layers is not None:
+            # 多色分层输出始终使用流式写入器
+            layers = ((fill, self.iter_path_data(contours))
+                      for fill, contours in trace_result.layers)
+            return iter_layered_svg(layers, trace_result.width, trace_result.height,
+                                    trace_result.has_transparency)
+        return self.iter_svg_chunks(trace_result.contours, trace_result.width,
+                                    trace_result.height, trace_result.has_transparency)
+
+    def _iter_instanced_svg(self, trace_result):
+        """重复形状写入 <defs>，各处输出 <use>（始终使用流式写入器）"""
+        with self.stage('instancing'):
+            # 拟合的曲线控制点不能轮换起点，曲线拟合模式只按平移匹配
+            mode = 'translate' if self.fit_tolerance else self.instancing
+            index = build_index(trace_result.contours, mode,
+                                encode=self.contour_to_svg_path,
+                                layered=trace_result.layers is not None)
+        print(f"形状实例化: {len(index.instances)} 个形状, {index.instanced_count} 个引用")
+        
+        def path_data(contours, start):
+            for contour, placement in zip(contours, index.placements[start:]):
+                if placement is None:
+                    yield self.contour_to_svg_path(contour)
+                else:
+                    instance, transform = placement
+                    yield UseRef(instance.shape_id, transform)
+        
+        defs = None
+        if index.instances:
+            defs = shape_definitions(
+                ((instance.shape_id, self.contour_to_svg_path(instance.points))
+                 for instance in index.instances),
+                layered=trace_result.layers is not None)
+        size = (trace_result.width, trace_result.height, trace_result.has_transparency)
+        if trace_result.layers is None:
+            return iter_svg(path_data(trace_result.contours, 0), *size, defs=defs)
+        layers = []
+        start = 0
+        for fill, contours in trace_result.layers:
+            layers.append((fill, path_data(contours, start)))
+            start += len(contours)
+        return iter_layered_svg(layers, *size, defs=defs)
+
+    def _iter_animated_svg(self, trace):
+        """多帧输出：每帧一个 <g>（不使用紧凑输出）"""
+        frames = []
+        for frame in trace.frames:
+            if frame.layers is not None:
+                frames.append(layer_elements(
+                    (fill, self.iter_path_data(contours)) for fill, contours in frame.layers))
+            else:
+                frames.append(path_elements(self.iter_path_data(frame.contours)))
+        return iter_animated_svg(frames, trace.durations, trace.width, trace.height,
+                                 trace.has_transparency, mode=self.animation, loop=trace.loop)
+
+    def _iter_compact_svg(self, trace_result):
+        """
+        紧凑输出：每种样式的轮廓合并为一个路径
+
+        全部输出后按编码长度计算标准输出的字节数（见 standard_size），把节省的字节数记录到 compact_report。
+        """
+        if trace_result.layers is not None:
+            groups = [(f'fill="{short_hex(fill)}"', contours)
+                      for fill, contours in trace_result.layers]
+        else:
+            groups = [(COMPACT_MONO_STYLE, trace_result.contours)]
+
+        def encoded_groups():
+            for style, contours in groups:
+                # 含孔洞的分组按 evenodd 填充：合并后的路径中孔洞和孔洞内的外轮廓仍然正确
+                if any(isinstance(contour, CompoundContour) for contour in contours):
+                    style = f"{style} {COMPACT_EVENODD_STYLE}"
+                encoder = CompactPathEncoder(self.precision)
+                yield style, (encoder.encode(ring) for contour in contours
+                              for ring in contour_rings(contour))
+
+        compact_bytes = 0
+        for chunk in iter_compact_svg(encoded_groups(), trace_result.width, trace_result.height,
+                                      trace_result.has_transparency):
+            # 路径数据只含ASCII字符，字符数即字节数；只有空结果的提示文字需要编码
+            compact_bytes += len(chunk) if chunk.isascii() else len(chunk.encode('utf-8'))
+            yield chunk
+
+        original_bytes = self.standard_size(trace_result)
+        self.compact_report = {
+            'original_bytes': original_bytes,
+            'compact_bytes': compact_bytes,
+            'saved_bytes': original_bytes - compact_bytes,
+        }
+
+    def standard_size(self, trace_result):
+        """
+        标准输出（流式写入器、不实例化）的字节数
+
+        与输出预算相同，按坐标位数计算各路径数据的长度再加上元素和文档的固定部分，不生成SVG文本。
+        """
+        layered = trace_result.layers is not None
+        groups = trace_result.layers if layered else [(None, trace_result.contours)]
+        overhead = (path_element_overhead(False, layered), path_element_overhead(True, layered))
+        total = 0
+        fills = []
+        for fill, contours in groups:
+            if not len(contours):
+                continue
+            rings = [contour_rings(contour) for contour in contours]
+            counts = np.array([len(r) for r in rings], np.int64)
+            owner = np.repeat(np.arange(len(contours)), counts)
+            data = np.bincount(owner, encoded_lengths([ring for r in rings for ring in r],
+                                                      self.precision),
+                               len(contours)).astype(np.int64)
+            # 复合路径的各环以空格分隔，使用 evenodd 元素
+            data += np.maximum(counts - 1, 0)
+            evenodd = np.array([isinstance(c, CompoundContour) for c in contours])
+            sizes = np.where(evenodd, overhead[1], overhead[0]) + data
+            group_bytes = int(sizes[data > 0].sum())
+            if group_bytes:
+                total += group_bytes
+                fills.append(fill)
+        return total + document_size(trace_result.width, trace_result.height,
+                                     trace_result.has_transparency,
+                                     fills if layered else (), total > 0)
+
+    def convert_array(self, gray_array, has_transparency=False, source_size=None):
+        """对已解码的灰度数组执行转换流程"""
+        return ''.join(self.iter_svg(self.trace_array(gray_array, has_transparency, source_size)))
+
+    def _convert_uncached(self, image_data):
+        return ''.join(self.iter_svg(self.trace(image_data)))
+
+    def convert(self, image_data):
+        """主转换函数"""
+        try:
+            if self.cache is not None:
+                key = make_cache_key(image_data, self.config_dict())
+                return self.cache.get_or_compute(key, lambda: self._convert_uncached(image_data))
+            return self._convert_uncached(image_data)
             
         except Exception as e:
             print(f"转换过程中出错: {str(e)}")
             raise
 
 
+def _import_svgwrite():
+    """按需导入 svgwrite：仅兼容后端使用，默认的流式写入器不需要加载它"""
+    try:
+        import svgwrite
+    except ImportError:
+        raise RuntimeError("svgwrite 未安装，无法使用 svgwrite 后端")
+    return svgwrite
+
+
+_layer_pool = None
+_frame_pool = None
+_layer_pool_lock = threading.Lock()
+
+
+def _layer_executor():
+    """
+    多色分层追踪共用的线程池，线程长期存在以复用各自的缓冲区池
+
+    线程数为 算子线程数 × 共用本进程的工作者数（threads.pool_threads），设置改变后重新创建。
+    """
+    global _layer_pool
+    with _layer_pool_lock:
+        _layer_pool = _sized_pool(_layer_pool, 'png2svg-layer')
+        return _layer_pool
+
+
+def _frame_executor():
+    """多帧追踪共用的线程池（与分层线程池分开，帧内的分层追踪不会等待自身所在的线程池）"""
+    global _frame_pool
+    with _layer_pool_lock:
+        _frame_pool = _sized_pool(_frame_pool, 'png2svg-frame')
+        return _frame_pool
+
+
+def _sized_pool(pool, prefix):
+    threads = pool_threads()
+    if pool is None or pool._max_workers != threads:
+        if pool is not None:
+            # 已提交的任务继续在旧线程池中完成
+            pool.shutdown(wait=False)
+        pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=prefix)
+    return pool
+
+
+def group_rings(hierarchy, keep):
+    """
+    按 RETR_CCOMP 层次结构把孔洞归入所属的外轮廓
+
+    Args:
+        hierarchy: findContours 返回的层次结构
+        keep: 与轮廓一一对应的布尔序列，False 的轮廓（如面积过小）被忽略
+
+    Returns:
+        [(外轮廓序号, [孔洞序号])]，按外轮廓序号排列
+    """
+    if hierarchy is None:
+        return []
+    holes = {}
+    outers = []
+    for index, parent in enumerate(hierarchy.reshape(-1, 4)[:, 3].tolist()):
+        if not keep[index]:
+            continue
+        if parent < 0:
+            outers.append(index)
+        else:
+            holes.setdefault(parent, []).append(index)
+    return [(outer, holes.get(outer, [])) for outer in outers]
+
+
+def rescale_contours(contours, fx, fy):
+    """把处理分辨率下的轮廓坐标（像素中心）换算回原图坐标"""
+    if not contours:
+        return []
+    factors = np.array([fx, fy])
+    rings = [ring for contour in contours for ring in contour_rings(contour)]
+    # 所有轮廓拼接后一次换算，再按原长度切分
+    points = np.concatenate(rings)
+    scaled = np.rint(points * factors + (factors - 1) / 2).astype(np.int32)
+    scaled = np.split(scaled, np.cumsum([len(ring) for ring in rings[:-1]]))
+    if len(rings) == len(contours):
+        return scaled
+    # 复合轮廓按环数重新组合
+    scaled = iter(scaled)
+    return [CompoundContour([next(scaled) for _ in contour.rings])
+            if isinstance(contour, CompoundContour) else next(scaled)
+            for contour in contours]
+
+
 # 保持向后兼容的函数
 def png_to_svg(png_data, **kwargs):
     """
@@ -287,37 +1079,48 @@ def bitmap_to_svg(bitmap, width, height):
 <svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">
 '''
     
-    # 找到轮廓
-    contours_result = cv2.findContours(bitmap, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    # 找到轮廓：两层结构，孔洞与所属的外轮廓组成 evenodd 复合路径
+    contours_result = cv2.findContours(bitmap, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)
     
     if len(contours_result) == 3:
-        _, contours, _ = contours_result
+        _, contours, hierarchy = contours_result
     else:
-        contours, _ = contours_result
+        contours, hierarchy = contours_result
     
     # 添加轮廓到SVG
-    for contour in contours:
-        if cv2.contourArea(contour) < 10:
-            continue
-        
-        path_data = ""
-        for j, point in enumerate(contour):
-            x, y = point[0]
-            if j == 0:
-                path_data += f"M{x},{y} "
-            else:
-                path_data += f"L{x},{y} "
-        
-        path_data += "Z"
-        svg += f'  <path d="{path_data}" fill="black" stroke="none" />\n'
+    keep = [cv2.contourArea(contour) >= 10 for contour in contours]
+    paths = []
+    for outer, holes in group_rings(hierarchy, keep):
+        if holes:
+            d = ' '.join(encode_polyline(contours[index]) for index in [outer] + holes)
+            paths.append(f'  <path d="{d}" fill="black" fill-rule="evenodd" stroke="none" />\n')
+        else:
+            paths.append(f'  <path d="{encode_polyline(contours[outer])}" fill="black" stroke="none" />\n')
+    svg += ''.join(paths)
     
     svg += '</svg>'
     return svg
 
 
-def convert_file(file_path, **kwargs):
-    """从文件路径转换图像到SVG"""
-    with open(file_path, 'rb') as f:
-        image_data = f.read()
+def convert_file(file_path, memory_map=False, **kwargs):
+    """
+    从文件路径转换图像到SVG
     
-    return png_to_svg(image_data, **kwargs)
\ No newline at end of file
+    Args:
+        file_path: 图像文件路径
+        memory_map: 是否以内存映射方式读取输入文件，并在分块模式下把中间掩码映射到磁盘
+        **kwargs: 转换参数
+    """
+    if not memory_map:
+        with open(file_path, 'rb') as f:
+            image_data = f.read()
+        
+        return png_to_svg(image_data, **kwargs)
+    
+    converter = ImageToSVGConverter(**kwargs)
+    converter.memmap_intermediates = True
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if converter.animation != 'first' and is_animated(mapped):
+            return ''.join(converter.iter_svg(converter.trace_animation(mapped)))
+        gray_array, has_transparency = converter.decode(mapped)
+    return converter.convert_array(gray_array, has_transparency, converter.source_size)
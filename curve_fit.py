@@ -0,0 +1,405 @@
+"""
+最小二乘三次贝塞尔曲线拟合
+
+按 Schneider 算法（"An Algorithm for Automatically Fitting Digitized Curves"）把闭合轮廓
+拟合为少量三次贝塞尔曲线段：先在拐角处把轮廓分段（没有拐角时在两个对侧点处平滑分段），
+每段按弦长参数化、端点切线固定，用最小二乘求两个控制点沿切线到端点的距离；最大误差
+不超过容差的2倍时先做几次 Newton-Raphson 重新参数化，仍超出容差时在误差最大的点处分割，
+分割点两侧共用切线以保持平滑。
+
+所有轮廓的所有待拟合分段一起向量化计算：每一轮对全部分段同时求解（按段求和用
+np.add.reduceat），只有误差超出容差的分段分割后进入下一轮。拟合前在长边上补点，
+切线和拐角在前后各几个像素弧长处测量，不受像素锯齿影响。
+
+拟合结果仍是点数组：起点之后每三个点（两个控制点和终点）为一段曲线，共 3m+1 个点，
+与 encode_contour / CompactPathEncoder 的曲线分段方式一致，可直接编码、缩放和简化。
+"""
+
+import numpy as np
+
+# 方向变化超过该角度（度）的点为拐角
+CORNER_ANGLE = 60
+# 测量切线和拐角的最小弧长窗口（像素）
+MIN_WINDOW = 3.0
+# 拟合前沿轮廓补点的最大间距（像素）：CHAIN_APPROX_SIMPLE 只保留直线段的端点，
+# 不补点时最小二乘缺少约束，误差也只能在端点处检查
+SAMPLE_STEP = 2.0
+# 每段最多的 Newton-Raphson 重新参数化次数
+MAX_ITERATIONS = 4
+
+_CORNER_COS = np.cos(np.deg2rad(CORNER_ANGLE))
+
+
+def _unit(vectors):
+    norm = np.hypot(vectors[..., 0], vectors[..., 1])[..., None]
+    return np.divide(vectors, norm, out=np.zeros_like(vectors), where=norm > 0)
+
+
+def _basis(u):
+    mt = 1 - u
+    return np.stack([mt ** 3, 3 * mt * mt * u, 3 * mt * u * u, u ** 3], axis=1)
+
+
+def _evaluate(ctrl, u):
+    """按参数求曲线上的点：ctrl 为每个参数对应的 (4, 2) 控制点"""
+    return np.einsum('nk,nkd->nd', _basis(u), ctrl)
+
+
+class _Rings:
+    """拼接在一起的闭合环，每个环末尾重复起点，可按弧长插值取点"""
+
+    def __init__(self, rings):
+        self.counts = np.array([len(ring) for ring in rings], np.int64)
+        self.starts = np.concatenate(([0], np.cumsum(self.counts + 1)[:-1]))
+        self.points = np.concatenate([np.vstack((ring, ring[:1])) for ring in rings])
+        steps = np.hypot(*np.diff(self.points, axis=0).T)
+        # 环的末尾（重复的起点）与下一个环之间不相连
+        steps[self.starts[1:] - 1] = 0.0
+        self.steps = np.append(steps, 0.0)
+        self.cum = np.concatenate(([0.0], np.cumsum(steps)))
+        self.lengths = self.cum[self.starts + self.counts] - self.cum[self.starts]
+
+    def point_at(self, ring, s):
+        """第 ring 个环上弧长 s（按周长取模）处的点"""
+        start = self.starts[ring]
+        position = self.cum[start] + np.mod(s, self.lengths[ring])
+        index = np.searchsorted(self.cum, position, side='right') - 1
+        index = np.clip(index, start, start + self.counts[ring] - 1)
+        frac = np.clip((position - self.cum[index]) / self.steps[index], 0.0, 1.0)
+        return self.points[index] + frac[:, None] * (self.points[index + 1] - self.points[index])
+
+
+def _generate(points, u, seg, offsets, first, last, t1, t2):
+    """固定端点和端点切线，按最小二乘求每段的控制点"""
+    basis = _basis(u)
+    a1 = t1[seg] * basis[:, 1:2]
+    a2 = t2[seg] * basis[:, 2:3]
+    c00 = np.add.reduceat((a1 * a1).sum(axis=1), offsets)
+    c01 = np.add.reduceat((a1 * a2).sum(axis=1), offsets)
+    c11 = np.add.reduceat((a2 * a2).sum(axis=1), offsets)
+    rest = (points - (basis[:, 0:1] + basis[:, 1:2]) * first[seg]
+            - (basis[:, 2:3] + basis[:, 3:4]) * last[seg])
+    x0 = np.add.reduceat((a1 * rest).sum(axis=1), offsets)
+    x1 = np.add.reduceat((a2 * rest).sum(axis=1), offsets)
+    det = c00 * c11 - c01 * c01
+    solvable = np.abs(det) > 1e-12
+    safe = np.where(solvable, det, 1.0)
+    alpha1 = np.where(solvable, (x0 * c11 - x1 * c01) / safe, 0.0)
+    alpha2 = np.where(solvable, (c00 * x1 - c01 * x0) / safe, 0.0)
+    # 无解或控制点落在端点反方向时退回经验值：弦长的三分之一
+    chord = np.hypot(*(last - first).T)
+    bad = (alpha1 < 1e-6 * chord) | (alpha2 < 1e-6 * chord)
+    alpha1 = np.where(bad, chord / 3, alpha1)
+    alpha2 = np.where(bad, chord / 3, alpha2)
+    return np.stack([first, first + t1 * alpha1[:, None], last + t2 * alpha2[:, None], last],
+                    axis=1)
+
+
+def _reparameterize(ctrl, points, u):
+    """一次 Newton-Raphson 迭代：把每个点的参数移向曲线上离它最近的位置"""
+    mt = (1 - u)[:, None]
+    uu = u[:, None]
+    q = _evaluate(ctrl, u)
+    d1 = 3 * (mt * mt * (ctrl[:, 1] - ctrl[:, 0]) + 2 * mt * uu * (ctrl[:, 2] - ctrl[:, 1])
+              + uu * uu * (ctrl[:, 3] - ctrl[:, 2]))
+    d2 = 6 * (mt * (ctrl[:, 2] - 2 * ctrl[:, 1] + ctrl[:, 0])
+              + uu * (ctrl[:, 3] - 2 * ctrl[:, 2] + ctrl[:, 1]))
+    diff = q - points
+    numerator = (diff * d1).sum(axis=1)
+    denominator = (d1 * d1 + diff * d2).sum(axis=1)
+    step = np.divide(numerator, denominator, out=np.zeros_like(u), where=denominator != 0)
+    return np.clip(u - step, 0.0, 1.0)
+
+
+def _split_points(rings, tolerances):
+    """
+    检测拐角并确定每个环的分段点
+
+    Returns:
+        (每个环的分段点下标, 每个分段点是否为拐角, 前向切线, 后向切线, 中心切线)，
+        切线按 rings.points 的下标排列
+    """
+    total = len(rings.points)
+    real = np.ones(total, bool)
+    real[rings.starts + rings.counts] = False
+    index = np.flatnonzero(real)
+    ring = np.repeat(np.arange(len(rings.counts)), rings.counts)
+    window = np.minimum(np.maximum(MIN_WINDOW, tolerances), rings.lengths / 4)[ring]
+    s = rings.cum[index] - rings.cum[rings.starts[ring]]
+    here = rings.points[index]
+    ahead = rings.point_at(ring, s + window)
+    behind = rings.point_at(ring, s - window)
+
+    forward = np.zeros_like(rings.points)
+    backward = np.zeros_like(rings.points)
+    center = np.zeros_like(rings.points)
+    forward[index] = _unit(ahead - here)
+    backward[index] = _unit(behind - here)
+    center[index] = _unit(ahead - behind)
+    # 重复的起点使用起点的切线
+    for array in (forward, backward, center):
+        array[rings.starts + rings.counts] = array[rings.starts]
+
+    cos = -(backward[index] * forward[index]).sum(axis=1)
+
+    sharp = cos < _CORNER_COS
+    # 连续的拐角候选点中只取方向变化最大的一个
+    run_start = sharp & ~np.concatenate(([False], sharp[:-1] & (ring[1:] == ring[:-1])))
+    run = np.cumsum(run_start) - 1
+    candidates = np.flatnonzero(sharp)
+    order = candidates[np.lexsort((cos[candidates], run[candidates]))]
+    _, first = np.unique(run[order], return_index=True)
+    corners = order[first]
+
+    local = index - rings.starts[ring]
+    per_ring = [[] for _ in rings.counts]
+    for position in corners.tolist():
+        per_ring[ring[position]].append(position)
+
+    splits, kinds = [], []
+    for r, positions in enumerate(per_ring):
+        n = int(rings.counts[r])
+        offset = int(np.searchsorted(index, rings.starts[r]))
+        if len(positions) > 1 and sharp[offset] and sharp[offset + n - 1] and \
+                run[offset] != run[offset + n - 1]:
+            # 跨越环起点的一串候选点被分成了两段，保留方向变化较大的一个
+            head, tail = positions[0], positions[-1]
+            positions.remove(head if cos[head] > cos[tail] else tail)
+        ring_s = s[offset:offset + n]
+        if not positions:
+            # 没有拐角：在起点和对侧点处平滑分段
+            opposite = int(np.argmin(np.abs(ring_s - rings.lengths[r] / 2)))
+            points, kind = [0, opposite], [False, False]
+        elif len(positions) == 1:
+            corner = int(local[positions[0]])
+            target = np.mod(ring_s[corner] + rings.lengths[r] / 2, rings.lengths[r])
+            opposite = int(np.argmin(np.abs(ring_s - target)))
+            points, kind = sorted([corner, opposite]), [True, False]
+            if points[0] != corner:
+                kind = kind[::-1]
+        else:
+            points = sorted(int(local[p]) for p in positions)
+            kind = [True] * len(points)
+        splits.append(points)
+        kinds.append(kind)
+    return splits, kinds, forward, backward, center
+
+
+def _densify(points):
+    """在长边上等距补点，使相邻点间距不超过 SAMPLE_STEP"""
+    edges = np.roll(points, -1, axis=0) - points
+    steps = np.maximum(np.ceil(np.hypot(*edges.T) / SAMPLE_STEP), 1).astype(np.int64)
+    if (steps == 1).all():
+        return points
+    owner = np.repeat(np.arange(len(points)), steps)
+    fraction = (np.arange(steps.sum()) - np.repeat(np.cumsum(steps) - steps, steps)) / steps[owner]
+    return points[owner] + fraction[:, None] * edges[owner]
+
+
+def fit_contours(contours, tolerance, integer=True):
+    """
+    把一组闭合轮廓拟合为三次贝塞尔曲线
+
+    Args:
+        contours: 轮廓点数组的列表（OpenCV 格式）
+        tolerance: 容差（像素），标量或与轮廓一一对应的序列
+        integer: 是否把控制点取整后输出为 int32（否则输出浮点坐标）
+
+    Returns:
+        (拟合结果列表, 报告)。报告包含容差、最大和平均拟合误差（取整后的控制点与原轮廓点的
+        距离）、原轮廓点数和曲线段数。少于4个不同点的轮廓原样返回。
+    """
+    tolerances = np.broadcast_to(np.asarray(tolerance, np.float64), (len(contours),))
+    results = list(contours)
+    fittable, rings = [], []
+    for i, contour in enumerate(contours):
+        points = np.asarray(contour, np.float64).reshape(-1, 2)
+        if len(points):
+            points = points[(points != np.roll(points, -1, axis=0)).any(axis=1)]
+        if len(points) >= 4:
+            fittable.append(i)
+            rings.append(_densify(points))
+    report = {'tolerance': float(np.max(tolerance, initial=0.0)),
+              'max_error': 0.0, 'mean_error': 0.0,
+              'input_points': int(sum(len(c) for c in contours)), 'segments': 0}
+    if not rings:
+        return results, report
+
+    rings = _Rings(rings)
+    ring_tolerance = tolerances[fittable]
+    splits, kinds, forward, backward, center = _split_points(rings, ring_tolerance)
+
+    # 把每个环轮换到第一个分段点开始，末尾重复该点，分段都不跨越环的末尾
+    order, piece_start, piece_end, tangent1, tangent2, piece_ring = [], [], [], [], [], []
+    base = 0
+    for r, (points, kind) in enumerate(zip(splits, kinds)):
+        n = int(rings.counts[r])
+        start = int(rings.starts[r])
+        rolled = (np.arange(n + 1) + points[0]) % n + start
+        order.append(rolled)
+        local = [p - points[0] for p in points] + [n]
+        for j in range(len(points)):
+            a, b = local[j], local[j + 1]
+            end_kind = kind[(j + 1) % len(points)]
+            src_a, src_b = rolled[a], rolled[b]
+            piece_start.append(base + a)
+            piece_end.append(base + b)
+            tangent1.append(forward[src_a] if kind[j] else center[src_a])
+            tangent2.append(backward[src_b] if end_kind else -center[src_b])
+            piece_ring.append(r)
+        base += n + 1
+    order = np.concatenate(order)
+    data = rings.points[order]
+    center = center[order]
+    starts = np.array(piece_start)
+    ends = np.array(piece_end)
+    t1 = np.array(tangent1)
+    t2 = np.array(tangent2)
+    owner = np.array(piece_ring)
+
+    done_start, done_ctrl, done_points, done_u, done_piece = [], [], [], [], []
+    accepted = 0
+
+    def accept(ctrl, piece_starts, point_index, u, point_piece):
+        nonlocal accepted
+        done_start.append(piece_starts)
+        done_ctrl.append(ctrl)
+        done_points.append(point_index)
+        done_u.append(u)
+        done_piece.append(point_piece + accepted)
+        accepted += len(ctrl)
+
+    while len(starts):
+        counts = ends - starts + 1
+        line = counts == 2
+        if line.any():
+            # 只有两个点的分段是直线，控制点取在三等分点上
+            p0, p1 = data[starts[line]], data[ends[line]]
+            ctrl = np.stack([p0, p0 + (p1 - p0) / 3, p0 + 2 * (p1 - p0) / 3, p1], axis=1)
+            m = len(p0)
+            accept(ctrl, starts[line], np.stack([starts[line], ends[line]], axis=1).ravel(),
+                   np.tile([0.0, 1.0], m), np.repeat(np.arange(m), 2))
+            keep = ~line
+            starts, ends, t1, t2, owner, counts = (
+                a[keep] for a in (starts, ends, t1, t2, owner, counts))
+            if not len(starts):
+                break
+
+        m = len(starts)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        seg = np.repeat(np.arange(m), counts)
+        point_index = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+        points = data[point_index]
+        tol = ring_tolerance[owner]
+
+        # 弦长参数化
+        steps = np.hypot(*np.diff(points, axis=0).T)
+        steps[offsets[1:] - 1] = 0.0
+        cum = np.concatenate(([0.0], np.cumsum(steps)))
+        cum -= np.repeat(cum[offsets], counts)
+        lasts = offsets + counts - 1
+        u = cum / np.repeat(np.maximum(cum[lasts], 1e-12), counts)
+        first, last = points[offsets], points[lasts]
+
+        ctrl = _generate(points, u, seg, offsets, first, last, t1, t2)
+        error = np.hypot(*(_evaluate(ctrl[seg], u) - points).T)
+        worst = np.maximum.reduceat(error, offsets)
+        retry = (worst > tol) & (worst <= 2 * tol)
+        for _ in range(MAX_ITERATIONS):
+            if not retry.any():
+                break
+            # 只对接近容差的分段重新参数化并重新求解
+            sub = np.flatnonzero(retry)
+            mask = retry[seg]
+            sub_counts = counts[sub]
+            sub_offsets = np.concatenate(([0], np.cumsum(sub_counts)[:-1]))
+            sub_u = _reparameterize(ctrl[seg[mask]], points[mask], u[mask])
+            sub_u[sub_offsets] = 0.0
+            sub_u[sub_offsets + sub_counts - 1] = 1.0
+            u[mask] = sub_u
+            ctrl[sub] = _generate(points[mask], sub_u, np.repeat(np.arange(len(sub)), sub_counts),
+                                  sub_offsets, first[sub], last[sub], t1[sub], t2[sub])
+            error[mask] = np.hypot(*(_evaluate(ctrl[seg[mask]], sub_u) - points[mask]).T)
+            worst[sub] = np.maximum.reduceat(error[mask], sub_offsets)
+            retry[sub] = worst[sub] > tol[sub]
+
+        ok = worst <= tol
+        if ok.any():
+            mask = ok[seg]
+            renumber = np.cumsum(ok) - 1
+            accept(ctrl[ok], starts[ok], point_index[mask], u[mask], renumber[seg[mask]])
+        if ok.all():
+            break
+
+        # 在误差最大的内部点处分割
+        interior = error.copy()
+        interior[offsets] = -1.0
+        interior[lasts] = -1.0
+        peak = np.maximum.reduceat(interior, offsets)
+        hits = np.flatnonzero(interior == peak[seg])
+        _, first_hit = np.unique(seg[hits], return_index=True)
+        bad = ~ok
+        split = point_index[hits[first_hit]][bad]
+        s, e, a, b, o = starts[bad], ends[bad], t1[bad], t2[bad], owner[bad]
+        tc = center[split]
+        starts = np.concatenate([s, split])
+        ends = np.concatenate([split, e])
+        t1 = np.concatenate([a, tc])
+        t2 = np.concatenate([-tc, b])
+        owner = np.concatenate([o, o])
+
+    piece_starts = np.concatenate(done_start)
+    ctrl = np.concatenate(done_ctrl)
+    if integer:
+        ctrl = np.rint(ctrl)
+    # 按取整后的控制点计算每个原轮廓点到曲线上对应参数处的距离
+    point_piece = np.concatenate(done_piece)
+    error = np.hypot(*(_evaluate(ctrl[point_piece], np.concatenate(done_u))
+                       - data[np.concatenate(done_points)]).T)
+
+    sequence = np.argsort(piece_starts, kind='stable')
+    ctrl = ctrl[sequence]
+    ring_of_piece = np.searchsorted(np.cumsum(rings.counts + 1), piece_starts[sequence],
+                                    side='right')
+    piece_counts = np.bincount(ring_of_piece, minlength=len(fittable))
+    bounds = np.concatenate(([0], np.cumsum(piece_counts)))
+    dtype = np.int32 if integer else np.float64
+    for r, i in enumerate(fittable):
+        pieces = ctrl[bounds[r]:bounds[r + 1]]
+        fitted = np.vstack((pieces[:1, 0], pieces[:, 1:].reshape(-1, 2)))
+        results[i] = fitted.astype(dtype).reshape(-1, 1, 2)
+
+    report.update({
+        'max_error': round(float(error.max()), 3),
+        'mean_error': round(float(error.mean()), 3),
+        'segments': int(len(ctrl)),
+    })
+    return results, report
+
+
+def sample_curves(contour, per_segment=8):
+    """把拟合结果（3m+1 个点）按每段 per_segment 个点采样为折线；其他轮廓原样返回"""
+    points = np.asarray(contour, np.float64).reshape(-1, 2)
+    if len(points) < 7 or (len(points) - 1) % 3:
+        return contour
+    segments = len(points) // 3
+    index = 3 * np.arange(segments)[:, None] + np.arange(4)
+    ctrl = points[index]
+    u = np.tile(np.arange(per_segment) / per_segment, segments)
+    return _evaluate(np.repeat(ctrl, per_segment, axis=0), u).reshape(-1, 1, 2)
+
+
+def merge_reports(reports):
+    """合并多次拟合的报告（如多色模式的各颜色层）"""
+    reports = [report for report in reports if report]
+    if not reports:
+        return None
+    points = sum(report['input_points'] for report in reports)
+    return {
+        'tolerance': max(report['tolerance'] for report in reports),
+        'max_error': max(report['max_error'] for report in reports),
+        'mean_error': round(sum(report['mean_error'] * report['input_points']
+                                for report in reports) / max(points, 1), 3),
+        'input_points': points,
+        'segments': sum(report['segments'] for report in reports),
+    }
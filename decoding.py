@@ -0,0 +1,205 @@
+"""
+图像解码
+
+直接把上传的字节（bytes / memoryview / mmap）交给 cv2.imdecode，一次解码得到
+灰度数组（或彩色数组）和 alpha 通道，透明区域在原数组上就地置白，不经过
+PIL Image 与 NumPy 之间的多次整帧复制。JPEG 在允许降低分辨率时使用
+IMREAD_REDUCED_* 在解码阶段直接缩小。OpenCV 无法读取的格式回退到 PIL。
+多帧图像（GIF、APNG、WebP 动画）由 PIL 逐帧解码为完整画布。
+"""
+
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# 由OpenCV解码的格式（PIL识别出的格式名）
+OPENCV_FORMATS = ('PNG', 'JPEG')
+# 由OpenCV解码的颜色模式，其余模式（如CMYK、16位整数灰度）交给PIL，保持原有转换语义
+OPENCV_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA')
+# JPEG 降分辨率解码可用的缩小倍数
+_REDUCED_GRAY = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+_REDUCED_COLOR = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                  8: cv2.IMREAD_REDUCED_COLOR_8}
+
+
+class DecodedImage:
+    """解码结果"""
+
+    def __init__(self, pixels, has_transparency, width, height):
+        # 灰度模式为 HxW；彩色模式为 HxWx3 RGB，含透明度时为 HxWx4 RGBA
+        self.pixels = pixels
+        self.has_transparency = has_transparency
+        # 原图尺寸（降分辨率解码时 pixels 小于原图）
+        self.width = width
+        self.height = height
+
+
+class DecodedAnimation:
+    """多帧图像的解码结果"""
+
+    def __init__(self, frames, has_transparency, width, height, durations, loop):
+        # 各帧的像素数组（格式同 DecodedImage.pixels），均为完整画布
+        self.frames = frames
+        self.has_transparency = has_transparency
+        self.width = width
+        self.height = height
+        # 各帧的显示时长（毫秒），未指定时为0
+        self.durations = durations
+        # 播放次数，0表示无限循环
+        self.loop = loop
+
+
+def _as_buffer(image_data):
+    """取得输入数据的字节缓冲区（不复制）和用于读取文件头的文件对象"""
+    if hasattr(image_data, 'read') and not isinstance(image_data, (bytes, bytearray, memoryview)):
+        try:
+            # mmap 等对象同时支持缓冲区协议
+            buffer = memoryview(image_data)
+        except TypeError:
+            buffer = memoryview(image_data.read())
+            return buffer, io.BytesIO(buffer)
+        image_data.seek(0)
+        return buffer, image_data
+    buffer = memoryview(image_data)
+    header = io.BytesIO(image_data if isinstance(image_data, bytes) else buffer)
+    return buffer, header
+
+
+def reduction_factor(width, height, max_side):
+    """JPEG 降分辨率解码的最大缩小倍数，保证长边不小于 max_side"""
+    if not max_side:
+        return 1
+    for factor in (8, 4, 2):
+        if max(width, height) // factor >= max_side:
+            return factor
+    return 1
+
+
+def _to_uint8(array):
+    if array.dtype == np.uint16:
+        return (array >> 8).astype(np.uint8)
+    return array
+
+
+def _mask_transparent(gray, alpha):
+    """把 alpha < 128 的像素就地设为白色（背景）"""
+    transparent = cv2.threshold(alpha, 127, 255, cv2.THRESH_BINARY_INV)[1]
+    cv2.bitwise_or(gray, transparent, dst=gray)
+
+
+def _decode_opencv(buffer, color, with_alpha, factor):
+    data = np.frombuffer(buffer, dtype=np.uint8)
+    if with_alpha:
+        # IMREAD_IGNORE_ORIENTATION: 与PIL一致，不按EXIF方向旋转
+        decoded = cv2.imdecode(data, cv2.IMREAD_UNCHANGED | cv2.IMREAD_IGNORE_ORIENTATION)
+        if decoded is None or decoded.ndim != 3 or decoded.shape[2] != 4:
+            return None
+        decoded = _to_uint8(decoded)
+        if color:
+            return cv2.cvtColor(decoded, cv2.COLOR_BGRA2RGBA, dst=decoded)
+        gray = cv2.cvtColor(decoded, cv2.COLOR_BGRA2GRAY)
+        _mask_transparent(gray, decoded[..., 3])
+        return gray
+
+    if color:
+        flags = _REDUCED_COLOR.get(factor, cv2.IMREAD_COLOR)
+    else:
+        flags = _REDUCED_GRAY.get(factor, cv2.IMREAD_GRAYSCALE)
+    decoded = cv2.imdecode(data, flags | cv2.IMREAD_IGNORE_ORIENTATION)
+    if decoded is None:
+        return None
+    if color:
+        cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB, dst=decoded)
+    return decoded
+
+
+def _decode_pil(image, color, preserve_transparency):
+    """PIL回退路径"""
+    if color:
+        if preserve_transparency and image.mode == 'RGBA':
+            return np.asarray(image), True
+        return np.asarray(image.convert('RGB')), False
+    if preserve_transparency and image.mode == 'RGBA':
+        gray = np.array(image.convert('L'))
+        _mask_transparent(gray, np.asarray(image.getchannel('A')))
+        return gray, True
+    return np.asarray(image.convert('L')), False
+
+
+def decode_image(image_data, color=False, preserve_transparency=True, max_side=None):
+    """
+    解码图像
+
+    Args:
+        image_data: bytes、bytearray、memoryview，或支持缓冲区协议/read() 的文件对象（如mmap）
+        color: 是否保留颜色（彩色模式返回RGB/RGBA数组）
+        preserve_transparency: 是否处理透明度（只有RGBA图像视为透明）
+        max_side: 允许的最小处理长边，JPEG 可据此降分辨率解码；None表示按原分辨率解码
+
+    Returns:
+        DecodedImage
+    """
+    buffer, header = _as_buffer(image_data)
+    # 只读取文件头，获得格式、尺寸和颜色模式
+    image = Image.open(header)
+    width, height = image.size
+    with_alpha = preserve_transparency and image.mode == 'RGBA'
+
+    pixels = None
+    if image.format in OPENCV_FORMATS and image.mode in OPENCV_MODES:
+        factor = reduction_factor(width, height, max_side) if image.format == 'JPEG' else 1
+        pixels = _decode_opencv(buffer, color, with_alpha, factor)
+
+    if pixels is None:
+        pixels, with_alpha = _decode_pil(image, color, preserve_transparency)
+        if pixels.dtype != np.uint8:
+            pixels = pixels.astype(np.uint8)
+
+    return DecodedImage(pixels, with_alpha, width, height)
+
+
+def is_animated(image_data):
+    """是否为多帧图像（只读取文件头）"""
+    _, header = _as_buffer(image_data)
+    try:
+        image = Image.open(header)
+    except Exception:
+        return False
+    return getattr(image, 'n_frames', 1) > 1
+
+
+def decode_frames(image_data, color=False, preserve_transparency=True):
+    """
+    逐帧解码多帧图像
+
+    Args:
+        image_data: 同 decode_image
+        color: 是否保留颜色
+        preserve_transparency: 是否处理透明度（RGBA、LA或带透明色的调色板图像视为透明）
+
+    Returns:
+        DecodedAnimation
+    """
+    _, header = _as_buffer(image_data)
+    image = Image.open(header)
+    width, height = image.size
+    with_alpha = preserve_transparency and (
+        image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info)
+
+    frames = []
+    durations = []
+    for index in range(getattr(image, 'n_frames', 1)):
+        image.seek(index)
+        frame = image.convert('RGBA') if with_alpha else image
+        pixels, _ = _decode_pil(frame, color, with_alpha)
+        if pixels.dtype != np.uint8:
+            pixels = pixels.astype(np.uint8)
+        frames.append(pixels)
+        durations.append(int(image.info.get('duration') or 0))
+
+    # 未指定循环次数时只播放一次
+    loop = image.info.get('loop', 1)
+    return DecodedAnimation(frames, with_alpha, width, height, durations, loop)
@@ -0,0 +1,288 @@
+"""
+转换执行层
+
+将CPU密集的图片转SVG转换放到工作池中执行，避免阻塞FastAPI事件循环。
+支持进程池（默认）和线程池两种模式；进程模式下解码后的像素缓冲区通过
+共享内存传递给工作进程，只序列化共享内存名称和数组形状。
+多帧输入（animation 不为 'first' 时）把原始字节交给工作者，由工作者逐帧解码。
+可用核数拆分为 工作者数 × 每个工作者的算子线程数（OpenCV、BLAS/OpenMP），避免两层并行争抢CPU。
+工作进程由 forkserver（不支持时为 spawn）启动，而不是直接从服务进程 fork：服务进程在解码和预热时
+已经创建了 OpenCV/OpenMP 的内部线程，在有其他线程的进程中 fork 可能导致工作进程死锁或状态损坏。
+
+转换器及其依赖（OpenCV、NumPy、PIL）在第一次转换或预热时才导入，只导入本模块（如服务进程
+启动、不需要转换的接口）不加载这些库。
+"""
+
+import asyncio
+import contextlib
+import functools
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+from threads import apply_thread_limits, set_thread_env, split_cores
+
+
+def _process_context():
+    """工作进程的启动方式：forkserver 从单独启动的单线程进程派生工作进程，不支持时使用 spawn"""
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _env_int(name, default):
+    """读取整数环境变量"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return int(value)
+
+
+def _env_bool(name, default):
+    """读取布尔环境变量"""
+    value = os.environ.get(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class ExecutorConfig:
+    """工作池配置"""
+
+    def __init__(self,
+                 mode='process',
+                 max_workers=None,
+                 max_tasks_per_child=None,
+                 warmup=True,
+                 intra_op_threads=None,
+                 cores=None):
+        """
+        初始化工作池配置
+
+        Args:
+            mode: 执行模式 ('process', 'thread')
+            max_workers: 工作者数量，默认为 核数 / 算子线程数
+            max_tasks_per_child: 每个工作进程处理多少任务后重启（仅进程模式）
+            warmup: 是否在启动时预热每个工作者
+            intra_op_threads: 每个工作者的算子线程数（OpenCV、BLAS/OpenMP、分层和多帧线程池），
+                              默认为 核数 / 工作者数（两者都未设置时每个核一个单线程工作者）
+            cores: 拆分的核数，默认为当前进程可用的核数
+        """
+        if mode not in ('process', 'thread'):
+            raise ValueError(f"不支持的执行模式: {mode}")
+        self.mode = mode
+        self.max_workers, self.intra_op_threads = split_cores(cores, max_workers,
+                                                              intra_op_threads)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.warmup = warmup
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取配置"""
+        return cls(
+            mode=os.environ.get("PNG2SVG_EXECUTOR", "process"),
+            max_workers=_env_int("PNG2SVG_WORKERS", None),
+            max_tasks_per_child=_env_int("PNG2SVG_MAX_TASKS_PER_CHILD", None),
+            warmup=_env_bool("PNG2SVG_WARMUP", True),
+            intra_op_threads=_env_int("PNG2SVG_INTRA_OP_THREADS", None),
+            cores=_env_int("PNG2SVG_CPU_CORES", None),
+        )
+
+
+def _warmup_png():
+    """生成用于预热的小PNG图像"""
+    import cv2
+    import numpy as np
+
+    image = np.full((32, 32), 255, np.uint8)
+    image[8:24, 8:24] = 0
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+def warmup_worker():
+    """
+    预热工作者：完整转换一个极小的PNG（解码、流水线、SVG生成）
+
+    触发转换器依赖的导入和 OpenCV、PIL 等库的首次调用初始化，使第一个请求不再承担这些开销。
+    """
+    from converter import ImageToSVGConverter
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ImageToSVGConverter().convert(_warmup_png())
+    return os.getpid()
+
+
+def _worker_init(warmup, intra_op_threads=None):
+    """工作进程初始化函数：先设置算子线程数，再按需预热"""
+    if intra_op_threads:
+        # 每个工作进程只有自己一个工作者使用分层/多帧线程池
+        apply_thread_limits(intra_op_threads, workers=1)
+    if warmup:
+        warmup_worker()
+
+
+def _run_shared(method, shm_name, shape, has_transparency, config, source_size=None,
+                finish=None):
+    """在工作进程中从共享内存读取像素，执行转换器的指定方法；finish 不为None时再处理方法的结果"""
+    import numpy as np
+    from converter import ImageToSVGConverter
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        gray_array = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        converter = ImageToSVGConverter(**config)
+        result = getattr(converter, method)(gray_array, has_transparency, source_size)
+        return result if finish is None else finish(converter, result)
+    finally:
+        # 释放对共享缓冲区的引用后才能关闭
+        gray_array = None
+        shm.close()
+
+
+def _convert_bytes(image_data, config):
+    """在工作线程中直接转换原始图像数据"""
+    from converter import ImageToSVGConverter
+
+    return ImageToSVGConverter(**config).convert(image_data)
+
+
+def _trace_bytes(image_data, config, finish=None):
+    """在工作线程中直接追踪原始图像数据的轮廓；finish 不为None时再处理追踪结果"""
+    from converter import ImageToSVGConverter
+
+    converter = ImageToSVGConverter(**config)
+    trace = converter.trace(image_data)
+    return trace if finish is None else finish(converter, trace)
+
+
+class ConversionExecutor:
+    """在进程池或线程池中执行转换"""
+
+    def __init__(self, config=None):
+        self.config = config or ExecutorConfig.from_env()
+        self._pool = None
+
+    @property
+    def started(self):
+        return self._pool is not None
+
+    def start(self):
+        """创建工作池并按需预热"""
+        if self._pool is not None:
+            return
+        cfg = self.config
+        if cfg.mode == 'process':
+            # 先启动资源跟踪进程，使工作进程共享它，避免共享内存被重复清理
+            resource_tracker.ensure_running()
+            # 工作进程继承环境变量，BLAS/OpenMP 在加载时按此创建线程池
+            set_thread_env(cfg.intra_op_threads)
+            kwargs = {}
+            if cfg.max_tasks_per_child:
+                kwargs['max_tasks_per_child'] = cfg.max_tasks_per_child
+            self._pool = ProcessPoolExecutor(
+                max_workers=cfg.max_workers,
+                mp_context=_process_context(),
+                initializer=_worker_init,
+                initargs=(cfg.warmup, cfg.intra_op_threads),
+                **kwargs,
+            )
+            if cfg.warmup:
+                # 提交与工作者数量相同的任务，确保所有进程都已启动并预热
+                futures = [self._pool.submit(os.getpid) for _ in range(cfg.max_workers)]
+                for future in futures:
+                    future.result()
+        else:
+            # 线程模式下所有工作者共用本进程的算子线程设置，分层/多帧线程池按工作者数放大
+            apply_thread_limits(cfg.intra_op_threads, workers=cfg.max_workers)
+            self._pool = ThreadPoolExecutor(
+                max_workers=cfg.max_workers,
+                thread_name_prefix="png2svg",
+            )
+            if cfg.warmup:
+                self._pool.submit(warmup_worker).result()
+
+    def warm_up(self):
+        """
+        启动并预热工作池，再预热本进程，返回各部分耗时（秒）
+
+        服务在报告就绪之前调用。工作进程在各自的初始化函数中完整转换一次；本进程也转换一次，
+        因为进程模式下解码在本进程执行。工作进程不从本进程 fork（见 _process_context），
+        两者的预热互不影响。
+        """
+        start = time.perf_counter()
+        self.start()
+        workers = time.perf_counter() - start
+        warmup_worker()
+        return {'local': time.perf_counter() - start - workers, 'workers': workers}
+
+    def shutdown(self):
+        """关闭工作池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    async def _submit(self, method, bytes_func, image_data, config, finish=None):
+        if self._pool is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+
+        if self.config.mode == 'thread':
+            return await loop.run_in_executor(self._pool, bytes_func, image_data, config)
+
+        import numpy as np
+        from converter import ImageToSVGConverter
+        from decoding import is_animated
+
+        converter = ImageToSVGConverter(**config)
+        if converter.animation != 'first' and is_animated(image_data):
+            # 多帧输入的各帧在工作进程中解码和追踪
+            return await loop.run_in_executor(self._pool, bytes_func, image_data, config)
+
+        # 进程模式：在默认线程池中解码（解码会释放GIL），再通过共享内存交给工作进程
+        gray_array, has_transparency = await loop.run_in_executor(
+            None, converter.decode, image_data
+        )
+        shape = gray_array.shape
+        shm = shared_memory.SharedMemory(create=True, size=max(gray_array.nbytes, 1))
+        try:
+            shared = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            shared[...] = gray_array
+            del shared, gray_array
+            result = await loop.run_in_executor(
+                self._pool, _run_shared, method, shm.name, shape, has_transparency, config,
+                converter.source_size, finish
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+        # 解码在本进程完成，把解码耗时合并到工作进程返回的阶段耗时中
+        if hasattr(result, 'stage_timings'):
+            result.stage_timings = {**converter.stage_timings, **result.stage_timings}
+        return result
+
+    async def run(self, image_data, **config):
+        """异步执行转换，返回SVG字符串"""
+        return await self._submit('convert_array', _convert_bytes, image_data, config)
+
+    async def trace(self, image_data, **config):
+        """异步执行图像处理和轮廓追踪，返回 TraceResult，SVG由调用方流式生成"""
+        return await self._submit('trace_array', _trace_bytes, image_data, config)
+
+    async def trace_then(self, finish, image_data, **config):
+        """
+        异步执行轮廓追踪，并在同一个工作者中调用 finish(converter, trace)，返回其结果
+
+        finish 须为可序列化的顶层函数（可用 functools.partial 绑定参数）。用于在工作者中
+        生成并写出SVG：SVG生成是纯Python代码，在调用方的线程中执行会被GIL串行化。
+        """
+        return await self._submit('trace_array', functools.partial(_trace_bytes, finish=finish),
+                                  image_data, config, finish)
+
+    async def call(self, func, *args):
+        """在工作池中执行任意可序列化的顶层函数（如异步任务），返回其结果"""
+        if self._pool is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, func, *args)
@@ -0,0 +1,186 @@
+"""
+形状实例化
+
+图标网格、图案和文字图像中同一形状会出现很多次。把每个简化后的轮廓按平移
+（可选再按90°旋转和整数缩放）归一化，以归一化坐标的字节作为键建立哈希索引；
+重复出现的形状只在 <defs> 中写一次，各处用带 transform 的 <use> 引用。
+
+归一化对全部轮廓拼接成的一个数组做向量化计算，每个轮廓只剩一次字节切片和一次
+字典查找，数万个轮廓也能很快完成。
+
+- 'translate': 只按平移归一化，点序不变，输出的几何形状与不实例化时完全相同
+- 'rotate': 额外尝试 0/90/180/270° 旋转，点序轮换到统一的起点（最上、最左的点）
+- 'full': 再除以坐标的最大公约数，匹配按整数倍缩放的形状
+旋转和缩放都是精确匹配，不引入坐标误差；但起点轮换后曲线控制点的分组可能与
+原轮廓不同。
+"""
+
+import numpy as np
+
+from svg_path import encode_contour
+from svg_writer import LAYER_PATH, PATH_ELEMENT, USE_ELEMENT
+
+INSTANCING_MODES = ('off', 'translate', 'rotate', 'full')
+
+# 旋转 k×90° 后的坐标：SVG 的 rotate(90) 把 (x, y) 映射为 (-y, x)
+_ROTATIONS = (
+    lambda x, y: (x, y),
+    lambda x, y: (-y, x),
+    lambda x, y: (-x, -y),
+    lambda x, y: (y, -x),
+)
+
+
+class Instance:
+    """一个重复出现的形状"""
+
+    def __init__(self, shape_id, points):
+        self.shape_id = shape_id
+        # 归一化后的轮廓点（包围盒左上角为原点），作为 <defs> 中的路径
+        self.points = points
+        self.count = 0
+
+
+class InstanceIndex:
+    """形状索引：每个轮廓对应的实例和变换"""
+
+    def __init__(self, instances, placements):
+        # 需要写入 <defs> 的实例，按首次出现的顺序排列
+        self.instances = instances
+        # 与输入轮廓一一对应：(Instance, transform文本) 或 None（直接输出路径）
+        self.placements = placements
+
+    @property
+    def instanced_count(self):
+        return sum(placement is not None for placement in self.placements)
+
+
+def _segments(contours):
+    """把轮廓拼接成一个数组，返回 (点, 各轮廓起始位置, 长度)"""
+    lengths = np.array([len(c) for c in contours], np.int64)
+    points = np.concatenate([np.asarray(c).reshape(-1, 2) for c in contours]).astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return points, offsets, lengths
+
+
+def _normalize(points, offsets, lengths, rotation, roll, scale):
+    """
+    按旋转、平移（和缩放）归一化全部轮廓
+
+    Returns:
+        (归一化坐标, 各轮廓包围盒左上角, 各轮廓缩放倍数)
+    """
+    x, y = _ROTATIONS[rotation](points[:, 0], points[:, 1])
+    rotated = np.column_stack((x, y))
+    origins = np.minimum.reduceat(rotated, offsets, axis=0)
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    relative = rotated - origins[segment]
+
+    factors = np.ones(len(lengths), np.int64)
+    if scale:
+        factors = np.gcd.reduceat(np.gcd(relative[:, 0], relative[:, 1]), offsets)
+        factors[factors == 0] = 1
+        relative //= factors[segment][:, None]
+
+    if roll:
+        # 轮换点序，从最上（y最小）、最左的点开始
+        key = relative[:, 1] * (1 << 32) + relative[:, 0]
+        smallest = np.minimum.reduceat(key, offsets)
+        hits = np.flatnonzero(key == smallest[segment])
+        _, first = np.unique(segment[hits], return_index=True)
+        starts = hits[first] - offsets
+        position = np.arange(len(points)) - offsets[segment]
+        source = offsets[segment] + (position + starts[segment]) % lengths[segment]
+        relative = relative[source]
+    return relative, origins, factors
+
+
+def _transform(tx, ty, rotation, factor):
+    parts = [f"translate({tx} {ty})"]
+    if rotation:
+        parts.append(f"rotate({-90 * rotation % 360})")
+    if factor != 1:
+        parts.append(f"scale({factor})")
+    return ' '.join(parts)
+
+
+def build_index(contours, mode='translate', encode=None, min_count=2, layered=False):
+    """
+    建立形状索引
+
+    Args:
+        contours: 简化后的轮廓列表
+        mode: 'translate', 'rotate' 或 'full'
+        encode: 路径编码函数（默认 encode_contour），用于判断实例化是否更短
+        min_count: 至少出现多少次才实例化
+        layered: 是否为多色分层输出（决定直接输出路径时的元素长度）
+
+    Returns:
+        InstanceIndex
+    """
+    if mode not in INSTANCING_MODES or mode == 'off':
+        raise ValueError(f"不支持的实例化方式: {mode}，可选 {INSTANCING_MODES[1:]}")
+    encode = encode or encode_contour
+    if not contours:
+        return InstanceIndex([], [])
+    simple = [i for i, contour in enumerate(contours) if isinstance(contour, np.ndarray)]
+    if len(simple) < len(contours):
+        # 带孔洞的复合轮廓（孔洞模式）不参与实例化，直接输出
+        index = build_index([contours[i] for i in simple], mode, encode, min_count, layered)
+        placements = [None] * len(contours)
+        for i, placement in zip(simple, index.placements):
+            placements[i] = placement
+        return InstanceIndex(index.instances, placements)
+
+    points, offsets, lengths = _segments(contours)
+    rotations = range(4) if mode in ('rotate', 'full') else range(1)
+    roll = mode != 'translate'
+    candidates = [_normalize(points, offsets, lengths, r, roll, mode == 'full')
+                  for r in rotations]
+
+    ends = (offsets + lengths).tolist()
+    starts = offsets.tolist()
+    buffers = [relative.astype(np.int32).tobytes() for relative, _, _ in candidates]
+    # 包围盒左上角按旋转的逆变换回原图坐标，一次性算出全部轮廓的平移量
+    translations = []
+    for rotation, (_, origins, factors) in enumerate(candidates):
+        ox, oy = _ROTATIONS[(4 - rotation) % 4](origins[:, 0], origins[:, 1])
+        translations.append(list(zip(ox.tolist(), oy.tolist(), factors.tolist())))
+
+    shapes = {}
+    matches = []
+    for start, end in zip(starts, ends):
+        # 各旋转中字节最小的作为规范形式
+        keys = [buffer[start * 8:end * 8] for buffer in buffers]
+        key = min(keys)
+        rotation = keys.index(key)
+        instance = shapes.get(key)
+        if instance is None:
+            relative = candidates[rotation][0][start:end]
+            instance = shapes[key] = Instance(None, relative.reshape(-1, 1, 2).astype(np.int32))
+        instance.count += 1
+        matches.append((instance, rotation))
+
+    # 直接输出路径和输出 <use> 时除路径数据和 transform 之外的字符数
+    inline_overhead = len((LAYER_PATH if layered else PATH_ELEMENT).format(d=''))
+    use_overhead = len(USE_ELEMENT.format(id='s0', transform=''))
+    instances = []
+    placements = []
+    path_lengths = {}
+    for i, (instance, rotation) in enumerate(matches):
+        if instance.count < min_count:
+            placements.append(None)
+            continue
+        if id(instance) not in path_lengths:
+            path_lengths[id(instance)] = len(encode(instance.points))
+        tx, ty, factor = translations[rotation][i]
+        transform = _transform(tx, ty, rotation, factor)
+        # 引用不比直接写出路径更短时不实例化（很小的形状）
+        if path_lengths[id(instance)] + inline_overhead <= use_overhead + len(transform):
+            placements.append(None)
+            continue
+        if instance.shape_id is None:
+            instance.shape_id = f"s{len(instances)}"
+            instances.append(instance)
+        placements.append((instance, transform))
+    return InstanceIndex(instances, placements)
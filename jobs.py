@@ -0,0 +1,378 @@
+"""
+异步转换任务
+
+超大扫描件的转换时间可能超过负载均衡器的HTTP超时。任务接口提交后立即返回任务ID，
+转换在本地工作池中执行，任务状态保存在本地 SQLite 任务库中，输入和结果文件保存在
+同一目录下，不依赖外部服务：
+
+- 进度按流水线阶段记录：工作者在每个阶段开始时直接写入任务库（进程模式下同样可用）
+- 取消：排队中的任务不再执行；执行中的任务在下一个阶段开始时停止
+- 重启后重新执行：服务重启后，未完成的任务重新排队，从头开始转换（不保存中间结果，
+  不从中断的阶段继续）；多次中断的任务标记为失败
+- 完成、失败和取消的任务超过保留时间（TTL）后连同结果文件一起清理
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from svg_writer import iter_encoded
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+JOB_STATES = (QUEUED, RUNNING) + FINISHED_STATES
+
+# 各阶段开始时的名义进度；实际经过哪些阶段取决于配置（分块、多色、动画等）
+STAGE_PROGRESS = {
+    'decode': 0.0,
+    'downscale': 0.1,
+    'analyze': 0.1,
+    'frame_diff': 0.1,
+    'preprocess': 0.15,
+    'tiled_binarize': 0.15,
+    'quantize': 0.2,
+    'frames': 0.2,
+    'threshold': 0.3,
+    'morphology': 0.4,
+    'layers': 0.4,
+    'contours': 0.55,
+    'simplify': 0.65,
+    'rescale': 0.75,
+    'instancing': 0.8,
+    'svg': 0.85,
+}
+
+# 执行中被服务重启打断的任务最多执行的次数，超过后标记失败（避免导致崩溃的输入反复执行）
+MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    config TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    stage_timings TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_bytes INTEGER,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobCancelled(Exception):
+    """执行中的任务已被取消"""
+
+
+class JobStore:
+    """SQLite 任务库"""
+
+    def __init__(self, directory, ttl=3600.0):
+        """
+        初始化任务库（第一次使用时才创建目录和数据库）
+
+        Args:
+            directory: 任务目录，包含 jobs.sqlite3、inputs/ 和 results/
+            ttl: 任务结束后保留状态和结果的秒数
+        """
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.path = self.directory / 'jobs.sqlite3'
+        self._initialized = False
+
+    @classmethod
+    def from_env(cls):
+        """从环境变量读取配置"""
+        return cls(
+            directory=os.environ.get("PNG2SVG_JOB_DIR", "jobs"),
+            ttl=float(os.environ.get("PNG2SVG_JOB_TTL", 3600)),
+        )
+
+    @property
+    def exists(self):
+        return self.path.exists()
+
+    @contextmanager
+    def _connect(self):
+        # 每次操作使用独立的连接：任务库会在事件循环、工作线程和工作进程中同时访问
+        if not self._initialized:
+            self._initialize()
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _initialize(self):
+        (self.directory / 'inputs').mkdir(parents=True, exist_ok=True)
+        (self.directory / 'results').mkdir(exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            # WAL 模式下读取状态不会被工作者写入进度阻塞
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+        self._initialized = True
+
+    def input_path(self, job_id):
+        return self.directory / 'inputs' / job_id
+
+    def result_path(self, job_id):
+        return self.directory / 'results' / f"{job_id}.svg"
+
+    def create(self, image_data, config, filename=None):
+        """保存输入并创建排队中的任务，返回任务ID"""
+        job_id = uuid.uuid4().hex
+        if not self._initialized:
+            self._initialize()
+        partial = self.input_path(job_id).with_suffix('.part')
+        partial.write_bytes(image_data)
+        partial.replace(self.input_path(job_id))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, config, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, json.dumps(config), now, now))
+        return job_id
+
+    def get(self, job_id):
+        """任务状态字典，任务不存在时返回 None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['config'] = json.loads(job['config'])
+        job['stage_timings'] = json.loads(job['stage_timings'] or '{}')
+        job['expires'] = job['finished'] + self.ttl if job['finished'] is not None else None
+        return job
+
+    def ids(self, status):
+        """某个状态的任务ID，按创建时间排列"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created",
+                                (status,)).fetchall()
+        return [row['id'] for row in rows]
+
+    def counts(self):
+        """各状态的任务数量"""
+        counts = dict.fromkeys(JOB_STATES, 0)
+        with self._connect() as conn:
+            for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+                counts[row['status']] = row['n']
+        return counts
+
+    def _transition(self, job_id, from_states, assignments, params=()):
+        """只在任务处于 from_states 之一时更新，返回是否更新成功"""
+        placeholders = ', '.join('?' * len(from_states))
+        with self._connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET {assignments}, updated = ? "
+                f"WHERE id = ? AND status IN ({placeholders})",
+                (*params, time.time(), job_id, *from_states))
+            return cursor.rowcount == 1
+
+    def start(self, job_id):
+        """排队中的任务开始执行；任务已取消或不存在时返回 False"""
+        return self._transition(job_id, (QUEUED,), "status = ?, attempts = attempts + 1",
+                                (RUNNING,))
+
+    def report_stage(self, job_id, stage):
+        """记录执行中任务的当前阶段和进度；任务已不在执行中（已取消）时返回 False"""
+        return self._transition(job_id, (RUNNING,), "stage = ?, progress = MAX(progress, ?)",
+                                (stage, STAGE_PROGRESS.get(stage, 0.0)))
+
+    def complete(self, job_id, result_bytes, stage_timings):
+        """任务完成；执行期间已被取消时返回 False"""
+        done = self._transition(
+            job_id, (RUNNING,),
+            "status = ?, progress = 1, result_bytes = ?, stage_timings = ?, finished = ?",
+            (DONE, result_bytes, json.dumps(stage_timings), time.time()))
+        self.input_path(job_id).unlink(missing_ok=True)
+        return done
+
+    def fail(self, job_id, error):
+        """执行中的任务失败"""
+        failed = self._transition(job_id, (RUNNING,), "status = ?, error = ?, finished = ?",
+                                  (FAILED, error, time.time()))
+        self.input_path(job_id).unlink(missing_ok=True)
+        return failed
+
+    def cancel(self, job_id):
+        """取消排队中或执行中的任务，返回是否取消成功"""
+        cancelled = self._transition(job_id, (QUEUED, RUNNING), "status = ?, finished = ?",
+                                     (CANCELLED, time.time()))
+        if cancelled:
+            # 执行中的任务可能仍在读取输入（POSIX下删除不影响已打开的文件）
+            self.input_path(job_id).unlink(missing_ok=True)
+        return cancelled
+
+    def delete(self, job_id):
+        """删除任务记录和文件"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self.input_path(job_id).unlink(missing_ok=True)
+        self.result_path(job_id).unlink(missing_ok=True)
+
+    def recover(self):
+        """
+        服务启动时重新排队未完成的任务
+
+        执行中的任务（上次运行时被中断）重置进度后重新排队，之后从头执行，
+        已执行 MAX_ATTEMPTS 次的标记为失败。
+
+        Returns:
+            需要执行的任务ID，按创建时间排列
+        """
+        for job_id in self.ids(RUNNING):
+            job = self.get(job_id)
+            if job['attempts'] >= MAX_ATTEMPTS:
+                self.fail(job_id, f"任务执行 {job['attempts']} 次均被中断")
+            else:
+                self._transition(job_id, (RUNNING,), "status = ?, stage = NULL, progress = 0",
+                                 (QUEUED,))
+        return self.ids(QUEUED)
+
+    def cleanup(self, now=None):
+        """删除结束超过 TTL 的任务，返回删除的数量"""
+        cutoff = (now or time.time()) - self.ttl
+        placeholders = ', '.join('?' * len(FINISHED_STATES))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({placeholders}) AND finished < ?",
+                (*FINISHED_STATES, cutoff)).fetchall()
+        for row in rows:
+            self.delete(row['id'])
+        return len(rows)
+
+
+def run_job(store, job_id):
+    """
+    在工作者（线程或进程）中执行一个已开始的任务
+
+    每个阶段开始时写入进度并检查是否已被取消；SVG 流式写入结果文件。
+
+    Returns:
+        任务的最终状态
+    """
+    job = store.get(job_id)
+    if job is None or job['status'] != RUNNING:
+        return job['status'] if job else None
+
+    def listener(stage):
+        if not store.report_stage(job_id, stage):
+            raise JobCancelled(job_id)
+
+    from converter import ImageToSVGConverter
+
+    converter = ImageToSVGConverter(**job['config'])
+    converter.stage_listener = listener
+    result_path = store.result_path(job_id)
+    partial = result_path.with_suffix('.part')
+    try:
+        image_data = store.input_path(job_id).read_bytes()
+        trace = converter.trace(image_data)
+        with converter.stage('svg'):
+            with open(partial, 'wb') as f:
+                for chunk in iter_encoded(converter.iter_svg(trace)):
+                    f.write(chunk)
+    except JobCancelled:
+        partial.unlink(missing_ok=True)
+        return CANCELLED
+    except Exception as e:
+        partial.unlink(missing_ok=True)
+        # 取消后删除了输入文件时读取会失败，此时任务保持已取消状态
+        return FAILED if store.fail(job_id, str(e)) else CANCELLED
+    partial.replace(result_path)
+    if not store.complete(job_id, result_path.stat().st_size, converter.stage_timings):
+        result_path.unlink(missing_ok=True)
+        return CANCELLED
+    return DONE
+
+
+class JobManager:
+    """把任务库中排队的任务交给转换工作池执行，并定期清理过期任务"""
+
+    def __init__(self, store, executor, concurrency=2):
+        """
+        Args:
+            store: JobStore
+            executor: executor.ConversionExecutor
+            concurrency: 同时执行的任务数
+        """
+        self.store = store
+        self.executor = executor
+        self.concurrency = concurrency
+        self._queue = None
+        self._tasks = []
+
+    @classmethod
+    def from_env(cls, executor):
+        """从环境变量读取配置"""
+        return cls(JobStore.from_env(), executor,
+                   concurrency=int(os.environ.get("PNG2SVG_JOB_WORKERS", 2)))
+
+    @property
+    def started(self):
+        return bool(self._tasks)
+
+    async def start(self):
+        """重新排队上次运行时未完成的任务并启动执行和清理协程"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        if self.store.exists:
+            for job_id in await asyncio.to_thread(self.store.recover):
+                self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._cleanup_loop()))
+
+    async def stop(self):
+        """停止执行协程；执行中的任务留在任务库中，下次启动时重新执行"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, image_data, config, filename=None):
+        """保存任务并排队，返回任务ID"""
+        await self.start()
+        job_id = await asyncio.to_thread(self.store.create, image_data, config, filename)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            if not await asyncio.to_thread(self.store.start, job_id):
+                continue  # 排队期间已取消
+            try:
+                await self.executor.call(run_job, self.store, job_id)
+            except Exception as e:
+                # 工作进程崩溃等，run_job 本身的异常已记录在任务库中
+                await asyncio.to_thread(self.store.fail, job_id, str(e))
+
+    async def _cleanup_loop(self):
+        interval = min(max(self.store.ttl / 10, 1.0), 60.0)
+        while True:
+            await asyncio.sleep(interval)
+            if self.store.exists:
+                await asyncio.to_thread(self.store.cleanup)
@@ -1,10 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query
-from fastapi.responses import HTMLResponse, Response
-from pydantic import BaseModel
-from typing import Optional
+import time
+
+# 模块开始导入的时间（包括 FastAPI 等依赖），用于报告启动耗时
+_IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import asyncio
 import io
-from converter import png_to_svg, ImageToSVGConverter
-from xmi_logger import XmiLogger
+import json
+import zipfile
+from executor import ConversionExecutor
+from cache import ConversionCache, make_cache_key
+from admission import AdmissionController, AdmissionRejected
+from jobs import DONE, FINISHED_STATES, JobManager
+from svg_writer import iter_encoded
+from compression import OUTPUT_FORMATS, CompressionConfig, iter_compressed, negotiate
+from starlette.routing import Match
+import metrics
+from batch import (
+    SUPPORTED_EXTENSIONS, BatchLimits, BatchTooLarge, MultipartStreamWriter, ZipStreamWriter,
+    extract_zip_images, is_supported, is_zip, output_names, parse_batch_configs,
+)
 
 
 description = """
@@ -29,6 +47,20 @@ class ConversionConfig(BaseModel):
     min_contour_area: int = 50
     edge_detection: bool = True
     preserve_transparency: bool = True
+    tile_size: Optional[int] = Field(None, ge=1)  # 超大图像分块处理的分块大小
+    color_mode: str = "mono"  # 'mono', 'color'
+    num_colors: int = 8  # 多色模式的颜色数
+    quantize_method: str = "kmeans"  # 'kmeans', 'median_cut'
+    quality: str = "standard"  # 'preview', 'standard', 'high'
+    compact: bool = False  # 紧凑SVG输出
+    precision: Optional[int] = None  # 坐标小数位数
+    animation: str = "first"  # 多帧输入: 'first', 'frames', 'smil'
+    instancing: str = "off"  # 形状实例化: 'off', 'translate', 'rotate', 'full'
+    holes: bool = False  # 保留孔洞（evenodd复合路径）
+    max_bytes: Optional[int] = None  # 输出字节数预算
+    max_points: Optional[int] = None  # 输出点数预算
+    fit_tolerance: Optional[float] = None  # 曲线拟合容差（像素）
+    route: str = "fixed"  # 流水线选择: 'fixed', 'auto'（按内容分析选择）
 
 """ 
 初始化日志记录器 
@@ -38,9 +70,23 @@ class ConversionConfig(BaseModel):
   - 单个日志文件体积最大值 max_size (MB) 
   - 日志保留策略 retention (e.g., "7 days") 
 
-
+日志库在第一次写日志时才导入和创建，缩短服务和只导入本模块的工具的启动时间。
 """ 
-logger = XmiLogger( 
+class _LazyLogger:
+    """第一次访问时创建 XmiLogger 的代理"""
+
+    def __init__(self, **options):
+        self._options = options
+        self._logger = None
+
+    def __getattr__(self, name):
+        if self._logger is None:
+            from xmi_logger import XmiLogger
+            self._logger = XmiLogger(**self._options)
+        return getattr(self._logger, name)
+
+
+logger = _LazyLogger( 
     file_name="app_log", 
     log_dir="logs", 
     max_size=20, 
@@ -56,6 +102,399 @@ app = FastAPI(
     version="2.0.0",
     )
 
+"""
+转换工作池
+可通过环境变量配置:
+  - PNG2SVG_EXECUTOR: 执行模式 process / thread (默认 process)
+  - PNG2SVG_WORKERS: 工作者数量 (默认 核数 / 算子线程数)
+  - PNG2SVG_INTRA_OP_THREADS: 每个工作者的算子线程数 (默认 核数 / 工作者数)
+  - PNG2SVG_CPU_CORES: 拆分的核数 (默认可用核数)
+  - PNG2SVG_MAX_TASKS_PER_CHILD: 每个工作进程最多处理的任务数
+  - PNG2SVG_WARMUP: 启动时是否预热 (默认 true)；预热时服务启动阶段先创建工作池并让每个工作者
+    完整转换一个极小的PNG，再在本进程转换一次，完成后 /health/ready 才报告就绪；关闭时工作池在
+    第一个转换请求时创建，启动后立即就绪
+"""
+executor = ConversionExecutor()
+
+"""
+转换结果缓存
+可通过环境变量配置:
+  - PNG2SVG_CACHE_ENTRIES: 内存层最大条目数，0表示关闭内存层 (默认 256)
+  - PNG2SVG_CACHE_MEMORY_MB: 内存层最大占用 (默认 64MB)
+  - PNG2SVG_CACHE_DIR: 磁盘层目录，不设置则不启用磁盘层
+  - PNG2SVG_CACHE_DISK_MB: 磁盘层最大占用 (默认 512MB)
+"""
+result_cache = ConversionCache.from_env()
+
+"""
+准入控制
+可通过环境变量配置:
+  - PNG2SVG_MAX_CONCURRENT: 同时执行的转换请求上限 (默认CPU核数的2倍，0表示不限制)
+  - PNG2SVG_MAX_QUEUE: 等待队列最大长度 (默认 64)
+  - PNG2SVG_QUEUE_TIMEOUT: 排队等待超时秒数 (默认 30)
+  - PNG2SVG_PRIORITY_WEIGHT: 每MB上传推迟出队的秒数，小请求优先 (默认 1，0表示先到先服务)
+"""
+admission = AdmissionController()
+
+"""
+异步转换任务
+可通过环境变量配置:
+  - PNG2SVG_JOB_DIR: 任务库目录 (默认 jobs)
+  - PNG2SVG_JOB_TTL: 任务结束后保留结果的秒数 (默认 3600)
+  - PNG2SVG_JOB_WORKERS: 同时执行的任务数 (默认 2)
+"""
+job_manager = JobManager.from_env(executor)
+
+"""
+批量转换限制
+可通过环境变量配置:
+  - PNG2SVG_BATCH_MAX_ITEMS: 每个请求最多转换的文件数 (默认 256)
+  - PNG2SVG_BATCH_MAX_FILE_MB: ZIP中单个文件解压后的最大大小 (默认 64MB)
+  - PNG2SVG_BATCH_MAX_TOTAL_MB: ZIP中所有图片解压后的总大小 (默认 512MB)
+  - PNG2SVG_BATCH_CONCURRENCY: 每个请求同时转换的文件数 (默认与工作者数量相同)
+"""
+batch_limits = BatchLimits.from_env()
+
+# 受准入控制的转换端点
+ADMITTED_ENDPOINTS = {'convert_png', 'api_convert_png', 'api_convert_with_preset', 'api_convert_batch'}
+
+
+def validate_config(config):
+    """
+    在转换之前检查配置（阈值方法、质量档位、动画、实例化、流水线选择等取值），无效时返回400
+
+    这些取值由转换器构造时校验，否则会在转换过程中作为转换错误返回500。
+    """
+    from converter import ImageToSVGConverter
+
+    try:
+        ImageToSVGConverter(**config)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"配置无效: {str(e)}")
+
+
+async def stream_conversion(contents, config, preset="custom", trace_report=None):
+    """
+    执行转换并返回SVG字节分块迭代器
+    
+    命中缓存时直接返回缓存结果；否则在工作池中完成图像处理和轮廓追踪，
+    SVG文本在响应发送过程中流式生成。并发的相同请求共享同一次追踪。
+    trace_report 为字典时写入追踪报告：'budget' 为输出预算的搜索结果（设置了
+    max_bytes/max_points 时），'curve_fit' 为曲线拟合报告（设置了 fit_tolerance 时），
+    'route' 为内容路由的决策（route='auto' 时）。
+    """
+    from converter import ImageToSVGConverter
+
+    converter = ImageToSVGConverter(**config)
+    normalized = converter.config_dict()
+    labels = {'threshold_method': normalized['threshold_method'], 'preset': preset}
+    
+    key = None
+    if result_cache.enabled:
+        key = make_cache_key(contents, normalized)
+        cached = await result_cache.aget(key)
+        if cached is not None:
+            cached, report = _split_cached(cached)
+            if trace_report is not None:
+                trace_report.update(report)
+            encoded = cached.encode('utf-8')
+            metrics.OUTPUT_BYTES.observe(float(len(encoded)), **labels)
+            return iter((encoded,))
+    
+    async def traced():
+        trace_result = await executor.trace(contents, **config)
+        metrics.record_trace(trace_result, **labels)
+        return trace_result
+    
+    try:
+        with metrics.CONVERSIONS_IN_FLIGHT.track_inprogress():
+            if key is None:
+                trace = await traced()
+            else:
+                trace = await result_cache.acoalesce(f"trace:{key}", traced)
+    except Exception:
+        metrics.CONVERSION_ERRORS.inc(**labels)
+        raise
+    
+    report = {name: value for name, value in (('budget', trace.budget),
+                                              ('curve_fit', trace.curve_fit),
+                                              ('route', trace.route))
+              if value is not None}
+    if report and trace_report is not None:
+        trace_report.update(report)
+    chunks = converter.iter_svg(trace)
+    if converter.compact:
+        chunks = _report_compact(chunks, converter, labels)
+    if key is not None:
+        chunks = _store_when_complete(chunks, key, report)
+    return _measure_output(iter_encoded(chunks), labels)
+
+
+def _store_when_complete(chunks, key, report=None):
+    """
+    边输出边收集分块，全部输出完成后写入缓存
+
+    追踪报告和SVG存在同一个缓存条目中：报告序列化为单行JSON放在SVG之前，
+    命中时由 _split_cached 拆开，不额外占用缓存条目，也不重复计入命中次数。
+    """
+    collected = [json.dumps(report) + '\n'] if report else []
+    for chunk in chunks:
+        collected.append(chunk)
+        yield chunk
+    result_cache.put(key, ''.join(collected))
+
+
+def _split_cached(cached):
+    """拆分缓存条目，返回 (SVG文本, 追踪报告)；SVG不会以 '{' 开头"""
+    if not cached.startswith('{'):
+        return cached, {}
+    header, _, svg = cached.partition('\n')
+    return svg, json.loads(header)
+
+
+def _report_compact(chunks, converter, labels):
+    """紧凑输出全部生成后记录节省的字节数"""
+    yield from chunks
+    report = converter.compact_report
+    if report is None:
+        return
+    metrics.COMPACT_BYTES_SAVED.inc(report['saved_bytes'], **labels)
+    ratio = report['saved_bytes'] / report['original_bytes'] if report['original_bytes'] else 0.0
+    logger.info(f"紧凑输出: {report['original_bytes']} -> {report['compact_bytes']} 字节, "
+                f"节省 {report['saved_bytes']} 字节 ({ratio:.1%})")
+
+
+def _measure_output(chunks, labels):
+    """统计流式生成SVG的耗时和输出字节数"""
+    elapsed = 0.0
+    total = 0
+    iterator = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        chunk = next(iterator, None)
+        elapsed += time.perf_counter() - start
+        if chunk is None:
+            break
+        total += len(chunk)
+        yield chunk
+    metrics.STAGE_DURATION.observe(elapsed, stage='svg', **labels)
+    metrics.OUTPUT_BYTES.observe(float(total), **labels)
+
+
+"""
+响应压缩：按 Accept-Encoding 协商或按 format=svgz 输出，压缩级别由环境变量配置
+"""
+compression_config = CompressionConfig.from_env()
+FORMAT_PATTERN = "^(" + "|".join(OUTPUT_FORMATS) + ")$"
+
+
+def svg_response(request, svg_chunks, output_format="svg", filename=None, trace_report=None):
+    """
+    返回SVG流式响应，边生成边压缩
+
+    format=svgz 时输出gzip压缩的 .svgz 文件（不设置 Content-Encoding）；
+    否则按 Accept-Encoding 协商 br/gzip 传输压缩。
+    提供追踪报告时，输出预算选定的容差和输出大小、曲线拟合误差、路由选择的类别写入响应头。
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if trace_report and 'budget' in trace_report:
+        headers.update(budget_headers(trace_report['budget']))
+    if trace_report and 'curve_fit' in trace_report:
+        headers.update(curve_fit_headers(trace_report['curve_fit']))
+    if trace_report and 'route' in trace_report:
+        headers["X-Pipeline-Route"] = trace_report['route']['kind']
+    encoding = None
+    if output_format == "svgz":
+        encoding = "gzip"
+        if filename:
+            filename = filename.rsplit('.', 1)[0] + ".svgz"
+    else:
+        encoding = negotiate(request.headers.get("accept-encoding", ""))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+    if encoding:
+        svg_chunks = iter_compressed(svg_chunks, encoding, compression_config)
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+    body = _count_response_bytes(svg_chunks, encoding or "identity")
+    return StreamingResponse(body, media_type="image/svg+xml", headers=headers)
+
+
+def budget_headers(report):
+    """输出预算的响应头：选定的简化容差、输出字节数（标准输出，未压缩）和点数、是否满足预算"""
+    return {
+        "X-Simplify-Epsilon": str(report['epsilon']),
+        "X-Output-Bytes": str(report['bytes']),
+        "X-Output-Points": str(report['points']),
+        "X-Budget-Met": "true" if report['met'] else "false",
+    }
+
+
+def curve_fit_headers(report):
+    """曲线拟合的响应头：最大和平均拟合误差（像素）、曲线段数"""
+    return {
+        "X-Fit-Max-Error": str(report['max_error']),
+        "X-Fit-Mean-Error": str(report['mean_error']),
+        "X-Fit-Segments": str(report['segments']),
+    }
+
+
+def route_summary(decision):
+    """路由决策的日志文本：类别和分析特征"""
+    return (f"流水线路由 {decision['kind']} (双峰程度 {decision['separation']}, "
+            f"噪声 {decision['noise']}, 边缘密度 {decision['edge_density']})")
+
+
+def _count_response_bytes(chunks, encoding):
+    for chunk in chunks:
+        metrics.RESPONSE_BYTES.inc(len(chunk), encoding=encoding)
+        yield chunk
+
+
+def _collect_cache_stats():
+    for stat, value in result_cache.stats().items():
+        metrics.CACHE_STATS.set(value, stat=stat)
+
+
+def _collect_admission_stats():
+    metrics.ADMISSION_STATE.set(admission.active, state='active')
+    metrics.ADMISSION_STATE.set(admission.queued, state='queued')
+
+
+def _collect_job_stats():
+    if job_manager.store.exists:
+        for status, count in job_manager.store.counts().items():
+            metrics.JOBS.set(count, status=status)
+
+
+metrics.REGISTRY.add_collector(_collect_cache_stats)
+metrics.REGISTRY.add_collector(_collect_admission_stats)
+metrics.REGISTRY.add_collector(_collect_job_stats)
+
+
+# 启动耗时（秒）和就绪状态，由 /health/ready 报告
+startup_info = {'ready': False, 'import_seconds': None, 'warmup': None}
+
+
+@app.on_event("startup")
+async def warm_up_executor():
+    """预热转换工作池，完成后标记服务就绪（须在恢复异步任务之前）"""
+    import_seconds = time.perf_counter() - _IMPORT_STARTED
+    startup_info['import_seconds'] = import_seconds
+    metrics.STARTUP_SECONDS.set(import_seconds, phase='import')
+    if executor.config.warmup:
+        loop = asyncio.get_running_loop()
+        timings = await loop.run_in_executor(None, executor.warm_up)
+        startup_info['warmup'] = timings
+        metrics.STARTUP_SECONDS.set(sum(timings.values()), phase='warmup')
+        logger.info(f"工作池预热完成: 本进程 {timings['local']:.3f}s, "
+                    f"工作者 {timings['workers']:.3f}s")
+    startup_info['ready'] = True
+
+
+@app.on_event("startup")
+async def start_jobs():
+    """重新执行上次运行时未完成的异步任务"""
+    await job_manager.start()
+
+
+@app.on_event("shutdown")
+async def stop_jobs():
+    await job_manager.stop()
+
+
+def _endpoint_name(scope):
+    """按路由匹配得到端点名称，作为指标标签（避免路径参数导致标签过多）"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.name
+    return "unmatched"
+
+
+def _after_body(response, callback):
+    """在流式响应体发送完成（或中断）后调用 callback"""
+    body_iterator = response.body_iterator
+    
+    async def wrapped():
+        try:
+            async for chunk in body_iterator:
+                yield chunk
+        finally:
+            callback()
+    
+    response.body_iterator = wrapped()
+    return response
+
+
+def _request_cost(request, endpoint):
+    """估算请求开销（MB）：按上传大小，预设和预览档位的请求开销更小"""
+    cost = int(request.headers.get('content-length') or 0) / (1024 * 1024)
+    if endpoint == 'api_convert_with_preset':
+        cost /= 2
+    if request.query_params.get('quality') == 'preview':
+        cost /= 4
+    return cost
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """转换端点在读取上传内容之前先获得执行名额，饱和时返回429"""
+    endpoint = _endpoint_name(request.scope)
+    if endpoint not in ADMITTED_ENDPOINTS or not admission.enabled:
+        return await call_next(request)
+    
+    try:
+        waited = await admission.acquire(_request_cost(request, endpoint))
+    except AdmissionRejected as e:
+        metrics.ADMISSION_REJECTED.inc(endpoint=endpoint, reason=e.reason)
+        logger.warning(f"准入拒绝: {endpoint} ({e.reason}), Retry-After {e.retry_after}s")
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "服务繁忙，请稍后重试"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    metrics.ADMISSION_WAIT.observe(waited, endpoint=endpoint)
+    
+    start = time.perf_counter()
+    
+    def release():
+        admission.release(time.perf_counter() - start)
+    
+    try:
+        response = await call_next(request)
+    except BaseException:
+        release()
+        raise
+    # 名额保持到响应体（流式生成的SVG）发送完成
+    return _after_body(response, release)
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """记录每个端点的请求耗时、并发数和错误数"""
+    endpoint = _endpoint_name(request.scope)
+    start = time.perf_counter()
+    metrics.REQUESTS_IN_FLIGHT.inc(endpoint=endpoint)
+    
+    def finish(status):
+        metrics.REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+        metrics.REQUEST_DURATION.observe(time.perf_counter() - start,
+                                         endpoint=endpoint, status=status)
+        if int(status) >= 400:
+            metrics.REQUEST_ERRORS.inc(endpoint=endpoint, status=status)
+    
+    try:
+        response = await call_next(request)
+    except Exception:
+        finish("500")
+        raise
+    
+    # 流式响应在响应体发送完成后才结束计时
+    status = str(response.status_code)
+    return _after_body(response, lambda: finish(status))
+
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """返回带有高级配置选项的HTML表单"""
@@ -163,8 +602,8 @@ async def read_root():
                 <form action="/convert/" enctype="multipart/form-data" method="post">
                     <div class="form-section">
                         <h3>📁 文件选择</h3>
-                        <input type="file" name="file" accept=".png,.jpg,.jpeg" required>
-                        <div class="help-text">支持PNG、JPG格式图片</div>
+                        <input type="file" name="file" accept=".png,.jpg,.jpeg,.gif" required>
+                        <div class="help-text">支持PNG、JPG、GIF格式图片</div>
                     </div>
                     
                     <div class="form-section">
@@ -209,6 +648,66 @@ async def read_root():
                                 </div>
                                 <div class="help-text">处理PNG图像的透明通道</div>
                             </div>
+                            
+                            <div class="config-item">
+                                <label for="color_mode">颜色模式:</label>
+                                <select name="color_mode" id="color_mode">
+                                    <option value="mono" selected>单色</option>
+                                    <option value="color">多色分层</option>
+                                </select>
+                                <div class="help-text">多色分层为每种颜色输出一个路径分组</div>
+                            </div>
+                            
+                            <div class="config-item">
+                                <label for="num_colors">颜色数:</label>
+                                <input type="number" name="num_colors" id="num_colors" value="8" min="2" max="64">
+                                <div class="help-text">多色模式下量化的颜色数量</div>
+                            </div>
+                            
+                            <div class="config-item">
+                                <label for="quality">质量档位:</label>
+                                <select name="quality" id="quality">
+                                    <option value="preview">快速预览</option>
+                                    <option value="standard" selected>标准</option>
+                                    <option value="high">高质量</option>
+                                </select>
+                                <div class="help-text">快速预览缩小处理，适合交互式预览</div>
+                            </div>
+                            
+                            <div class="config-item">
+                                <div class="checkbox-container">
+                                    <input type="checkbox" name="compact" id="compact">
+                                    <label for="compact">紧凑输出</label>
+                                </div>
+                                <div class="help-text">相对坐标、合并同色路径，生成更小的SVG文件</div>
+                            </div>
+                            
+                            <div class="config-item">
+                                <div class="checkbox-container">
+                                    <input type="checkbox" name="holes" id="holes">
+                                    <label for="holes">保留孔洞</label>
+                                </div>
+                                <div class="help-text">字母、圆环等图形的内部镂空输出为 evenodd 复合路径</div>
+                            </div>
+                            
+                            <div class="config-item">
+                                <label for="format">输出格式:</label>
+                                <select name="format" id="format">
+                                    <option value="svg" selected>SVG</option>
+                                    <option value="svgz">SVGZ (gzip压缩)</option>
+                                </select>
+                                <div class="help-text">SVGZ 文件体积通常只有 SVG 的几分之一</div>
+                            </div>
+                            
+                            <div class="config-item">
+                                <label for="animation">动画(GIF):</label>
+                                <select name="animation" id="animation">
+                                    <option value="first" selected>只转换第一帧</option>
+                                    <option value="smil">SMIL动画</option>
+                                    <option value="frames">帧序列</option>
+                                </select>
+                                <div class="help-text">多帧图像逐帧转换，只重新追踪帧间变化的区域</div>
+                            </div>
                         </div>
                     </div>
                     
@@ -225,18 +724,26 @@ async def read_root():
 
 @app.post("/convert/")
 async def convert_png(
+    request: Request,
     file: UploadFile = File(...),
     threshold_method: str = Form("adaptive"),
     simplify_contours: bool = Form(True),
     min_contour_area: int = Form(50),
     edge_detection: bool = Form(True),
-    preserve_transparency: bool = Form(True)
+    preserve_transparency: bool = Form(True),
+    color_mode: str = Form("mono"),
+    num_colors: int = Form(8),
+    quality: str = Form("standard"),
+    compact: bool = Form(False),
+    holes: bool = Form(False),
+    output_format: str = Form("svg", alias="format", pattern=FORMAT_PATTERN),
+    animation: str = Form("first")
 ):
     """将上传的图片文件转换为SVG并返回"""
     # 检查文件类型
-    if not any(file.filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg']):
+    if not any(file.filename.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS):
         logger.warning(f"用户尝试上传不支持的文件: {file.filename}")
-        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG文件")
+        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG、GIF文件")
     
     logger.info(f"开始处理文件: {file.filename}, 配置: {threshold_method}, 简化轮廓: {simplify_contours}")
     
@@ -250,12 +757,19 @@ async def convert_png(
             'simplify_contours': simplify_contours,
             'min_contour_area': min_contour_area,
             'edge_detection': edge_detection,
-            'preserve_transparency': preserve_transparency
+            'preserve_transparency': preserve_transparency,
+            'color_mode': color_mode,
+            'num_colors': num_colors,
+            'quality': quality,
+            'compact': compact,
+            'animation': animation,
+            'holes': holes
         }
+        validate_config(config)
         
         # 转换为SVG
         logger.info(f"开始转换文件: {file.filename}")
-        svg_content = png_to_svg(contents, **config)
+        svg_chunks = await stream_conversion(contents, config)
         
         # 创建文件名
         base_name = file.filename.rsplit('.', 1)[0]
@@ -263,13 +777,9 @@ async def convert_png(
         logger.info(f"转换成功: {file.filename} -> {output_filename}")
         
         # 返回SVG文件
-        return Response(
-            content=svg_content.encode('utf-8'),
-            media_type="image/svg+xml",
-            headers={
-                "Content-Disposition": f"attachment; filename={output_filename}"
-            }
-        )
+        return svg_response(request, svg_chunks, output_format, filename=output_filename)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -279,18 +789,38 @@ async def convert_png(
 
 @app.post("/api/convert/", response_class=Response)
 async def api_convert_png(
+    request: Request,
     file: UploadFile = File(...),
     threshold_method: str = Query("adaptive", description="阈值方法: fixed, adaptive, otsu"),
     simplify_contours: bool = Query(True, description="是否简化轮廓"),
     min_contour_area: int = Query(50, description="最小轮廓面积"),
     edge_detection: bool = Query(True, description="是否启用边缘检测"),
-    preserve_transparency: bool = Query(True, description="是否保留透明度")
+    preserve_transparency: bool = Query(True, description="是否保留透明度"),
+    tile_size: Optional[int] = Query(None, ge=1, description="分块大小，超大图像分块处理以限制内存"),
+    color_mode: str = Query("mono", description="颜色模式: mono 单色, color 多色分层"),
+    num_colors: int = Query(8, ge=2, le=64, description="多色模式的颜色数"),
+    quantize_method: str = Query("kmeans", description="多色模式的量化方法: kmeans, median_cut"),
+    quality: str = Query("standard", description="质量档位: preview 快速预览, standard, high"),
+    compact: bool = Query(False, description="紧凑输出: 相对坐标与简写命令、同样式路径合并"),
+    precision: Optional[int] = Query(None, ge=0, le=6, description="坐标保留的小数位数"),
+    output_format: str = Query("svg", alias="format", pattern=FORMAT_PATTERN,
+                               description="输出格式: svg, svgz (gzip压缩)"),
+    animation: str = Query("first", description="多帧输入(GIF/APNG): first 只转换第一帧, "
+                                                "frames 每帧一个<g>, smil SMIL动画"),
+    instancing: str = Query("off", description="形状实例化: off, translate 平移, "
+                                               "rotate 平移+90°旋转, full 再加整数缩放"),
+    holes: bool = Query(False, description="保留孔洞: 按轮廓层次输出 evenodd 复合路径"),
+    max_bytes: Optional[int] = Query(None, ge=1, description="输出字节数预算，超出时自动增大简化容差"),
+    max_points: Optional[int] = Query(None, ge=1, description="输出轮廓点数预算"),
+    fit_tolerance: Optional[float] = Query(None, gt=0, le=20,
+                                           description="曲线拟合容差（像素），用最小二乘三次贝塞尔曲线代替折线简化"),
+    route: str = Query("fixed", description="流水线选择: fixed 按配置, auto 按内容分析选择（单色模式）")
 ):
     """API端点，将上传的图片文件转换为SVG并返回"""
     # 检查文件类型
-    if not any(file.filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg']):
+    if not any(file.filename.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS):
         logger.warning(f"API调用: 用户尝试上传不支持的文件: {file.filename}")
-        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG文件")
+        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG、GIF文件")
     
     logger.info(f"API调用: 开始处理文件: {file.filename}")
     
@@ -304,24 +834,45 @@ async def api_convert_png(
             'simplify_contours': simplify_contours,
             'min_contour_area': min_contour_area,
             'edge_detection': edge_detection,
-            'preserve_transparency': preserve_transparency
+            'preserve_transparency': preserve_transparency,
+            'tile_size': tile_size,
+            'color_mode': color_mode,
+            'num_colors': num_colors,
+            'quantize_method': quantize_method,
+            'quality': quality,
+            'compact': compact,
+            'precision': precision,
+            'animation': animation,
+            'instancing': instancing,
+            'holes': holes,
+            'max_bytes': max_bytes,
+            'max_points': max_points,
+            'fit_tolerance': fit_tolerance,
+            'route': route
         }
+        validate_config(config)
         
         # 转换为SVG
         logger.info(f"API调用: 开始转换文件: {file.filename}")
-        svg_content = png_to_svg(contents, **config)
-        
-        # 确保SVG内容是字符串
-        if not isinstance(svg_content, str):
-            svg_content = str(svg_content)
+        trace_report = {}
+        svg_chunks = await stream_conversion(contents, config, trace_report=trace_report)
         
+        if 'budget' in trace_report:
+            budget = trace_report['budget']
+            logger.info(f"API调用: 输出预算: 容差 {budget['epsilon']}, "
+                        f"{budget['bytes']} 字节, {budget['points']} 个点")
+        if 'curve_fit' in trace_report:
+            fit = trace_report['curve_fit']
+            logger.info(f"API调用: 曲线拟合: {fit['segments']} 段, "
+                        f"最大误差 {fit['max_error']}, 平均误差 {fit['mean_error']}")
+        if 'route' in trace_report:
+            logger.info(f"API调用: {route_summary(trace_report['route'])}")
         logger.info(f"API调用: 转换成功: {file.filename}")
         
         # 返回SVG内容
-        return Response(
-            content=svg_content.encode('utf-8'),
-            media_type="image/svg+xml"
-        )
+        return svg_response(request, svg_chunks, output_format, trace_report=trace_report)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -366,6 +917,19 @@ async def get_config_presets():
                 "preserve_transparency": False
             }
         },
+        "color_logo": {
+            "name": "彩色Logo",
+            "description": "适合处理颜色较少的彩色图标和Logo，每种颜色输出一个分组",
+            "config": {
+                "threshold_method": "otsu",
+                "simplify_contours": True,
+                "min_contour_area": 20,
+                "edge_detection": False,
+                "preserve_transparency": True,
+                "color_mode": "color",
+                "num_colors": 8
+            }
+        },
         "text": {
             "name": "文字图像",
             "description": "适合处理包含文字的图像",
@@ -376,14 +940,50 @@ async def get_config_presets():
                 "edge_detection": False,
                 "preserve_transparency": False
             }
+        },
+        "auto": {
+            "name": "自动选择",
+            "description": "先分析图像内容（线稿、文字、噪声扫描件、照片），自动选择开销最小的处理流水线",
+            "config": {
+                "route": "auto",
+                "threshold_method": "adaptive",
+                "simplify_contours": True,
+                "min_contour_area": 50,
+                "edge_detection": True,
+                "preserve_transparency": True
+            }
         }
     }
     return presets
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus文本格式的进程内指标"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/health/ready")
+async def get_readiness():
+    """就绪检查：工作池预热完成后返回200和启动耗时，之前返回503"""
+    return JSONResponse(status_code=200 if startup_info['ready'] else 503,
+                        content=startup_info)
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    """准入控制统计：执行中和排队中的请求数、等待时间、拒绝次数"""
+    return admission.stats()
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """获取结果缓存的命中、未命中和淘汰统计"""
+    return result_cache.stats()
+
 @app.post("/api/convert/preset/{preset_name}")
 async def api_convert_with_preset(
+    request: Request,
     preset_name: str,
-    file: UploadFile = File(...)
+    file: UploadFile = File(...),
+    output_format: str = Query("svg", alias="format", pattern=FORMAT_PATTERN,
+                               description="输出格式: svg, svgz (gzip压缩)")
 ):
     """使用预设配置转换图片"""
     # 获取预设配置
@@ -395,9 +995,9 @@ async def api_convert_with_preset(
     preset_config = presets_response[preset_name]["config"]
     
     # 检查文件类型
-    if not any(file.filename.lower().endswith(ext) for ext in ['.png', '.jpg', '.jpeg']):
+    if not any(file.filename.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS):
         logger.warning(f"预设转换: 用户尝试上传不支持的文件: {file.filename}")
-        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG文件")
+        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG、GIF文件")
     
     logger.info(f"预设转换: 使用 {preset_name} 预设处理文件: {file.filename}")
     
@@ -405,22 +1005,209 @@ async def api_convert_with_preset(
     contents = await file.read()
     
     try:
+        validate_config(preset_config)
         # 转换为SVG
-        svg_content = png_to_svg(contents, **preset_config)
+        trace_report = {}
+        svg_chunks = await stream_conversion(contents, preset_config, preset=preset_name,
+                                             trace_report=trace_report)
         
+        if 'route' in trace_report:
+            logger.info(f"预设转换: {route_summary(trace_report['route'])}")
         logger.info(f"预设转换成功: {file.filename} 使用 {preset_name} 预设")
         
         # 返回SVG内容
-        return Response(
-            content=svg_content.encode('utf-8'),
-            media_type="image/svg+xml"
-        )
+        return svg_response(request, svg_chunks, output_format, trace_report=trace_report)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
         logger.error(f"预设转换错误: {str(e)}\n{error_details}")
         raise HTTPException(status_code=500, detail=f"转换过程中出错: {str(e)}")
 
+async def _convert_batch_item(index, name, contents, config, slots):
+    """
+    转换批量请求中的单个文件，返回 (序号, SVG字节, 错误信息)；slots 限制同时转换的文件数
+
+    逐文件配置在这里校验，无效时只记录该文件的错误，不影响其他文件。
+    """
+    if not is_supported(name):
+        return index, None, "只接受PNG、JPG、JPEG、GIF文件"
+    try:
+        config = ConversionConfig(**config).model_dump()
+        validate_config(config)
+    except HTTPException as e:
+        return index, None, e.detail
+    except (ValueError, TypeError) as e:
+        return index, None, f"配置无效: {str(e)}"
+    try:
+        async with slots:
+            svg_chunks = await stream_conversion(contents, config)
+            loop = asyncio.get_running_loop()
+            svg_bytes = await loop.run_in_executor(None, b''.join, svg_chunks)
+        return index, svg_bytes, None
+    except Exception as e:
+        logger.error(f"批量转换错误: {name}: {str(e)}")
+        return index, None, str(e)
+
+@app.post("/api/convert/batch/")
+async def api_convert_batch(
+    files: List[UploadFile] = File(..., description="多个图片文件，或单个ZIP包"),
+    config: Optional[str] = Form(None, description="所有文件共享的转换配置（JSON对象）"),
+    configs: Optional[str] = Form(None, description="逐文件配置：JSON数组（按文件顺序）或以文件名为键的JSON对象"),
+    output: str = Query("zip", description="输出格式: zip, multipart")
+):
+    """
+    批量转换：并行转换所有文件，按完成顺序流式返回ZIP或multipart结果，单个文件失败不影响其他文件
+
+    文件数量和ZIP解压大小超出限制时返回413；同时转换的文件数不超过批量并发上限。
+    """
+    if output not in ('zip', 'multipart'):
+        raise HTTPException(status_code=400, detail=f"不支持的输出格式: {output}")
+    
+    # 读取上传内容：单个ZIP包则在线程中解压其中的图片，避免阻塞事件循环
+    try:
+        if len(files) == 1 and is_zip(files[0].filename):
+            archive = await files[0].read()
+            try:
+                items = await asyncio.to_thread(extract_zip_images, archive, batch_limits)
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail="无效的ZIP文件")
+        else:
+            batch_limits.check_count(len(files))
+            items = [(file.filename, await file.read()) for file in files]
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="没有可转换的图片文件")
+    
+    names = [name for name, _ in items]
+    # 只有整个请求的配置格式错误（无法解析的JSON、数量不一致）返回400，逐文件的取值错误记录在清单中
+    try:
+        item_configs = parse_batch_configs(names, config, configs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"配置无效: {str(e)}")
+    
+    logger.info(f"批量转换: {len(items)} 个文件, 输出格式: {output}")
+    
+    outputs = output_names(names)
+    slots = asyncio.Semaphore(batch_limits.concurrency or executor.config.max_workers)
+    tasks = [
+        asyncio.create_task(_convert_batch_item(index, name, contents, item_config, slots))
+        for index, ((name, contents), item_config) in enumerate(zip(items, item_configs))
+    ]
+    writer = ZipStreamWriter() if output == 'zip' else MultipartStreamWriter()
+    
+    async def body():
+        loop = asyncio.get_running_loop()
+        manifest = [None] * len(items)
+        try:
+            for finished in asyncio.as_completed(tasks):
+                index, svg_bytes, error = await finished
+                if error is None:
+                    manifest[index] = {"input": names[index], "output": outputs[index],
+                                       "status": "ok", "bytes": len(svg_bytes)}
+                    # ZIP压缩放到线程池中，避免阻塞事件循环
+                    yield await loop.run_in_executor(None, writer.add, outputs[index], svg_bytes)
+                else:
+                    manifest[index] = {"input": names[index], "status": "error", "error": error}
+            
+            # 最后写入每个文件的处理结果
+            summary = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8')
+            yield writer.add("manifest.json", summary, "application/json")
+            yield writer.close()
+            
+            failed = sum(1 for item in manifest if item["status"] == "error")
+            logger.info(f"批量转换完成: 成功 {len(items) - failed}, 失败 {failed}")
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    headers = {}
+    if output == 'zip':
+        headers["Content-Disposition"] = "attachment; filename=converted_svgs.zip"
+    return StreamingResponse(body(), media_type=writer.media_type, headers=headers)
+
+def _job_status(job):
+    """任务状态的响应内容"""
+    fields = ('status', 'filename', 'stage', 'progress', 'stage_timings', 'error',
+              'attempts', 'result_bytes', 'created', 'updated', 'finished', 'expires')
+    status = {'job_id': job['id'], **{field: job[field] for field in fields}}
+    status['status_url'] = f"/api/jobs/{job['id']}"
+    if job['status'] == DONE:
+        status['result_url'] = f"/api/jobs/{job['id']}/result"
+    return status
+
+def _get_job(job_id):
+    job = job_manager.store.get(job_id) if job_manager.store.exists else None
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"任务不存在或已过期: {job_id}")
+    return job
+
+@app.post("/api/jobs/", status_code=202)
+async def api_submit_job(
+    file: UploadFile = File(...),
+    config: Optional[str] = Form(None, description="转换配置（JSON对象），参数与 /api/convert/ 相同")
+):
+    """提交异步转换任务，立即返回任务ID；通过状态接口查询进度，完成后下载结果"""
+    if not any(file.filename.lower().endswith(ext) for ext in SUPPORTED_EXTENSIONS):
+        logger.warning(f"异步任务: 用户尝试上传不支持的文件: {file.filename}")
+        raise HTTPException(status_code=400, detail="只接受PNG、JPG、JPEG、GIF文件")
+    try:
+        job_config = ConversionConfig(**json.loads(config or '{}')).model_dump()
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"配置无效: {str(e)}")
+    validate_config(job_config)
+    
+    contents = await file.read()
+    job_id = await job_manager.submit(contents, job_config, filename=file.filename)
+    logger.info(f"异步任务已提交: {job_id} ({file.filename})")
+    status = _job_status(await asyncio.to_thread(_get_job, job_id))
+    return JSONResponse(status_code=202, content=status,
+                        headers={"Location": status['status_url']})
+
+@app.get("/api/jobs/{job_id}")
+async def api_job_status(job_id: str):
+    """查询任务状态和按阶段的进度"""
+    return _job_status(await asyncio.to_thread(_get_job, job_id))
+
+@app.get("/api/jobs/{job_id}/result", response_class=Response)
+async def api_job_result(
+    request: Request,
+    job_id: str,
+    output_format: str = Query("svg", alias="format", pattern=FORMAT_PATTERN,
+                               description="输出格式: svg, svgz (gzip压缩)")
+):
+    """下载已完成任务的SVG结果"""
+    job = await asyncio.to_thread(_get_job, job_id)
+    if job['status'] != DONE:
+        raise HTTPException(status_code=409, detail=f"任务尚未完成: {job['status']}")
+    try:
+        result = open(job_manager.store.result_path(job_id), 'rb')
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"任务结果已过期: {job_id}")
+    
+    def chunks():
+        with result:
+            while chunk := result.read(64 * 1024):
+                yield chunk
+    
+    base_name = (job['filename'] or job_id).rsplit('.', 1)[0]
+    return svg_response(request, chunks(), output_format, filename=f"{base_name}_optimized.svg")
+
+@app.delete("/api/jobs/{job_id}")
+async def api_cancel_job(job_id: str):
+    """取消排队中或执行中的任务；已结束的任务删除其状态和结果"""
+    job = await asyncio.to_thread(_get_job, job_id)
+    if job['status'] in FINISHED_STATES:
+        await asyncio.to_thread(job_manager.store.delete, job_id)
+        logger.info(f"异步任务已删除: {job_id}")
+        return {"job_id": job_id, "status": "deleted"}
+    await asyncio.to_thread(job_manager.store.cancel, job_id)
+    logger.info(f"异步任务已取消: {job_id}")
+    return _job_status(await asyncio.to_thread(_get_job, job_id))
+
 if __name__ == "__main__":
     import uvicorn
     logger.info("高级PNG转SVG服务启动")
@@ -0,0 +1,278 @@
+"""
+进程内指标
+
+提供计数器、仪表和直方图三种指标，以Prometheus文本格式输出，不依赖外部服务。
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# 耗时直方图默认分桶（秒）
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 像素数分桶：64x64 到 16k x 16k
+PIXEL_BUCKETS = tuple(float(side * side) for side in
+                      (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384))
+# 输出字节数分桶：1KB 到 64MB
+BYTE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(9))
+# 轮廓数量分桶
+COUNT_BUCKETS = (0.0, 1.0, 10.0, 50.0, 100.0, 500.0, 1000.0, 5000.0, 10000.0, 50000.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    metric_type = 'counter'
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    """可增可减的仪表"""
+
+    metric_type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """在上下文内把仪表加一，退出时减一"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    """分桶直方图"""
+
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """统计上下文内代码的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """返回 (各桶累计计数, 总和, 样本数)"""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            if state is None:
+                return [0] * (len(self.buckets) + 1), 0.0, 0
+            counts, total, count = state
+            cumulative = []
+            running = 0
+            for c in counts:
+                running += c
+                cumulative.append(running)
+            return cumulative, total, count
+
+    def _render_samples(self, items):
+        lines = []
+        bounds = self.buckets + (float('inf'),)
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, c in zip(bounds, counts):
+                running += c
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(total)}")
+            lines.append(f"{self.name}_count{plain} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标已注册: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector):
+        """注册在输出前调用的回调，用于刷新仪表类指标"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """以Prometheus文本格式输出所有指标"""
+        for collector in self._collectors:
+            collector()
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ----------------------------------------------------------------------
+# 服务使用的标准指标
+# ----------------------------------------------------------------------
+REGISTRY = MetricsRegistry()
+
+CONVERSION_LABELS = ('threshold_method', 'preset')
+
+STAGE_DURATION = REGISTRY.histogram(
+    'png2svg_stage_duration_seconds', '转换流水线各阶段耗时',
+    ('stage',) + CONVERSION_LABELS)
+INPUT_PIXELS = REGISTRY.histogram(
+    'png2svg_input_pixels', '输入图像像素数', CONVERSION_LABELS, PIXEL_BUCKETS)
+OUTPUT_BYTES = REGISTRY.histogram(
+    'png2svg_output_bytes', '输出SVG字节数', CONVERSION_LABELS, BYTE_BUCKETS)
+CONTOUR_COUNT = REGISTRY.histogram(
+    'png2svg_contours', '每次转换输出的轮廓数量', CONVERSION_LABELS, COUNT_BUCKETS)
+CONVERSIONS_IN_FLIGHT = REGISTRY.gauge(
+    'png2svg_conversions_in_flight', '正在执行的转换数量')
+CONVERSION_ERRORS = REGISTRY.counter(
+    'png2svg_conversion_errors_total', '转换失败次数', CONVERSION_LABELS)
+ROUTE_DECISIONS = REGISTRY.counter(
+    'png2svg_route_decisions_total', '内容路由选择的输入类别次数', ('kind',) + CONVERSION_LABELS)
+COMPACT_BYTES_SAVED = REGISTRY.counter(
+    'png2svg_compact_bytes_saved_total', '紧凑输出相对标准输出节省的字节数', CONVERSION_LABELS)
+
+CACHE_STATS = REGISTRY.gauge(
+    'png2svg_cache', '结果缓存统计（命中、未命中、合并、淘汰等）', ('stat',))
+
+ADMISSION_STATE = REGISTRY.gauge(
+    'png2svg_admission', '准入控制状态（active 执行中, queued 排队中）', ('state',))
+ADMISSION_WAIT = REGISTRY.histogram(
+    'png2svg_admission_wait_seconds', '请求在准入队列中的等待时间', ('endpoint',))
+ADMISSION_REJECTED = REGISTRY.counter(
+    'png2svg_admission_rejected_total', '因队列已满或等待超时被拒绝的请求数量',
+    ('endpoint', 'reason'))
+
+JOBS = REGISTRY.gauge(
+    'png2svg_jobs', '任务库中各状态的异步任务数量', ('status',))
+
+STARTUP_SECONDS = REGISTRY.gauge(
+    'png2svg_startup_seconds', '服务启动各阶段耗时（import 导入, warmup 预热）', ('phase',))
+
+REQUEST_DURATION = REGISTRY.histogram(
+    'png2svg_request_duration_seconds', 'HTTP请求耗时（含响应体发送）', ('endpoint', 'status'))
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'png2svg_requests_in_flight', '正在处理的HTTP请求数量', ('endpoint',))
+RESPONSE_BYTES = REGISTRY.counter(
+    'png2svg_response_bytes_total', 'SVG响应体发送的字节数（按压缩编码）', ('encoding',))
+REQUEST_ERRORS = REGISTRY.counter(
+    'png2svg_request_errors_total', '返回4xx/5xx或抛出异常的HTTP请求数量', ('endpoint', 'status'))
+
+
+def record_trace(trace_result, threshold_method, preset):
+    """记录一次追踪结果的各阶段耗时、输入大小、轮廓数量和路由决策"""
+    labels = {'threshold_method': threshold_method, 'preset': preset}
+    for stage, seconds in trace_result.stage_timings.items():
+        STAGE_DURATION.observe(seconds, stage=stage, **labels)
+    INPUT_PIXELS.observe(float(trace_result.width * trace_result.height), **labels)
+    CONTOUR_COUNT.observe(float(len(trace_result.contours)), **labels)
+    if trace_result.route is not None:
+        ROUTE_DECISIONS.inc(kind=trace_result.route['kind'], **labels)
@@ -0,0 +1,188 @@
+"""
+编译后的处理流水线
+
+把转换配置编译为流水线计划：去掉未启用的阶段，预先创建形态学结构元素，
+各阶段通过 OpenCV 的 dst= 参数写入按图像形状复用的缓冲区，在稳定状态下
+每次请求几乎不再分配整帧数组。计划按配置缓存，缓冲区池按线程（即工作者）隔离。
+"""
+
+import contextlib
+import functools
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+# 每个线程的缓冲区池默认最多保留的字节数
+DEFAULT_POOL_BYTES = int(os.environ.get("PNG2SVG_BUFFER_POOL_MB", 128)) * 1024 * 1024
+
+
+class BufferPool:
+    """按 (名称, 形状, 类型) 复用的缓冲区，超出容量时按最近最少使用的形状淘汰"""
+
+    def __init__(self, max_bytes=DEFAULT_POOL_BYTES):
+        self.max_bytes = max_bytes
+        self._shapes = OrderedDict()
+        self._bytes = 0
+        # 新分配的缓冲区数量，稳定状态下不再增长
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        """取得一个缓冲区（内容未初始化）"""
+        key = (tuple(shape), np.dtype(dtype).str)
+        buffers = self._shapes.get(key)
+        if buffers is None:
+            buffers = self._shapes[key] = {}
+        else:
+            self._shapes.move_to_end(key)
+        array = buffers.get(name)
+        if array is None:
+            array = np.empty(shape, dtype)
+            self.allocations += 1
+            if array.nbytes > self.max_bytes:
+                # 超大图像不进入缓冲区池
+                return array
+            buffers[name] = array
+            self._bytes += array.nbytes
+            self._evict(keep=key)
+        return array
+
+    def _evict(self, keep):
+        while self._bytes > self.max_bytes and len(self._shapes) > 1:
+            key = next(iter(self._shapes))
+            if key == keep:
+                self._shapes.move_to_end(key)
+                continue
+            buffers = self._shapes.pop(key)
+            self._bytes -= sum(array.nbytes for array in buffers.values())
+
+    def stats(self):
+        return {
+            'shapes': len(self._shapes),
+            'bytes': self._bytes,
+            'allocations': self.allocations,
+        }
+
+
+_local = threading.local()
+
+
+def buffer_pool():
+    """当前线程（工作者）的缓冲区池"""
+    pool = getattr(_local, 'pool', None)
+    if pool is None:
+        pool = _local.pool = BufferPool()
+    return pool
+
+
+THRESHOLD_METHODS = ('fixed', 'adaptive', 'otsu')
+
+_THRESHOLD_TYPES = {
+    'otsu': cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU,
+    'fixed': cv2.THRESH_BINARY_INV,
+}
+
+
+class PipelinePlan:
+    """
+    单色流水线计划：[降噪] → [边缘增强] → 阈值 → [闭/开操作] → [填充孔洞]
+
+    median_ksize 不大于1时跳过降噪，close_ksize 为0时跳过闭/开操作（内容路由为干净的输入选择）。
+    """
+
+    def __init__(self, threshold_method, edge_detection, median_ksize, close_ksize):
+        self.threshold_method = threshold_method
+        self.edge_detection = edge_detection
+        self.median_ksize = median_ksize
+        self.close_ksize = close_ksize
+        self.close_kernel = np.ones((close_ksize, close_ksize), np.uint8) if close_ksize else None
+        self.open_kernel = np.ones((3, 3), np.uint8)
+
+    def preprocess(self, src, dst, scratch):
+        """降噪和边缘增强，结果写入 dst；两者都跳过时直接返回 src"""
+        if self.median_ksize > 1:
+            cv2.medianBlur(src, self.median_ksize, dst=dst)
+            src = dst
+        if self.edge_detection:
+            cv2.Canny(src, 50, 150, edges=scratch)
+            cv2.addWeighted(src, 0.8, scratch, 0.2, 0, dst=dst)
+            src = dst
+        return src
+
+    def threshold(self, src, dst):
+        if self.threshold_method == 'adaptive':
+            return cv2.adaptiveThreshold(src, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                         cv2.THRESH_BINARY_INV, 11, 2, dst=dst)
+        threshold = 0 if self.threshold_method == 'otsu' else 128
+        cv2.threshold(src, threshold, 255, _THRESHOLD_TYPES[self.threshold_method], dst=dst)
+        return dst
+
+    def morphology(self, src, dst, scratch, fill=True, pool=None):
+        """
+        闭操作 → 开操作 → 可选的孔洞填充，结果写入 dst；src 的内容会被覆盖
+
+        跳过闭/开操作时就地处理并返回 src。
+        """
+        if self.close_kernel is None:
+            dst, src = src, scratch
+        else:
+            cv2.morphologyEx(src, cv2.MORPH_CLOSE, self.close_kernel, dst=scratch)
+            cv2.morphologyEx(scratch, cv2.MORPH_OPEN, self.open_kernel, dst=dst)
+        if fill:
+            self.fill_holes(dst, src, pool or buffer_pool())
+        return dst
+
+    @staticmethod
+    def fill_holes(binary, scratch, pool):
+        """就地填充 binary 中的孔洞：从(0,0)漫水填充后取反并合并"""
+        height, width = binary.shape[:2]
+        mask = pool.get('flood_mask', (height + 2, width + 2))
+        mask.fill(0)
+        np.copyto(scratch, binary)
+        cv2.floodFill(scratch, mask, (0, 0), 255)
+        cv2.bitwise_not(scratch, dst=scratch)
+        cv2.bitwise_or(binary, scratch, dst=binary)
+        return binary
+
+    def run(self, gray, stage=None, pool=None, fill=True):
+        """
+        执行完整流水线，返回二值掩码
+
+        返回的数组属于缓冲区池，只在同一线程的下一次调用之前有效。
+        stage 为可选的阶段计时上下文管理器工厂（如 ImageToSVGConverter.stage）。
+        fill=False 时跳过孔洞填充（按轮廓层次结构处理孔洞时不需要）。
+        """
+        pool = pool or buffer_pool()
+        shape = gray.shape
+        a = pool.get('a', shape)
+        b = pool.get('b', shape)
+        c = pool.get('c', shape)
+        with _timed(stage, 'preprocess'):
+            denoised = self.preprocess(gray, a, b)
+        with _timed(stage, 'threshold'):
+            binary = self.threshold(denoised, b)
+        with _timed(stage, 'morphology'):
+            return self.morphology(binary, a, c, fill=fill, pool=pool)
+
+    def trace_layer_mask(self, labels, index, pool=None):
+        """取出一个颜色层的掩码并做闭/开操作（不填充孔洞），返回池中的缓冲区"""
+        pool = pool or buffer_pool()
+        shape = labels.shape
+        mask = pool.get('layer_mask', shape)
+        out = pool.get('layer_out', shape)
+        scratch = pool.get('layer_scratch', shape)
+        cv2.compare(labels, index, cv2.CMP_EQ, dst=mask)
+        return self.morphology(mask, out, scratch, fill=False, pool=pool)
+
+
+def _timed(stage, name):
+    return stage(name) if stage is not None else contextlib.nullcontext()
+
+
+@functools.lru_cache(maxsize=64)
+def compile_plan(threshold_method, edge_detection, median_ksize, close_ksize):
+    """编译（并缓存）流水线计划"""
+    method = threshold_method if threshold_method in ('adaptive', 'otsu') else 'fixed'
+    return PipelinePlan(method, bool(edge_detection), int(median_ksize), int(close_ksize))
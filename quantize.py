@@ -0,0 +1,127 @@
+"""
+颜色量化
+
+把彩色图像量化为少量颜色，返回每个像素的颜色索引和调色板，供多色分层矢量化使用。
+调色板由采样像素计算（k-means 或中位切分），再通过 32768 项查找表一次性
+为全部像素分配最近的调色板颜色，避免逐像素计算距离。
+"""
+
+import cv2
+import numpy as np
+
+QUANTIZE_METHODS = ('kmeans', 'median_cut')
+# 透明像素的索引值
+TRANSPARENT = 255
+# 计算调色板时最多采样的像素数
+MAX_SAMPLES = 50000
+# 查找表每个通道保留的位数
+LUT_BITS = 5
+
+
+def _sample(pixels, max_samples, seed=0):
+    if len(pixels) <= max_samples:
+        return pixels
+    rng = np.random.default_rng(seed)
+    return pixels[rng.choice(len(pixels), max_samples, replace=False)]
+
+
+def _unique_colors(samples):
+    """返回采样像素中的不同颜色及其出现次数"""
+    packed = (samples[:, 0].astype(np.uint32) << 16 | samples[:, 1].astype(np.uint32) << 8
+              | samples[:, 2])
+    keys, counts = np.unique(packed, return_counts=True)
+    colors = np.stack((keys >> 16, (keys >> 8) & 0xFF, keys & 0xFF), axis=1).astype(np.uint8)
+    return colors, counts
+
+
+def kmeans_palette(samples, num_colors, seed=0):
+    """用OpenCV k-means计算调色板"""
+    colors, _ = _unique_colors(samples)
+    if len(colors) <= num_colors:
+        return colors
+    cv2.setRNGSeed(seed)
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+    _, _, centers = cv2.kmeans(samples.astype(np.float32), num_colors, None, criteria, 3,
+                               cv2.KMEANS_PP_CENTERS)
+    return np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+
+
+def median_cut_palette(samples, num_colors):
+    """
+    中位切分：反复选出 (取值范围 × 像素数) 最大的颜色盒，
+    沿取值范围最大的通道在像素数的中位处切分
+    """
+    colors, counts = _unique_colors(samples)
+    boxes = [(colors, counts)]
+    while len(boxes) < num_colors:
+        scores = [int(np.ptp(c, axis=0).max()) * int(n.sum()) if len(c) > 1 else -1
+                  for c, n in boxes]
+        index = int(np.argmax(scores))
+        if scores[index] <= 0:
+            break
+        box_colors, box_counts = boxes.pop(index)
+        channel = int(np.argmax(np.ptp(box_colors, axis=0)))
+        order = np.argsort(box_colors[:, channel], kind='stable')
+        box_colors, box_counts = box_colors[order], box_counts[order]
+        cumulative = np.cumsum(box_counts)
+        middle = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+        # 切分后两边都至少保留一种颜色
+        middle = min(max(middle, 1), len(box_colors) - 1)
+        boxes.append((box_colors[:middle], box_counts[:middle]))
+        boxes.append((box_colors[middle:], box_counts[middle:]))
+    palette = [np.average(c.astype(np.float64), axis=0, weights=n) for c, n in boxes]
+    return np.clip(np.rint(palette), 0, 255).astype(np.uint8)
+
+
+def _nearest_lut(palette):
+    """为每个量化后的颜色预先计算最近的调色板索引"""
+    levels = 1 << LUT_BITS
+    step = 256 // levels
+    grid = np.arange(levels, dtype=np.int32) * step + step // 2
+    r, g, b = np.meshgrid(grid, grid, grid, indexing='ij')
+    colors = np.stack((r.ravel(), g.ravel(), b.ravel()), axis=1)
+    distances = ((colors[:, None, :] - palette[None, :, :].astype(np.int32)) ** 2).sum(axis=2)
+    return distances.argmin(axis=1).astype(np.uint8)
+
+
+def quantize(rgb, num_colors=8, method='kmeans', alpha=None, seed=0):
+    """
+    把图像量化为最多 num_colors 种颜色
+
+    Args:
+        rgb: HxWx3 uint8 数组
+        num_colors: 最大颜色数（2-254）
+        method: 'kmeans' 或 'median_cut'
+        alpha: 可选的 HxW alpha 通道，alpha < 128 的像素视为透明，不参与量化
+        seed: 采样和k-means的随机种子，保证结果可复现
+
+    Returns:
+        (labels, palette)：HxW uint8 颜色索引（透明像素为 TRANSPARENT）和 Kx3 调色板
+    """
+    if method not in QUANTIZE_METHODS:
+        raise ValueError(f"不支持的量化方法: {method}，可选 {QUANTIZE_METHODS}")
+    num_colors = int(num_colors)
+    if not 2 <= num_colors < TRANSPARENT:
+        raise ValueError(f"颜色数必须在 2 到 {TRANSPARENT - 1} 之间: {num_colors}")
+
+    pixels = rgb.reshape(-1, 3)
+    opaque = None if alpha is None else alpha.reshape(-1) >= 128
+    candidates = pixels if opaque is None else pixels[opaque]
+    if len(candidates) == 0:
+        return np.full(rgb.shape[:2], TRANSPARENT, np.uint8), np.zeros((0, 3), np.uint8)
+
+    samples = _sample(candidates, MAX_SAMPLES, seed)
+    if method == 'kmeans':
+        palette = kmeans_palette(samples, num_colors, seed)
+    else:
+        palette = median_cut_palette(samples, num_colors)
+
+    # 查找表分配：每个通道取高 LUT_BITS 位组成索引
+    shift = 8 - LUT_BITS
+    index = ((pixels[:, 0] >> shift).astype(np.uint16) << (2 * LUT_BITS)
+             | (pixels[:, 1] >> shift).astype(np.uint16) << LUT_BITS
+             | (pixels[:, 2] >> shift))
+    labels = _nearest_lut(palette)[index]
+    if opaque is not None:
+        labels[~opaque] = TRANSPARENT
+    return labels.reshape(rgb.shape[:2]), palette
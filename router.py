@@ -0,0 +1,104 @@
+"""
+内容感知的流水线路由
+
+固定流水线对每幅图像都执行中值滤波、Canny边缘增强、自适应阈值和闭/开操作，干净的
+双峰图标和文字并不需要这些步骤。route='auto' 时先做一遍快速分析：在长边不超过256像素的
+缩小图上计算灰度直方图的 Otsu 类间方差占比（双峰程度）和边缘密度，在原分辨率的中心区域
+上估计噪声（与3x3中值滤波结果之差的中位数），据此把输入分为线稿、文字、噪声扫描件和照片，
+选择足够且开销最小的流水线。分析本身在 2048x2048 输入上约为几毫秒。
+"""
+
+import cv2
+import numpy as np
+
+# 流水线选择方式：'fixed' 按配置执行完整流水线，'auto' 按内容分析的结果选择
+ROUTE_MODES = ('fixed', 'auto')
+
+# 直方图和边缘密度在长边不超过该值的缩小图上计算
+ANALYSIS_SIDE = 256
+# 噪声在原分辨率中心的该边长区域上估计（缩小会平均掉噪声）
+NOISE_SAMPLE = 256
+
+# Otsu 类间方差占总方差的比例不低于该值时视为干净的双峰图像
+BIMODAL_SEPARATION = 0.8
+# 有噪声但类间方差占比不低于该值时视为扫描件（光照不均会降低双峰程度）
+SCAN_SEPARATION = 0.7
+# 噪声估计（灰度级）超过该值时视为有噪声
+NOISE_LEVEL = 4
+# 双峰图像中边缘像素比例不低于该值时视为文字（笔画细而密）
+TEXT_EDGE_DENSITY = 0.08
+
+# 各类输入在配置的流水线上覆盖的参数，核大小为0表示跳过该步骤：
+#   line_art: 干净的线稿/图标，Otsu全局阈值，不做降噪和边缘增强，只用小核去除锯齿残留
+#   text: 干净的文字，Otsu全局阈值，不做降噪和形态学操作，避免细笔画被开操作去掉
+#   noisy_scan: 有噪声的扫描件，保留降噪和自适应阈值（应对光照不均），不做边缘增强；
+#               闭操作用小核，大核会把阈值后残留的噪点连成片
+#   photo: 照片等连续色调图像，使用配置的完整流水线
+ROUTES = {
+    'line_art': {'threshold_method': 'otsu', 'edge_detection': False,
+                 'median_ksize': 0, 'close_ksize': 3},
+    'text': {'threshold_method': 'otsu', 'edge_detection': False,
+             'median_ksize': 0, 'close_ksize': 0},
+    'noisy_scan': {'threshold_method': 'adaptive', 'edge_detection': False,
+                   'median_ksize': 5, 'close_ksize': 3},
+    'photo': {},
+}
+
+
+def _separation(hist):
+    """Otsu 阈值处的类间方差占总方差的比例（0~1，越接近1越接近双峰）"""
+    p = hist / hist.sum()
+    levels = np.arange(256)
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * levels)
+    total = (p * (levels - mu[-1]) ** 2).sum()
+    if not total:
+        # 单一灰度
+        return 1.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (mu[-1] * omega - mu) ** 2 / (omega * (1 - omega))
+    return float(np.nanmax(between[:-1]) / total)
+
+
+def analyze(gray):
+    """
+    分析灰度图像的内容，返回路由决策
+
+    Returns:
+        {'kind': 输入类别, 'separation': 双峰程度, 'noise': 噪声估计, 'edge_density': 边缘像素比例}
+    """
+    height, width = gray.shape[:2]
+    scale = ANALYSIS_SIDE / max(height, width)
+    small = gray
+    if scale < 1:
+        small = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    hist = cv2.calcHist([small], [0], None, [256], [0, 256]).ravel().astype(np.float64)
+    separation = _separation(hist)
+    edge_density = np.count_nonzero(cv2.Canny(small, 50, 150)) / small.size
+
+    y0 = max(0, (height - NOISE_SAMPLE) // 2)
+    x0 = max(0, (width - NOISE_SAMPLE) // 2)
+    sample = np.ascontiguousarray(gray[y0:y0 + NOISE_SAMPLE, x0:x0 + NOISE_SAMPLE])
+    noise = float(np.median(cv2.absdiff(sample, cv2.medianBlur(sample, 3))))
+
+    features = {
+        'separation': round(separation, 3),
+        'noise': noise,
+        'edge_density': round(edge_density, 3),
+    }
+    return {'kind': classify(**features), **features}
+
+
+def classify(separation, noise, edge_density):
+    """按分析特征分类：'line_art', 'text', 'noisy_scan' 或 'photo'"""
+    if noise <= NOISE_LEVEL and separation >= BIMODAL_SEPARATION:
+        return 'text' if edge_density >= TEXT_EDGE_DENSITY else 'line_art'
+    if noise > NOISE_LEVEL and separation >= SCAN_SEPARATION:
+        return 'noisy_scan'
+    return 'photo'
+
+
+def route_settings(kind, settings):
+    """把类别对应的覆盖参数应用到流水线参数（threshold_method、edge_detection 和核大小）上"""
+    return {**settings, **ROUTES[kind]}
@@ -0,0 +1,238 @@
+"""
+SVG路径数据编码
+
+一次性格式化整个轮廓数组：先按点数生成格式模板，再用一次 % 运算
+把所有坐标填入，避免逐点拼接 f-string。
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+def _coord_format(points, precision):
+    """选择坐标格式：整数、定点小数或原样输出"""
+    if precision is not None:
+        return f"%.{int(precision)}f"
+    if np.issubdtype(points.dtype, np.integer):
+        return "%d"
+    return "%s"
+
+
+@lru_cache(maxsize=1024)
+def _smooth_template(num_curves, tail, fmt):
+    pair = f"{fmt},{fmt}"
+    return (f"M{pair} "
+            + f"C{pair} {pair} {pair} " * num_curves
+            + (f"L{pair} " if tail else "")
+            + "Z")
+
+
+@lru_cache(maxsize=1024)
+def _polyline_template(num_points, fmt):
+    pair = f"{fmt},{fmt}"
+    return f"M{pair} " + f"L{pair} " * (num_points - 1) + "Z"
+
+
+def _values(points, precision):
+    if precision is not None:
+        points = points.astype(np.float64, copy=False)
+    return tuple(points.ravel().tolist())
+
+
+def encode_polyline(points, precision=None):
+    """把点序列编码为只包含 M/L/Z 的闭合路径"""
+    points = np.asarray(points).reshape(-1, 2)
+    if len(points) == 0:
+        return ""
+    fmt = _coord_format(points, precision)
+    return _polyline_template(len(points), fmt) % _values(points, precision)
+
+
+def encode_contour(points, precision=None):
+    """
+    把轮廓编码为闭合路径
+
+    点数不超过4时使用直线；否则从第二个点开始每三个点组成一段三次贝塞尔曲线，
+    不足三个点的剩余部分用一段直线连接（只取剩余的第一个点）。
+    少于3个点的轮廓返回空字符串。
+    """
+    points = np.asarray(points).reshape(-1, 2)
+    n = len(points)
+    if n < 3:
+        return ""
+    if n <= 4:
+        return encode_polyline(points, precision)
+
+    num_curves = (n - 4) // 3 + 1
+    used = 3 * num_curves + 1
+    tail = used < n
+    if tail:
+        used += 1
+    fmt = _coord_format(points, precision)
+    return _smooth_template(num_curves, tail, fmt) % _values(points[:used], precision)
+
+
+_POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+
+
+def encoded_lengths(contours, precision=None):
+    """
+    各轮廓 encode_contour 结果的字符数，不实际格式化
+
+    整数坐标按位数一次性向量化计算；未指定小数位数的浮点坐标逐个编码后取长度。
+    """
+    counts = np.array([len(contour) for contour in contours], np.int64)
+    if not len(counts) or not counts.sum():
+        return np.zeros(len(counts), np.int64)
+    points = np.concatenate([np.asarray(c).reshape(-1, 2) for c in contours if len(c)])
+    if not np.issubdtype(points.dtype, np.integer):
+        if precision is None:
+            return np.array([len(encode_contour(c)) for c in contours], np.int64)
+        # 指定小数位数时浮点坐标的整数部分可能因舍入进位，逐个编码
+        return np.array([len(encode_contour(c, precision)) for c in contours], np.int64)
+
+    # 与 encode_contour 相同的分段：超过4个点时每三个点一段曲线，可能有一段直线
+    curved = counts > 4
+    curves = np.where(curved, (counts - 4) // 3 + 1, 0)
+    used = np.where(curved, 3 * curves + 1, counts)
+    tail = curved & (used < counts)
+    used += tail
+    # 命令字母、逗号和空格：折线每点3个字符，曲线的起点3个、每段7个、直线3个，再加 Z
+    fixed = np.where(curved, 4 + 7 * curves + 3 * tail, 3 * counts + 1)
+
+    values = points.astype(np.int64).ravel()
+    widths = np.searchsorted(_POWERS_OF_TEN, np.abs(values), side='right') + 1 + (values < 0)
+    if precision:
+        widths += 1 + int(precision)
+    cumulative = np.concatenate(([0], np.cumsum(widths.reshape(-1, 2).sum(axis=1))))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    lengths = fixed + cumulative[starts + used] - cumulative[starts]
+    lengths[counts < 3] = 0
+    return lengths
+
+
+def encode_contours(contours, precision=None):
+    """批量编码多个轮廓，跳过空路径"""
+    paths = (encode_contour(contour, precision) for contour in contours)
+    return [path for path in paths if path]
+
+
+# ----------------------------------------------------------------------
+# 紧凑编码
+# ----------------------------------------------------------------------
+def _quantize(points, precision):
+    """把坐标换算为整数单位（10^-precision），相对坐标在整数上计算，不累积舍入误差"""
+    if precision is None:
+        if np.issubdtype(points.dtype, np.integer):
+            return points.astype(np.int64), 0
+        precision = 2
+    scale = 10 ** int(precision)
+    return np.rint(points * scale).astype(np.int64), int(precision)
+
+
+def _format_units(values, precision):
+    """把整数单位格式化为最短的十进制字符串（去掉多余的0和前导0）"""
+    if precision == 0:
+        return [str(v) for v in values]
+    scale = 10 ** precision
+    result = []
+    for v in values:
+        sign = '-' if v < 0 else ''
+        whole, frac = divmod(abs(v), scale)
+        if frac == 0:
+            result.append(f"{sign}{whole}")
+            continue
+        frac_text = f"{frac:0{precision}d}".rstrip('0')
+        result.append(f"{sign}{whole if whole else ''}.{frac_text}")
+    return result
+
+
+def _join_numbers(numbers):
+    """用最少的分隔符连接数字：负号本身可以作为分隔符"""
+    parts = [numbers[0]]
+    for number in numbers[1:]:
+        parts.append(number if number[0] == '-' else ' ' + number)
+    return ''.join(parts)
+
+
+class CompactPathEncoder:
+    """
+    紧凑路径编码
+
+    与 encode_contour 的几何结构相同（相同的点、相同的曲线/直线分段），但使用相对坐标、
+    h/v/s 简写并省略重复的命令字母。同一个编码器连续编码的子路径用于合并到同一个
+    <path> 中：第一个子路径用绝对的 M，之后的子路径用相对上一个子路径起点的 m。
+    """
+
+    def __init__(self, precision=None):
+        self.precision = precision
+        self._start = None
+
+    def encode(self, points):
+        points = np.asarray(points).reshape(-1, 2)
+        n = len(points)
+        if n < 3:
+            return ""
+        q, precision = _quantize(points, self.precision)
+        if n <= 4:
+            segments = [('l', q[1:n])]
+        else:
+            num_curves = (n - 4) // 3 + 1
+            used = 3 * num_curves + 1
+            segments = [('c', q[1:used].reshape(num_curves, 3, 2))]
+            if used < n:
+                segments.append(('l', q[used:used + 1]))
+
+        commands = []
+        start = q[0]
+        if self._start is None:
+            commands.append(('M', start.tolist()))
+        else:
+            commands.append(('m', (start - self._start).tolist()))
+        self._start = start
+        current = start
+
+        for kind, data in segments:
+            if kind == 'l':
+                deltas = np.diff(np.concatenate(([current], data)), axis=0)
+                for dx, dy in deltas.tolist():
+                    if dy == 0:
+                        commands.append(('h', [dx]))
+                    elif dx == 0:
+                        commands.append(('v', [dy]))
+                    else:
+                        commands.append(('l', [dx, dy]))
+                current = data[-1]
+                continue
+            # 每段曲线的起点：上一段的终点
+            origins = np.concatenate(([current], data[:-1, 2]))
+            relative = data - origins[:, None, :]
+            # 第一个控制点是上一段第二个控制点关于起点的反射时使用 s 简写
+            smooth = np.zeros(len(data), bool)
+            smooth[1:] = (data[1:, 0] == 2 * origins[1:] - data[:-1, 1]).all(axis=1)
+            for is_smooth, (cp1, cp2, end) in zip(smooth.tolist(), relative.tolist()):
+                if is_smooth:
+                    commands.append(('s', cp2 + end))
+                else:
+                    commands.append(('c', cp1 + cp2 + end))
+            current = data[-1, 2]
+
+        parts = []
+        previous = None
+        for letter, values in commands:
+            text = _join_numbers(_format_units(values, precision))
+            if letter == previous and letter not in 'Mm':
+                # 重复的命令可以省略字母
+                parts.append(text if text[0] == '-' else ' ' + text)
+            else:
+                parts.append(letter + text)
+            previous = letter
+        parts.append('z')
+        return ''.join(parts)
+
+
+def encode_compact(contours, precision=None):
+    """把多个轮廓编码为一个合并的紧凑路径"""
+    encoder = CompactPathEncoder(precision)
+    return ''.join(encoder.encode(contour) for contour in contours)
@@ -0,0 +1,333 @@
+"""
+流式SVG写入器
+
+不构建DOM，直接按顺序产出SVG文本分块，输出与 svgwrite 的 tostring() 逐字节一致。
+路径数据可以是惰性生成器，写入器按块大小把若干路径合并成一个分块输出。
+紧凑模式（iter_compact_svg）使用精简的文档头，同一样式的子路径合并为一个
+<path>，样式提升到外层 <g>。重复的形状可以写入 <defs> 并用 <use> 引用。多帧输出（iter_animated_svg）每帧一个 <g>，可选用SMIL动画播放。
+"""
+
+import itertools
+
+SVG_OPEN = (
+    '<svg baseProfile="full" height="{height}" version="1.1" '
+    'viewBox="0,0,{width},{height}" width="{width}" '
+    'xmlns="http://www.w3.org/2000/svg" '
+    'xmlns:ev="http://www.w3.org/2001/xml-events" '
+    'xmlns:xlink="http://www.w3.org/1999/xlink">'
+)
+SVG_HEADER = SVG_OPEN + '<defs />'
+DEFS_OPEN = '<defs>'
+DEFS_CLOSE = '</defs>'
+SVG_FOOTER = '</svg>'
+
+BACKGROUND = '<rect fill="white" height="{height}" width="{width}" x="0" y="0" />'
+PATH_ELEMENT = '<path d="{d}" fill="black" fill-opacity="0.9" stroke="none" />'
+LAYER_OPEN = '<g fill="{fill}" stroke="none">'
+LAYER_PATH = '<path d="{d}" />'
+# 外轮廓和孔洞组成的复合路径按 evenodd 规则填充
+EVENODD_PATH_ELEMENT = (
+    '<path d="{d}" fill="black" fill-opacity="0.9" fill-rule="evenodd" stroke="none" />'
+)
+EVENODD_LAYER_PATH = '<path d="{d}" fill-rule="evenodd" />'
+LAYER_CLOSE = '</g>'
+# 实例化形状：单色模式的样式写在定义上，多色模式从 <use> 所在的分组继承填充色
+DEF_PATH_ELEMENT = '<path d="{d}" fill="black" fill-opacity="0.9" id="{id}" stroke="none" />'
+DEF_LAYER_PATH = '<path d="{d}" id="{id}" />'
+USE_ELEMENT = '<use transform="{transform}" xlink:href="#{id}" />'
+FRAME_OPEN = '<g id="frame{index}" data-duration="{duration}"{hidden}>'
+FRAME_HIDDEN = ' display="none"'
+FRAME_CLOSE = '</g>'
+FRAME_ANIMATE = (
+    '<animate attributeName="display" values="{values}" keyTimes="{key_times}" dur="{dur}s" '
+    'calcMode="discrete" repeatCount="{repeat}"{freeze} />'
+)
+ANIMATION_MODES = ('frames', 'smil')
+EMPTY_NOTICE = (
+    '<text fill="gray" font-size="20px" text-anchor="middle" x="{cx}" y="{cy}">'
+    '未检测到有效轮廓</text>'
+    '<rect fill="none" height="{inner_height}" stroke="gray" stroke-width="2" '
+    'width="{inner_width}" x="10" y="10" />'
+)
+
+COMPACT_HEADER = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+    'viewBox="0 0 {width} {height}">'
+)
+COMPACT_BACKGROUND = '<rect width="{width}" height="{height}" fill="#fff"/>'
+COMPACT_GROUP_OPEN = '<g {style}><path d="'
+COMPACT_GROUP_CLOSE = '"/></g>'
+# 单色输出的样式（黑色是默认填充色，无需写出）
+COMPACT_MONO_STYLE = 'fill-opacity=".9"'
+COMPACT_EVENODD_STYLE = 'fill-rule="evenodd"'
+
+# 默认每个分块约64KB
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class EvenOddPath(str):
+    """包含孔洞的复合路径数据，输出的路径元素带 evenodd 填充规则"""
+
+    __slots__ = ()
+
+
+class UseRef:
+    """路径数据序列中代替路径数据的形状引用，输出为 <use>"""
+
+    __slots__ = ('shape_id', 'transform')
+
+    def __init__(self, shape_id, transform):
+        self.shape_id = shape_id
+        self.transform = transform
+
+    def element(self):
+        return USE_ELEMENT.format(id=self.shape_id, transform=self.transform)
+
+
+def _iter_document(elements, width, height, has_transparency, chunk_size, defs=None):
+    """输出SVG头、可选的 <defs> 内容、按块大小合并的元素和结尾"""
+    background = '' if has_transparency else BACKGROUND.format(width=width, height=height)
+    if defs is None:
+        yield SVG_HEADER.format(width=width, height=height) + background
+    else:
+        yield SVG_OPEN.format(width=width, height=height) + DEFS_OPEN
+        elements = itertools.chain(((d, False) for d in defs),
+                                   [(DEFS_CLOSE + background, False)], elements)
+
+    buffer = []
+    buffered = 0
+    valid_paths = 0
+    for element, is_path in elements:
+        buffer.append(element)
+        buffered += len(element)
+        valid_paths += is_path
+        if buffered >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+
+    # 如果没有有效轮廓，添加提示和边框
+    if valid_paths == 0:
+        buffer.append(EMPTY_NOTICE.format(
+            cx=width / 2, cy=height / 2,
+            inner_width=width - 20, inner_height=height - 20,
+        ))
+    buffer.append(SVG_FOOTER)
+    yield ''.join(buffer)
+
+
+def iter_svg(path_data, width, height, has_transparency=False, chunk_size=DEFAULT_CHUNK_SIZE,
+             defs=None):
+    """
+    流式生成SVG文本
+
+    Args:
+        path_data: 路径数据字符串（或 UseRef）的可迭代对象（可以是生成器）
+        width: 图像宽度
+        height: 图像高度
+        has_transparency: 是否保留透明背景（为False时添加白色背景）
+        chunk_size: 每个分块的近似字符数
+        defs: 可选的 <defs> 内容元素（由 shape_definitions 生成）
+    """
+    return _iter_document(path_elements(path_data), width, height, has_transparency, chunk_size,
+                          defs)
+
+
+def shape_definitions(shapes, layered=False):
+    """
+    实例化形状的定义元素
+
+    Args:
+        shapes: (形状id, 路径数据) 的可迭代对象
+        layered: 多色模式下定义不带样式，填充色从 <use> 所在的分组继承
+    """
+    template = DEF_LAYER_PATH if layered else DEF_PATH_ELEMENT
+    return (template.format(id=shape_id, d=d) for shape_id, d in shapes)
+
+
+def path_elements(path_data):
+    """单色路径元素，产出 (元素文本, 是否为路径)"""
+    for d in path_data:
+        if isinstance(d, UseRef):
+            yield d.element(), True
+        elif isinstance(d, EvenOddPath):
+            yield EVENODD_PATH_ELEMENT.format(d=d), True
+        elif d:
+            yield PATH_ELEMENT.format(d=d), True
+
+
+def path_element_overhead(evenodd=False, layered=False):
+    """路径元素中路径数据以外的字符数"""
+    if evenodd:
+        template = EVENODD_LAYER_PATH if layered else EVENODD_PATH_ELEMENT
+    else:
+        template = LAYER_PATH if layered else PATH_ELEMENT
+    return len(template) - len('{d}')
+
+
+def document_size(width, height, has_transparency=False, fills=(), has_paths=True):
+    """
+    标准输出中路径元素以外部分的字节数：文档头、背景、非空分组的标签和结尾
+
+    Args:
+        fills: 含有非空路径的分组的填充色（多色模式）
+        has_paths: 是否有非空路径，没有时计入提示文字和边框
+    """
+    size = len(SVG_HEADER.format(width=width, height=height)) + len(SVG_FOOTER)
+    if not has_transparency:
+        size += len(BACKGROUND.format(width=width, height=height))
+    for fill in fills:
+        size += len(LAYER_OPEN.format(fill=fill)) + len(LAYER_CLOSE)
+    if not has_paths:
+        size += len(EMPTY_NOTICE.format(cx=width / 2, cy=height / 2, inner_width=width - 20,
+                                        inner_height=height - 20).encode('utf-8'))
+    return size
+
+
+def layer_elements(layers):
+    """多色分层元素，每种填充色一个 <g>，产出 (元素文本, 是否为路径)"""
+    for fill, path_data in layers:
+        opened = False
+        for d in path_data:
+            if not d:
+                continue
+            if not opened:
+                yield LAYER_OPEN.format(fill=fill), False
+                opened = True
+            if isinstance(d, UseRef):
+                yield d.element(), True
+            elif isinstance(d, EvenOddPath):
+                yield EVENODD_LAYER_PATH.format(d=d), True
+            else:
+                yield LAYER_PATH.format(d=d), True
+        if opened:
+            yield LAYER_CLOSE, False
+
+
+def iter_layered_svg(layers, width, height, has_transparency=False,
+                     chunk_size=DEFAULT_CHUNK_SIZE, defs=None):
+    """
+    流式生成多色分层SVG，每种填充色一个 <g> 分组
+
+    Args:
+        layers: (填充色, 路径数据可迭代对象) 的序列，按绘制顺序排列（先绘制的在下层）
+        其余参数同 iter_svg
+    """
+    return _iter_document(layer_elements(layers), width, height, has_transparency, chunk_size,
+                          defs)
+
+
+def _fraction(value):
+    return f"{value:.6f}".rstrip('0').rstrip('.') or '0'
+
+
+def _frame_animate(start, duration, total, repeat):
+    """第 index 帧在 [start, start+duration) 内显示的离散动画"""
+    end = start + duration
+    values, key_times = [], []
+    if start > 0:
+        values.append('none')
+        key_times.append(0)
+    values.append('inline')
+    key_times.append(start)
+    if end < total:
+        values.append('none')
+        key_times.append(end)
+    return FRAME_ANIMATE.format(
+        values=';'.join(values),
+        key_times=';'.join(_fraction(t / total) for t in key_times),
+        dur=_fraction(total / 1000),
+        repeat=repeat,
+        # 有限次播放结束后保持最后的状态，否则所有帧都会隐藏
+        freeze='' if repeat == 'indefinite' else ' fill="freeze"',
+    )
+
+
+def _frame_elements(frames, durations, mode, loop):
+    starts = [0] + list(itertools.accumulate(durations))[:-1]
+    total = sum(durations)
+    repeat = 'indefinite' if not loop else str(loop)
+    for index, (elements, start, duration) in enumerate(zip(frames, starts, durations)):
+        yield FRAME_OPEN.format(index=index, duration=duration,
+                                hidden=FRAME_HIDDEN if index else ''), False
+        if mode == 'smil':
+            yield _frame_animate(start, duration, total, repeat), False
+        yield from elements
+        yield FRAME_CLOSE, False
+
+
+def iter_animated_svg(frames, durations, width, height, has_transparency=False, mode='smil',
+                      loop=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    流式生成多帧SVG，每帧一个 <g id="frameN">，只有第一帧默认显示
+
+    Args:
+        frames: 各帧元素的可迭代对象序列（由 path_elements / layer_elements 生成）
+        durations: 各帧显示时长（毫秒，均大于0）
+        mode: 'frames' 只输出帧序列（时长记录在 data-duration 中），
+              'smil' 额外为每帧添加按时长切换显示的 <animate>
+        loop: 播放次数，0表示无限循环（仅 'smil'）
+        其余参数同 iter_svg
+    """
+    if mode not in ANIMATION_MODES:
+        raise ValueError(f"不支持的动画输出模式: {mode}，可选 {ANIMATION_MODES}")
+    elements = _frame_elements(frames, durations, mode, loop)
+    return _iter_document(elements, width, height, has_transparency, chunk_size)
+
+
+def short_hex(color):
+    """把 #rrggbb 缩写为 #rgb（可以缩写时）"""
+    if len(color) == 7 and color[1] == color[2] and color[3] == color[4] and color[5] == color[6]:
+        return '#' + color[1] + color[3] + color[5]
+    return color
+
+
+def iter_compact_svg(groups, width, height, has_transparency=False,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    流式生成紧凑SVG：每个样式一个 <g>，其中的子路径合并为一个 <path>
+
+    Args:
+        groups: (样式属性文本, 子路径数据可迭代对象) 的序列，按绘制顺序排列；
+                子路径数据应来自同一个 CompactPathEncoder，以便使用相对的 m 命令衔接
+        其余参数同 iter_svg
+    """
+    head = COMPACT_HEADER.format(width=width, height=height)
+    if not has_transparency:
+        head += COMPACT_BACKGROUND.format(width=width, height=height)
+    yield head
+
+    buffer = []
+    buffered = 0
+    valid_paths = 0
+    for style, path_data in groups:
+        opened = False
+        for d in path_data:
+            if not d:
+                continue
+            if not opened:
+                buffer.append(COMPACT_GROUP_OPEN.format(style=style))
+                opened = True
+            buffer.append(d)
+            buffered += len(d)
+            valid_paths += 1
+            if buffered >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+                buffered = 0
+        if opened:
+            buffer.append(COMPACT_GROUP_CLOSE)
+
+    if valid_paths == 0:
+        buffer.append(EMPTY_NOTICE.format(
+            cx=width / 2, cy=height / 2,
+            inner_width=width - 20, inner_height=height - 20,
+        ))
+    buffer.append(SVG_FOOTER)
+    yield ''.join(buffer)
+
+
+def iter_encoded(chunks, encoding='utf-8'):
+    """把文本分块逐个编码为字节"""
+    for chunk in chunks:
+        yield chunk.encode(encoding)
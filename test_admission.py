@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+测试准入控制
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionConfig, AdmissionController, AdmissionRejected
+
+
+def _controller(**kwargs):
+    return AdmissionController(AdmissionConfig(**kwargs))
+
+
+def test_queue_full_and_timeout():
+    """超过并发上限的请求排队，队列已满立即拒绝，排队超时拒绝"""
+    print("🚦 测试准入队列...")
+
+    async def scenario():
+        controller = _controller(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        assert await controller.acquire() == 0.0
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.queued == 1
+
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        assert full.value.reason == 'queue_full' and full.value.retry_after >= 1
+
+        with pytest.raises(AdmissionRejected) as timeout:
+            await waiter
+        assert timeout.value.reason == 'timeout'
+        assert controller.queued == 0
+
+        controller.release(0.5)
+        stats = controller.stats()
+        assert stats['active'] == 0
+        assert stats['rejected_queue_full'] == 1 and stats['rejected_timeout'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_cheaper_requests_first():
+    """名额优先转交给开销小的请求"""
+
+    async def scenario():
+        controller = _controller(max_concurrent=1, max_queue=8, queue_timeout=5,
+                                 priority_weight=1.0)
+        await controller.acquire()
+        order = []
+
+        async def request(name, cost):
+            await controller.acquire(cost)
+            order.append(name)
+            controller.release()
+
+        tasks = [asyncio.create_task(request("large", 50.0)),
+                 asyncio.create_task(request("small", 0.1)),
+                 asyncio.create_task(request("medium", 5.0))]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*tasks)
+        assert order == ["small", "medium", "large"]
+        assert controller.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_disabled():
+    async def scenario():
+        controller = _controller(max_concurrent=0)
+        for _ in range(10):
+            await controller.acquire()
+        assert controller.active == 0
+
+    asyncio.run(scenario())
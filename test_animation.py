@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+测试多帧输入的增量追踪
+"""
+
+import io
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from animation import changed_region, plan_chains
+from converter import ImageToSVGConverter
+from decoding import decode_frames, is_animated
+from test_tiling import _make_scan
+
+
+def _make_frames(count=6):
+    """扫描图上移动的圆点，第3帧整体反色（关键帧）"""
+    base = _make_scan()
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        cv2.circle(frame, (60 + 25 * i, 150), 20, 0, -1)
+        if i == 3:
+            frame = 255 - frame
+        frames.append(frame)
+    return frames
+
+
+def _encode(frames, fmt='GIF', **kwargs):
+    images = [Image.fromarray(frame) for frame in frames]
+    buffer = io.BytesIO()
+    images[0].save(buffer, fmt, save_all=True, append_images=images[1:], **kwargs)
+    return buffer.getvalue()
+
+
+def test_plan_chains():
+    """没有变化的帧复用上一帧，变化面积过大的帧开始新的依赖链"""
+    print("🎞️ 测试帧依赖链划分...")
+    frames = _make_frames()
+    frames.insert(2, frames[1].copy())
+    assert changed_region(frames[1], frames[2]) is None
+    x0, y0, x1, y1 = changed_region(frames[0], frames[1])
+    assert x0 >= 40 and x1 <= 110 and y0 >= 130 and y1 <= 171
+    chains = plan_chains(frames)
+    assert [[index for index, _ in chain] for chain in chains] == [[0, 1, 2, 3], [4], [5, 6]]
+    assert chains[0][2] == (2, None)
+    assert len(plan_chains(frames, delta_allowed=False)) == len(frames)
+
+
+def test_delta_trace_matches_full_trace():
+    """增量追踪的每一帧与逐帧完整追踪的结果完全一致"""
+    print("🎞️ 测试增量追踪一致性...")
+    frames = _make_frames()
+    data = _encode(frames, duration=[40, 80, 0, 80, 80, 80], loop=0)
+    assert is_animated(data) and not is_animated(_encode(frames[:1], 'PNG'))
+
+    decoded = decode_frames(data)
+    assert len(decoded.frames) == len(frames)
+    assert decoded.durations[:2] == [40, 80] and decoded.loop == 0
+
+    for config in ({}, {'quality': 'preview'}):
+        converter = ImageToSVGConverter(animation='frames', **config)
+        trace = converter.trace(data)
+        assert trace.delta_frames == 3
+        for frame, pixels in zip(trace.frames, decoded.frames):
+            reference = ImageToSVGConverter(**config).trace_array(pixels)
+            assert [c.tolist() for c in frame.contours] == \
+                [c.tolist() for c in reference.contours]
+
+
+def test_delta_trace_border_fill():
+    """变化区域改变边界背景的连通性（封闭/打开接触边界的C形开口、(0,0)变为前景）时与完整追踪一致"""
+    base = np.full((200, 300), 255, np.uint8)
+    cv2.rectangle(base, (0, 60), (150, 70), 0, -1)
+    cv2.rectangle(base, (140, 60), (150, 140), 0, -1)
+    cv2.rectangle(base, (0, 130), (150, 140), 0, -1)
+    cv2.circle(base, (70, 100), 12, 0, -1)
+    cv2.circle(base, (230, 100), 30, 0, -1)
+    frames = [base.copy() for _ in range(5)]
+    # C形开口在左边界：第1帧封闭开口上方的边界通路，第3帧 (0,0) 变为前景
+    cv2.rectangle(frames[1], (0, 0), (6, 60), 0, -1)
+    cv2.rectangle(frames[2], (0, 0), (6, 60), 0, -1)
+    cv2.circle(frames[2], (230, 30), 8, 0, -1)
+    cv2.circle(frames[3], (0, 0), 15, 0, -1)
+
+    converter = ImageToSVGConverter(animation='frames', threshold_method='fixed')
+    trace = converter.trace(_encode(frames))
+    assert trace.delta_frames == 4
+    for frame, pixels in zip(trace.frames, frames):
+        reference = ImageToSVGConverter(threshold_method='fixed').trace_array(pixels)
+        assert [c.tolist() for c in frame.contours] == \
+            [c.tolist() for c in reference.contours]
+
+
+def test_animated_svg_output():
+    """帧序列和SMIL动画输出；默认只转换第一帧"""
+    frames = _make_frames(3)
+    data = _encode(frames, duration=100, loop=0)
+
+    first = ImageToSVGConverter().convert(data)
+    assert 'frame0' not in first
+
+    svg = ImageToSVGConverter(animation='smil').convert(data)
+    assert svg.count('<g id="frame') == 3 and svg.count('<animate') == 3
+    assert '<g id="frame0" data-duration="100"><animate' in svg
+    assert '<g id="frame1" data-duration="100" display="none">' in svg
+    assert 'values="none;inline;none" keyTimes="0;0.333333;0.666667" dur="0.3s"' in svg
+    assert 'repeatCount="indefinite"' in svg
+
+    frames_only = ImageToSVGConverter(animation='frames').convert(data)
+    assert frames_only.count('<g id="frame') == 3 and '<animate' not in frames_only
+
+
+def test_color_apng():
+    """多色模式的APNG逐帧追踪，保留透明度"""
+    rgba = []
+    for i in range(3):
+        frame = np.zeros((120, 160, 4), np.uint8)
+        cv2.rectangle(frame, (10 + 20 * i, 20), (70 + 20 * i, 90), (200, 30, 30, 255), -1)
+        cv2.circle(frame, (120, 60), 25, (30, 30, 200, 255), -1)
+        rgba.append(frame)
+    images = [Image.fromarray(frame, 'RGBA') for frame in rgba]
+    buffer = io.BytesIO()
+    images[0].save(buffer, 'PNG', save_all=True, append_images=images[1:], duration=50)
+    converter = ImageToSVGConverter(animation='smil', color_mode='color', num_colors=3)
+    trace = converter.trace(buffer.getvalue())
+    assert len(trace.frames) == 3 and trace.has_transparency
+    assert all(frame.layers for frame in trace.frames)
+    svg = ''.join(converter.iter_svg(trace))
+    assert '<rect fill="white"' not in svg and svg.count('<animate') == 3
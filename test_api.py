@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+测试转换接口的配置校验
+"""
+
+import io
+import json
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import main
+from executor import ConversionExecutor, ExecutorConfig
+
+
+def test_invalid_config_rejected():
+    """无效的阈值方法、质量档位、动画、实例化和流水线选择返回400而不是转换错误500"""
+    print("🚫 测试配置校验...")
+    for field, value in (('quality', 'ultra'), ('animation', 'loop'),
+                         ('instancing', 'mirror'), ('route', 'smart'),
+                         ('threshold_method', 'triangle'), ('tile_size', -64)):
+        with pytest.raises(HTTPException) as error:
+            main.validate_config({field: value})
+        assert error.value.status_code == 400 and str(value) in error.value.detail
+    main.validate_config({'quality': 'high', 'route': 'auto', 'holes': True})
+
+
+def test_batch_invalid_item_config(monkeypatch):
+    """批量转换中单个文件的配置无效时只在清单中记录错误，其他文件照常转换"""
+    print("📦 测试批量逐文件配置校验...")
+    executor = ConversionExecutor(ExecutorConfig(mode='thread', max_workers=1, warmup=False))
+    monkeypatch.setattr(main, 'executor', executor)
+    image = np.full((40, 40), 255, dtype=np.uint8)
+    image[10:30, 10:30] = 0
+    png = cv2.imencode('.png', image)[1].tobytes()
+    files = [('files', (name, png, 'image/png')) for name in ('a.png', 'b.png', 'c.png')]
+    configs = {'b.png': {'quality': 'ultra'}, 'c.png': {'num_colors': 'many'}}
+    try:
+        client = TestClient(main.app)
+        response = client.post('/api/convert/batch/', files=files,
+                               data={'configs': json.dumps(configs)})
+        assert response.status_code == 200
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        manifest = json.loads(archive.read('manifest.json'))
+        assert [entry['status'] for entry in manifest] == ['ok', 'error', 'error']
+        assert 'ultra' in manifest[1]['error'] and 'a.svg' in archive.namelist()
+        response = client.post('/api/convert/batch/', files=files[:1], data={'configs': '{'})
+        assert response.status_code == 400
+    finally:
+        executor.shutdown()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试批量转换辅助工具
+"""
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from batch import (
+    BatchLimits, BatchTooLarge, MultipartStreamWriter, ZipStreamWriter, extract_zip_images,
+    output_names, parse_batch_configs,
+)
+
+
+def test_parse_batch_configs():
+    """共享配置与逐文件配置合并"""
+    print("📦 测试批量配置解析...")
+    names = ["a.png", "dir/b.png"]
+    shared = json.dumps({"threshold_method": "otsu"})
+
+    assert parse_batch_configs(names, shared) == [{"threshold_method": "otsu"}] * 2
+
+    by_index = parse_batch_configs(names, shared, json.dumps([{}, {"threshold_method": "fixed"}]))
+    assert by_index[1] == {"threshold_method": "fixed"}
+
+    by_name = parse_batch_configs(names, None, json.dumps({"b.png": {"min_contour_area": 5}}))
+    assert by_name == [{}, {"min_contour_area": 5}]
+
+    with pytest.raises(ValueError):
+        parse_batch_configs(names, None, json.dumps([{}]))
+
+
+def test_output_names_unique():
+    assert output_names(["a.png", "a.jpg", "a.png"]) == ["a.svg", "a_1.svg", "a_2.svg"]
+
+
+def test_output_names_stay_inside_archive():
+    """输出文件名去掉目录部分、.. 和盘符，重名时仍然去重"""
+    names = ["x/a.png", "../evil.png", "/etc/a.png", "C:\\tmp\\a.png", "..", "c:evil.png"]
+    assert output_names(names) == ["a.svg", "evil.svg", "a_1.svg", "a_2.svg", "file.svg",
+                                   "evil_1.svg"]
+    assert output_names(["x/a.png"], keep_dirs=True) == ["x/a.svg"]
+
+
+def test_zip_limits():
+    """解压前按ZIP目录中的大小检查文件数量、单个文件和总大小"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as source:
+        for index in range(3):
+            source.writestr(f"{index}.png", b"\0" * (1024 * 1024))
+        source.writestr("notes.txt", b"text")
+    data = buffer.getvalue()
+    assert len(extract_zip_images(data, BatchLimits(max_items=3, max_file_mb=1))) == 3
+    for limits in (BatchLimits(max_items=2), BatchLimits(max_file_mb=0.5),
+                   BatchLimits(max_total_mb=2.5)):
+        with pytest.raises(BatchTooLarge):
+            extract_zip_images(data, limits)
+
+
+def test_zip_stream_roundtrip():
+    """流式ZIP逐个输出，拼接后是合法的ZIP包"""
+    writer = ZipStreamWriter()
+    parts = [writer.add("one.svg", b"<svg/>"), writer.add("two.svg", b"<svg></svg>")]
+    assert all(parts)
+    parts.append(writer.close())
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(parts)))
+    assert archive.read("two.svg") == b"<svg></svg>"
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as source:
+        source.writestr("x/one.png", b"png")
+        source.writestr("__MACOSX/x/._one.png", b"meta")
+        source.writestr("notes.txt", b"text")
+    assert extract_zip_images(buffer.getvalue()) == [("x/one.png", b"png")]
+
+
+def test_multipart_writer():
+    writer = MultipartStreamWriter(boundary="b")
+    body = writer.add("one.svg", b"<svg/>") + writer.close()
+    assert body.startswith(b"--b\r\nContent-Type: image/svg+xml\r\n")
+    assert body.endswith(b"--b--\r\n")
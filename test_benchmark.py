@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+测试基准测试套件
+"""
+
+import json
+
+import numpy as np
+
+import benchmark
+
+
+def test_corpus_is_deterministic():
+    """相同种子生成相同的图像集"""
+    print("🎲 测试图像集确定性...")
+    for kind in benchmark.CORPUS_KINDS:
+        a = benchmark.make_image(kind, 64, seed=3)
+        b = benchmark.make_image(kind, 64, seed=3)
+        assert a.shape == (64, 64, 3)
+        assert np.array_equal(a, b)
+
+
+def test_suite_reports_stages(tmp_path):
+    """小尺寸完整运行，输出各阶段耗时和峰值内存，并能与基线比较"""
+    print("⏱ 测试基准测试运行...")
+    baseline = tmp_path / "baseline.json"
+    assert benchmark.main(["--sizes", "64", "--repeats", "1",
+                           "--save-baseline", str(baseline)]) == 0
+    report = json.loads(baseline.read_text(encoding="utf-8"))
+    case = report["results"]["line_art_64"]
+    for stage in benchmark.STAGES:
+        assert stage in case["stages_ms"]
+    assert case["peak_memory_mb"] > 0
+
+
+def test_regression_detection():
+    """超过阈值且超过最小差值的变化才视为回退"""
+    baseline = {"results": {"x": {"stages_ms": {"svg": 10.0, "decode": 0.1},
+                                  "peak_memory_mb": 10.0}}}
+    current = {"x": {"stages_ms": {"svg": 20.0, "decode": 0.5}, "peak_memory_mb": 10.5}}
+    regressions = benchmark.compare_with_baseline(current, baseline, threshold=0.25,
+                                                  min_delta_ms=2.0, memory_threshold=0.10)
+    assert [(name, metric) for name, metric, _, _ in regressions] == [("x", "svg")]
+
+
+def test_latency_targets():
+    """只检查参考尺寸用例，耗时不计解码"""
+    target = benchmark.QUALITY_TIERS["preview"]["latency_target_ms"]
+    size = benchmark.LATENCY_REFERENCE_SIZE
+    results = {
+        f"text_{size}": {"stages_ms": {"decode": 500.0, "total": 500.0 + target / 2}},
+        f"photo_{size}": {"stages_ms": {"decode": 1.0, "total": target + 2.0}},
+        "photo_64": {"stages_ms": {"decode": 1.0, "total": target * 10}},
+    }
+    failures = benchmark.check_latency_targets(results, "preview")
+    assert [name for name, _, _ in failures] == [f"photo_{size}"]
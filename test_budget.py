@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+测试输出大小预算
+"""
+
+import cv2
+import numpy as np
+
+from budget import BudgetSearch
+from converter import ImageToSVGConverter
+from svg_path import encode_contour, encoded_lengths
+
+
+def _make_shapes(count=120, seed=0):
+    """白色背景上互不重叠的若干黑色多边形和圆"""
+    rng = np.random.default_rng(seed)
+    image = np.full((600, 900), 255, np.uint8)
+    for i in range(count):
+        cx, cy = 40 + (i % 12) * 70, 40 + (i // 12) * 55
+        if i % 3:
+            angles = np.sort(rng.uniform(0, 2 * np.pi, 40))
+            radii = rng.uniform(14, 24, 40)
+            points = np.stack([cx + radii * np.cos(angles), cy + radii * np.sin(angles)], axis=1)
+            cv2.fillPoly(image, [points.astype(np.int32)], 0)
+        else:
+            cv2.circle(image, (cx, cy), int(rng.integers(6, 22)), 0, -1)
+    return image
+
+
+def test_encoded_lengths():
+    """不编码直接计算的路径长度与 encode_contour 一致"""
+    print("📏 测试路径长度计算...")
+    rng = np.random.default_rng(1)
+    contours = [rng.integers(-50, 200000, (n, 1, 2)).astype(np.int32)
+                for n in rng.integers(0, 30, 500)]
+    for precision in (None, 0, 2):
+        expected = [len(encode_contour(c, precision)) for c in contours]
+        assert encoded_lengths(contours, precision).tolist() == expected
+    floats = [c.astype(np.float64) / 3 for c in contours[:50]]
+    assert encoded_lengths(floats).tolist() == [len(encode_contour(c)) for c in floats]
+
+
+def test_byte_budget():
+    """预算足够时输出不变；预算不足时增大容差，报告的字节数与实际输出一致"""
+    image = _make_shapes()
+    svg = ImageToSVGConverter(quality='high').convert_array(image)
+
+    converter = ImageToSVGConverter(quality='high', max_bytes=len(svg))
+    trace = converter.trace_array(image)
+    assert ''.join(converter.iter_svg(trace)) == svg
+    assert trace.budget['epsilon'] == 0.005 and trace.budget['bytes'] == len(svg)
+    assert trace.budget['met'] and 'budget' in trace.stage_timings
+
+    for max_bytes in (len(svg) * 3 // 4, len(svg) // 2):
+        converter = ImageToSVGConverter(quality='high', max_bytes=max_bytes)
+        trace = converter.trace_array(image)
+        output = ''.join(converter.iter_svg(trace))
+        report = trace.budget
+        assert report['met'] and len(output) == report['bytes'] <= max_bytes
+        # 只有一部分轮廓使用选定的容差，其余使用上一档，输出接近预算
+        assert report['epsilon'] > 0.005 and report['simplified_contours'] < len(trace.contours)
+        assert report['bytes'] > max_bytes * 0.99 and report['dropped_contours'] == 0
+        assert report['levels_evaluated'] <= 6
+        assert report['points'] == sum(len(c) for c in trace.contours)
+
+
+def test_points_budget_and_drop():
+    """点数预算；最大容差仍超出预算时丢弃面积最小的轮廓，无法满足时输出不变"""
+    image = _make_shapes()
+    plain = ImageToSVGConverter(quality='high').trace_array(image)
+    points = sum(len(c) for c in plain.contours)
+
+    trace = ImageToSVGConverter(quality='high', max_points=points // 2).trace_array(image)
+    assert trace.budget['met'] and trace.budget['points'] <= points // 2
+    assert len(trace.contours) == len(plain.contours)
+
+    # 每个轮廓至少3个点，120个轮廓放不进200个点
+    trace = ImageToSVGConverter(quality='high', max_points=200).trace_array(image)
+    dropped = trace.budget['dropped_contours']
+    assert trace.budget['met'] and dropped > 0 and trace.budget['epsilon'] == 0.16
+    assert sum(len(c) for c in trace.contours) <= 200
+    assert len(trace.contours) == len(plain.contours) - dropped
+    # 丢弃的是面积最小的轮廓（按所在的网格位置比较）
+    def cells(contours):
+        return {tuple(np.rint((c.reshape(-1, 2).mean(axis=0) - 40) / (70, 55)).astype(int))
+                for c in contours}
+    smallest = sorted(plain.contours, key=cv2.contourArea)[:dropped]
+    assert cells(trace.contours) == cells(plain.contours) - cells(smallest)
+
+    svg = ImageToSVGConverter().convert_array(image)
+    converter = ImageToSVGConverter(max_bytes=100)
+    trace = converter.trace_array(image)
+    assert not trace.budget['met'] and ''.join(converter.iter_svg(trace)) == svg
+
+
+def test_layers_and_holes():
+    """多色分层和孔洞模式下报告的字节数同样与实际输出一致"""
+    gray = _make_shapes(seed=2)
+    color = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+    color[:300, :, 0] = np.where(gray[:300] == 0, 200, 255)
+    cv2.circle(gray, (450, 300), 200, 0, 20)
+    for image, options in ((color, {'color_mode': 'color', 'num_colors': 3}),
+                           (gray, {'holes': True})):
+        full = len(ImageToSVGConverter(**options).convert_array(image))
+        converter = ImageToSVGConverter(max_bytes=full * 2 // 3, **options)
+        trace = converter.trace_array(image)
+        assert trace.budget['met'] and trace.budget['epsilon'] > 0.02
+        assert len(''.join(converter.iter_svg(trace))) == trace.budget['bytes']
+
+
+def test_search_caches_levels():
+    """每一档的简化结果只计算一次，再次搜索只使用缓存"""
+    rings = [(np.array([[[0, 0]], [[50, 2]], [[100, 0]], [[98, 50]], [[100, 100]], [[0, 100]]],
+                       np.int32),)]
+    calls = []
+
+    def measure(contours):
+        calls.append(len(contours))
+        return [[sum(len(r) for r in c) * 10, sum(len(r) for r in c)] for c in contours]
+
+    search = BudgetSearch(rings, measure)
+    _, sizes, report = search.fit(max_points=4)
+    assert report['met'] and sizes[0, 1] == 4
+    assert len(calls) == report['levels_evaluated']
+    search.fit(max_points=5)
+    assert len(calls) == report['levels_evaluated']
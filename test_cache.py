@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+测试转换结果缓存
+"""
+
+import asyncio
+import threading
+import time
+
+import main
+from cache import ConversionCache, make_cache_key
+from converter import ImageToSVGConverter
+from executor import ConversionExecutor, ExecutorConfig
+from test_executor import _make_png
+
+
+def test_cache_key_normalized():
+    """缓存键只取决于输入字节和规范化配置"""
+    print("🔑 测试缓存键...")
+    data = _make_png()
+    a = ImageToSVGConverter(threshold_method='OTSU', min_contour_area='50').config_dict()
+    b = ImageToSVGConverter(threshold_method='otsu', min_contour_area=50).config_dict()
+    assert make_cache_key(data, a) == make_cache_key(data, b)
+    assert make_cache_key(data, a) != make_cache_key(data + b"x", a)
+
+
+def test_memory_lru_eviction():
+    """内存层按LRU淘汰"""
+    print("🗂 测试LRU淘汰...")
+    cache = ConversionCache(max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_entries"] == 2
+
+
+def test_memory_bytes_encoded():
+    """内存层按UTF-8编码后的字节数计算占用"""
+    print("📏 测试内存占用统计...")
+    cache = ConversionCache(max_memory_bytes=10)
+    cache.put("a", "路径")
+    assert cache.stats()["memory_bytes"] == 6
+    cache.put("b", "路径")
+    assert cache.get("a") is None and cache.stats()["memory_bytes"] == 6
+
+
+def test_disk_tier_size_eviction(tmp_path):
+    """磁盘层按总大小淘汰，并在重启后仍可命中"""
+    print("💽 测试磁盘层...")
+    cache = ConversionCache(max_entries=0, disk_dir=tmp_path, max_disk_bytes=25)
+    cache.put("k1", "x" * 10)
+    cache.put("k2", "y" * 10)
+    cache.put("k3", "z" * 10)
+    assert cache.stats()["disk_evictions"] == 1
+
+    reopened = ConversionCache(max_entries=0, disk_dir=tmp_path, max_disk_bytes=25)
+    assert reopened.get("k1") is None
+    assert reopened.get("k3") == "z" * 10
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_converter_uses_cache():
+    """转换器命中缓存时不重复转换"""
+    print("♻️ 测试转换器缓存...")
+    cache = ConversionCache()
+    converter = ImageToSVGConverter(cache=cache)
+    first = converter.convert(_make_png())
+    second = converter.convert(_make_png())
+    assert first == second
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["hits"] == 1
+
+
+def test_concurrent_requests_coalesced():
+    """并发的相同请求只计算一次"""
+    print("🔗 测试请求合并...")
+    cache = ConversionCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "<svg/>"
+
+    threads = [threading.Thread(target=cache.get_or_compute, args=("key", compute))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+
+    async def run_async():
+        async def acompute():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "<svg/>"
+        return await asyncio.gather(*[cache.aget_or_compute("other", acompute) for _ in range(4)])
+
+    assert asyncio.run(run_async()) == ["<svg/>"] * 4
+    assert len(calls) == 2
+
+
+def test_trace_report_cached_with_result(monkeypatch):
+    """追踪报告和SVG存在同一个缓存条目中，命中时只计一次命中"""
+    print("🧾 测试追踪报告缓存...")
+    cache = ConversionCache()
+    executor = ConversionExecutor(ExecutorConfig(mode='thread', max_workers=1, warmup=False))
+    monkeypatch.setattr(main, 'result_cache', cache)
+    monkeypatch.setattr(main, 'executor', executor)
+    config = {'route': 'auto'}
+
+    async def convert():
+        report = {}
+        chunks = await main.stream_conversion(_make_png(), config, trace_report=report)
+        return b''.join(chunks), report
+
+    try:
+        first, first_report = asyncio.run(convert())
+        second, second_report = asyncio.run(convert())
+    finally:
+        executor.shutdown()
+    assert first == second and first.startswith(b'<')
+    assert 'route' in first_report and second_report == first_report
+    stats = cache.stats()
+    assert stats["memory_entries"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 1
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试批量转换命令行工具
+"""
+
+import asyncio
+import gzip
+import json
+
+import cv2
+import numpy as np
+import pytest
+
+import cli
+from converter import ImageToSVGConverter
+
+
+def _write_images(root):
+    """在目录及子目录中写入几张图片和一个无关文件"""
+    (root / 'nested').mkdir(parents=True)
+    paths = []
+    for i, name in enumerate(('a.png', 'b.jpg', 'nested/c.png')):
+        image = np.full((80, 120), 255, np.uint8)
+        cv2.circle(image, (30 + 20 * i, 40), 15, 0, -1)
+        cv2.imwrite(str(root / name), image)
+        paths.append(root / name)
+    (root / 'notes.txt').write_text('skip me')
+    return paths
+
+
+def test_collect_inputs(tmp_path):
+    """目录（可递归）和通配符展开为去重、排序的输入列表"""
+    print("🗂 测试输入展开...")
+    _write_images(tmp_path / 'in')
+    names = [name for _, name in cli.collect_inputs([str(tmp_path / 'in')])]
+    assert names == ['a.png', 'b.jpg']
+    names = [name for _, name in cli.collect_inputs([str(tmp_path / 'in')], recursive=True)]
+    assert names == ['a.png', 'b.jpg', 'nested/c.png']
+    inputs = cli.collect_inputs([str(tmp_path / 'in' / '**' / '*.png'), str(tmp_path / 'in' / 'a.png')])
+    assert [name for _, name in inputs] == ['a.png', 'c.png']
+    with pytest.raises(FileNotFoundError):
+        cli.collect_inputs([str(tmp_path / 'missing')])
+
+
+def test_batch_run_and_manifest_skip(tmp_path, capsys):
+    """并行转换并写入清单；重新运行时跳过未变化的文件，输入或配置变化时重新转换"""
+    print("🚀 测试批量转换...")
+    paths = _write_images(tmp_path / 'in')
+    out = tmp_path / 'out'
+    report = tmp_path / 'report.json'
+    args = [str(tmp_path / 'in'), '-o', str(out), '-r', '--workers', '2', '--prefetch', '1']
+
+    assert cli.main(args + ['--report', str(report)]) == 0
+    summary = json.loads(report.read_text(encoding='utf-8'))['summary']
+    assert summary['converted'] == 3 and summary['skipped'] == 0
+    assert summary['files_per_second'] > 0 and summary['per_file_ms']['max'] > 0
+    assert {'decode', 'svg'} <= set(summary['stage_totals_ms'])
+    expected = ImageToSVGConverter().convert(paths[2].read_bytes())
+    assert (out / 'nested' / 'c.svg').read_text() == expected
+    manifest = json.loads((out / cli.MANIFEST_NAME).read_text(encoding='utf-8'))['files']
+    assert sorted(manifest) == ['a.svg', 'b.svg', 'nested/c.svg']
+
+    image = cv2.imread(str(paths[0]), cv2.IMREAD_GRAYSCALE)
+    cv2.imwrite(str(paths[0]), 255 - image)
+    assert cli.main(args + ['--report', str(report)]) == 0
+    summary = json.loads(report.read_text(encoding='utf-8'))['summary']
+    assert summary['converted'] == 1 and summary['skipped'] == 2
+    assert '吞吐量' in capsys.readouterr().out
+
+    # 配置变化时全部重新转换
+    assert cli.main(args + ['--quality', 'preview', '--report', str(report)]) == 0
+    assert json.loads(report.read_text(encoding='utf-8'))['summary']['converted'] == 3
+
+
+def test_memory_map_svgz_and_failures(tmp_path):
+    """内存映射模式输出 .svgz；无法解码的文件记为失败，不影响其他文件"""
+    paths = _write_images(tmp_path / 'in')
+    (tmp_path / 'in' / 'broken.png').write_bytes(b'not an image')
+    out = tmp_path / 'out'
+    runner = cli.BatchRunner(out, {'threshold_method': 'otsu'}, workers=2,
+                             output_format='svgz', memory_map=True)
+    results = asyncio.run(runner.run(cli.collect_inputs([str(tmp_path / 'in')])))
+    assert [r['status'] for r in results] == ['converted', 'converted', 'failed']
+    svg = gzip.decompress((out / 'a.svgz').read_bytes()).decode()
+    assert svg == ImageToSVGConverter(threshold_method='otsu').convert(paths[0].read_bytes())
+    assert cli.summarize(results, 1.0)['failed'] == 1
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+测试响应压缩
+"""
+
+import gzip
+
+import pytest
+
+from compression import CompressionConfig, iter_compressed, negotiate
+
+
+def test_negotiate():
+    """按权重选择编码，权重相同时优先 br，q=0 表示拒绝"""
+    print("🗜️ 测试压缩编码协商...")
+    both = ('br', 'gzip')
+    assert negotiate('gzip, deflate, br', both) == 'br'
+    assert negotiate('gzip, br;q=0.5', both) == 'gzip'
+    assert negotiate('br', ('gzip',)) is None
+    assert negotiate('*', both) == 'br'
+    assert negotiate('*;q=0.1, gzip;q=0.5', both) == 'gzip'
+    assert negotiate('gzip;q=0, identity', both) is None
+    assert negotiate('', both) is None
+    assert negotiate(None, both) is None
+
+
+def test_iter_compressed_incremental():
+    """逐块压缩：惰性消费输入，输出可以还原为原始字节"""
+    consumed = []
+
+    def chunks():
+        for i in range(50):
+            consumed.append(i)
+            yield f'<path d="M{i} 0h10v10h-10z"/>'.encode() * 200
+
+    compressed = iter_compressed(chunks(), 'gzip', CompressionConfig(gzip_level=1))
+    first = next(compressed)
+    assert first and len(consumed) < 50
+    data = first + b''.join(compressed)
+    original = b''.join(f'<path d="M{i} 0h10v10h-10z"/>'.encode() * 200 for i in range(50))
+    assert gzip.decompress(data) == original
+    assert len(data) < len(original) / 10
+
+    with pytest.raises(ValueError):
+        list(iter_compressed(iter(()), 'deflate'))
+    with pytest.raises(ValueError):
+        CompressionConfig(gzip_level=0)
+
+
+def test_brotli():
+    """安装了 brotli 时支持 br 编码"""
+    brotli = pytest.importorskip('brotli')
+    chunks = [b'<svg>', b'<path d="M0 0h1v1z"/>' * 100, b'</svg>']
+    data = b''.join(iter_compressed(iter(chunks), 'br'))
+    assert brotli.decompress(data) == b''.join(chunks)
@@ -140,6 +140,39 @@ def test_performance():
         
         print(f"  {width}x{height}: {end_time - start_time:.3f}s, SVG: {len(svg_content)} 字符")
 
+def test_quality_tiers():
+    """测试质量档位：预览档位缩小处理，输出坐标仍对应原图"""
+    print("\n🎚 测试质量档位...")
+    
+    from PIL import Image, ImageDraw
+    import io
+    import re
+    
+    test_image = Image.new('RGB', (1600, 1200), 'white')
+    draw = ImageDraw.Draw(test_image)
+    draw.rectangle([400, 300, 1200, 900], fill='black')
+    
+    img_buffer = io.BytesIO()
+    test_image.save(img_buffer, format='PNG')
+    img_data = img_buffer.getvalue()
+    
+    for quality in ('preview', 'standard', 'high'):
+        converter = ImageToSVGConverter(quality=quality)
+        svg_content = converter.convert(img_data)
+        assert 'viewBox="0,0,1600,1200"' in svg_content
+        # 矩形角点在原图坐标中的误差不超过一个缩放步长
+        xs = [int(x) for x in re.findall(r'[MLC ](\d+),\d+', svg_content.split('<path d="')[1])]
+        assert abs(min(xs) - 400) <= 4 and abs(max(xs) - 1200) <= 4
+        print(f"  {quality}: {len(svg_content)} 字符, 阶段: {sorted(converter.stage_timings)}")
+    
+    assert 'downscale' in ImageToSVGConverter(quality='preview').trace(img_data).stage_timings
+    try:
+        ImageToSVGConverter(quality='ultra')
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("未知质量档位应当报错")
+
 def save_test_results():
     """保存测试结果"""
     print("\n💾 保存测试结果...")
@@ -167,6 +200,7 @@ def main():
         test_different_configs()
         test_transparency()
         test_performance()
+        test_quality_tiers()
         save_test_results()
         
         print("\n" + "=" * 50)
@@ -176,6 +210,7 @@ def main():
         print("  ✓ 配置选项工作正常")
         print("  ✓ 透明度处理正常")
         print("  ✓ 性能表现良好")
+        print("  ✓ 质量档位正常")
         
     except Exception as e:
         print(f"\n❌ 测试失败: {str(e)}")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+测试最小二乘三次贝塞尔曲线拟合
+"""
+
+import re
+
+import cv2
+import numpy as np
+
+from converter import ImageToSVGConverter
+from curve_fit import _evaluate, fit_contours, sample_curves
+from test_holes import CONFIG, _make_rings
+
+
+def _contours(image):
+    contours, _ = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+def _blobs(seed=0, size=600):
+    """随机的平滑斑块（黑色），四周留白"""
+    rng = np.random.default_rng(seed)
+    noise = cv2.GaussianBlur(rng.random((size, size)).astype(np.float32), (0, 0), 8)
+    image = np.where(noise < 0.5, 0, 255).astype(np.uint8)
+    image[:20] = image[-20:] = 255
+    image[:, :20] = image[:, -20:] = 255
+    return image
+
+
+def _render(contours, shape):
+    """按 encode_contour 的分段方式（起点后每三个点一段曲线，余下的点为直线）画出填充区域"""
+    mask = np.zeros(shape, np.uint8)
+    for contour in contours:
+        points = contour.reshape(-1, 2).astype(np.float64)
+        if len(points) > 4:
+            segments = (len(points) - 4) // 3 + 1
+            ctrl = points[3 * np.arange(segments)[:, None] + np.arange(4)]
+            u = np.tile(np.arange(16) / 16, segments)
+            points = np.vstack([_evaluate(np.repeat(ctrl, 16, axis=0), u),
+                                points[3 * segments:]])
+        cv2.fillPoly(mask, [np.rint(points * 8).astype(np.int32)], 1, shift=3)
+    return mask
+
+
+def test_fit_shapes():
+    """圆拟合为少量曲线段，误差不超过容差（取整的控制点最多再偏差半个像素的对角线）"""
+    print("〰️ 测试曲线拟合...")
+    image = np.zeros((300, 300), np.uint8)
+    cv2.circle(image, (150, 150), 80, 255, -1)
+    contours = _contours(image)
+    fitted, report = fit_contours(contours, 1.5)
+    assert len(fitted[0]) == 13 and fitted[0].dtype == np.int32
+    assert report['segments'] == 4 and report['input_points'] == len(contours[0])
+    assert report['max_error'] <= 1.5 + 0.71 and report['mean_error'] < report['max_error']
+    # 闭合：最后一段曲线回到起点
+    assert (fitted[0][0] == fitted[0][-1]).all()
+
+    # 不取整时每个原轮廓点到曲线上对应参数处的距离不超过容差
+    blobs = _contours(255 - _blobs())
+    for tolerance in (0.5, 1.0, 2.0):
+        fitted, report = fit_contours(blobs, tolerance, integer=False)
+        assert report['max_error'] <= tolerance
+        assert all(len(c) % 3 == 1 and len(c) >= 7 for c, raw in zip(fitted, blobs)
+                   if len(raw) >= 4)
+    # 容差越大，曲线段越少
+    segments = [fit_contours(blobs, t)[1]['segments'] for t in (0.5, 1.0, 2.0)]
+    assert segments[0] > segments[1] > segments[2]
+
+    # 不足4个点的轮廓原样返回；采样只处理拟合结果
+    triangle = np.array([[[0, 0]], [[10, 0]], [[5, 8]]], np.int32)
+    assert fit_contours([triangle], 1.0)[0][0] is triangle
+    assert sample_curves(triangle) is triangle
+    assert sample_curves(fitted[0]).shape == (8 * (len(fitted[0]) // 3), 1, 2)
+
+
+def test_converter_output():
+    """拟合结果只包含三次曲线命令；面积误差远小于折线简化，输出比不简化的轮廓小得多"""
+    image = _blobs()
+    reference = ImageToSVGConverter(simplify_contours=False).trace_array(image)
+    expected = _render(reference.contours, image.shape)
+
+    converter = ImageToSVGConverter(fit_tolerance=1)
+    trace = converter.trace_array(image)
+    svg = ''.join(converter.iter_svg(trace))
+    assert trace.curve_fit['tolerance'] == 1.0 and trace.curve_fit['segments'] > 0
+    paths = re.findall(r'<path d="([^"]*)"', svg)
+    assert paths and all(re.fullmatch(r'M[\d,]+( C[\d, ]+)+ Z', d) for d in paths)
+    assert ImageToSVGConverter(fit_tolerance=1, svg_backend='svgwrite').convert_array(image) == svg
+
+    fitted_error = np.count_nonzero(_render(trace.contours, image.shape) != expected)
+    high = ImageToSVGConverter(quality='high').trace_array(image)
+    assert fitted_error * 5 < np.count_nonzero(_render(high.contours, image.shape) != expected)
+    assert len(svg) * 2 < len(ImageToSVGConverter(simplify_contours=False).convert_array(image))
+    assert ImageToSVGConverter().trace_array(image).curve_fit is None
+
+    # 指定小数位数时输出浮点控制点
+    precise = ImageToSVGConverter(fit_tolerance=1, precision=1).convert_array(image)
+    assert re.search(r'C\d+\.\d,\d+\.\d', precise)
+
+
+def test_modes():
+    """孔洞、多色分层、紧凑输出和实例化模式下同样拟合；多色模式合并各层的报告"""
+    image = _make_rings()
+    trace = ImageToSVGConverter(fit_tolerance=1, holes=True, **CONFIG).trace_array(image)
+    plain = ImageToSVGConverter(fit_tolerance=1, **CONFIG).trace_array(image)
+    assert trace.curve_fit['segments'] > plain.curve_fit['segments']
+    compact = ImageToSVGConverter(fit_tolerance=1, holes=True, compact=True,
+                                  **CONFIG).convert_array(image)
+    assert 'fill-rule="evenodd"' in compact and re.search(r'\dc-?\d', compact)
+
+    color = np.full((160, 320, 3), 255, np.uint8)
+    for x in (60, 160, 260):
+        cv2.circle(color, (x, 80), 40, (200, 30, 30), -1)
+        cv2.circle(color, (x, 80), 15, (30, 30, 200), -1)
+    converter = ImageToSVGConverter(fit_tolerance=1, color_mode='color', num_colors=3,
+                                    instancing='rotate', edge_detection=False)
+    trace = converter.trace_array(color)
+    assert len(trace.layers) == 3
+    assert trace.curve_fit['segments'] == sum(len(c) // 3 for c in trace.contours)
+    # 曲线拟合模式只按平移匹配，与 'translate' 输出相同，重复的圆仍然实例化
+    svg = ''.join(converter.iter_svg(trace))
+    assert svg.count('<use ') >= 3
+    assert svg == ImageToSVGConverter(fit_tolerance=1, color_mode='color', num_colors=3,
+                                      instancing='translate',
+                                      edge_detection=False).convert_array(color)
+
+
+def test_budget_refits_curves():
+    """设置输出预算时按更大的容差重新拟合，报告的字节数与实际输出一致"""
+    image = _blobs(seed=1)
+    full = len(ImageToSVGConverter(fit_tolerance=1).convert_array(image))
+    converter = ImageToSVGConverter(fit_tolerance=1, max_bytes=full // 2)
+    trace = converter.trace_array(image)
+    output = ''.join(converter.iter_svg(trace))
+    assert trace.budget['met'] and len(output) == trace.budget['bytes'] <= full // 2
+    assert all(len(c) % 3 == 1 for c in trace.contours)
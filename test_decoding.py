@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+测试图像解码层
+"""
+
+import io
+import mmap
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from converter import ImageToSVGConverter
+from decoding import decode_image
+
+
+def _encode(array, fmt, mode=None):
+    buffer = io.BytesIO()
+    Image.fromarray(array, mode).save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def test_alpha_masked_to_white():
+    """透明像素在灰度数组中置白，与PIL路径结果一致"""
+    print("🖼 测试透明度解码...")
+    rgba = np.zeros((40, 60, 4), np.uint8)
+    rgba[10:30, 10:50] = (20, 40, 60, 255)
+    rgba[:, :5, 3] = 100
+    data = _encode(rgba, 'PNG')
+
+    decoded = decode_image(data)
+    assert decoded.has_transparency
+    assert (decoded.pixels[:, :5] == 255).all()
+    expected = np.array(Image.open(io.BytesIO(data)).convert('L'))
+    expected[rgba[..., 3] < 128] = 255
+    assert np.array_equal(decoded.pixels, expected)
+
+    color = decode_image(data, color=True)
+    assert color.pixels.shape == (40, 60, 4)
+    assert tuple(color.pixels[20, 20]) == (20, 40, 60, 255)
+
+
+def test_buffer_inputs(tmp_path):
+    """bytes、memoryview 和 mmap 输入得到相同结果，PIL格式回退"""
+    gray = np.tile(np.arange(64, dtype=np.uint8) * 4, (32, 1))
+    data = _encode(gray, 'PNG')
+    path = tmp_path / "gray.png"
+    path.write_bytes(data)
+
+    expected = decode_image(data).pixels
+    assert np.array_equal(decode_image(memoryview(data)).pixels, expected)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        assert np.array_equal(decode_image(mapped).pixels, expected)
+    assert np.array_equal(decode_image(_encode(gray, 'BMP')).pixels, expected)
+
+
+def test_reduced_jpeg_decode():
+    """预览档位下JPEG降分辨率解码，输出仍使用原图尺寸"""
+    image = np.full((2400, 1800, 3), 255, np.uint8)
+    cv2.rectangle(image, (600, 800), (1200, 1600), (0, 0, 0), -1)
+    data = cv2.imencode('.jpg', image)[1].tobytes()
+
+    decoded = decode_image(data, max_side=512)
+    assert (decoded.width, decoded.height) == (1800, 2400)
+    assert decoded.pixels.shape == (600, 450)
+
+    svg = ImageToSVGConverter(quality='preview').convert(data)
+    assert 'viewBox="0,0,1800,2400"' in svg
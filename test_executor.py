@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+测试转换执行层
+"""
+
+import asyncio
+import io
+
+from converter import png_to_svg
+from executor import ConversionExecutor, ExecutorConfig
+
+
+def _make_png():
+    """创建测试图像"""
+    from PIL import Image, ImageDraw
+
+    test_image = Image.new('RGB', (120, 120), 'white')
+    draw = ImageDraw.Draw(test_image)
+    draw.rectangle([20, 20, 100, 100], fill='black')
+
+    img_buffer = io.BytesIO()
+    test_image.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+
+def _run_with(mode):
+    executor = ConversionExecutor(ExecutorConfig(mode=mode, max_workers=2, warmup=True))
+    executor.start()
+    try:
+        return asyncio.run(executor.run(_make_png(), threshold_method='otsu'))
+    finally:
+        executor.shutdown()
+
+
+def test_thread_executor():
+    """线程池模式结果与同步转换一致"""
+    print("🧵 测试线程池执行...")
+    svg_content = _run_with('thread')
+    assert svg_content == png_to_svg(_make_png(), threshold_method='otsu')
+
+
+def test_process_executor_shared_memory():
+    """进程池模式通过共享内存传递像素，结果与同步转换一致"""
+    print("⚙️ 测试进程池执行...")
+    svg_content = _run_with('process')
+    assert svg_content == png_to_svg(_make_png(), threshold_method='otsu')
+
+
+if __name__ == "__main__":
+    test_thread_executor()
+    test_process_executor_shared_memory()
+    print("✅ 执行层测试完成!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试孔洞模式（轮廓层次结构 + evenodd 复合路径）
+"""
+
+import re
+
+import cv2
+import numpy as np
+
+from converter import CompoundContour, ImageToSVGConverter, bitmap_to_svg, contour_rings
+
+CONFIG = {'threshold_method': 'otsu', 'edge_detection': False, 'simplify_contours': False}
+
+
+def _make_rings():
+    """黑色圆环（孔洞内有一个实心小圆）和一个实心方块，白色背景"""
+    image = np.full((200, 300), 255, np.uint8)
+    cv2.circle(image, (100, 100), 70, 0, -1)
+    cv2.circle(image, (100, 100), 40, 255, -1)
+    cv2.circle(image, (100, 100), 12, 0, -1)
+    cv2.rectangle(image, (200, 60), (260, 140), 0, -1)
+    return image
+
+
+def _rasterize(contours, shape):
+    """按 evenodd 规则把轮廓画回掩码"""
+    mask = np.zeros(shape, np.uint8)
+    for contour in contours:
+        layer = np.zeros(shape, np.uint8)
+        for ring in contour_rings(contour):
+            ring_mask = np.zeros(shape, np.uint8)
+            cv2.drawContours(ring_mask, [ring], -1, 1, -1)
+            layer ^= ring_mask
+        mask |= layer
+    return mask
+
+
+def test_holes_are_kept():
+    """孔洞模式下圆环输出为带孔洞的复合轮廓，孔洞内的实心圆单独输出"""
+    print("🍩 测试孔洞模式...")
+    image = _make_rings()
+    trace = ImageToSVGConverter(holes=True, **CONFIG).trace_array(image)
+    compounds = [c for c in trace.contours if isinstance(c, CompoundContour)]
+    assert len(trace.contours) == 3 and len(compounds) == 1
+    assert len(compounds[0].rings) == 2
+
+    expected = (image < 128).astype(np.uint8)
+    drawn = _rasterize(trace.contours, image.shape)
+    assert np.count_nonzero(drawn != expected) < 0.01 * expected.size
+
+    filled = ImageToSVGConverter(**CONFIG).trace_array(image)
+    # 默认模式填充孔洞，孔洞内的小圆不再单独出现
+    assert len(filled.contours) == 2
+    assert np.count_nonzero(_rasterize(filled.contours, image.shape) != expected) > 3000
+
+
+def test_holes_svg_output():
+    """复合路径带 fill-rule="evenodd"，流式输出与 svgwrite 后端一致；紧凑输出同样保留孔洞"""
+    image = _make_rings()
+    converter = ImageToSVGConverter(holes=True, **CONFIG)
+    svg = converter.convert_array(image)
+    assert svg.count('fill-rule="evenodd"') == 1 and svg.count('<path') == 3
+    evenodd = re.search(r'<path d="([^"]*)"[^>]*fill-rule="evenodd"', svg).group(1)
+    assert evenodd.count('M') == 2 and evenodd.count('Z') == 2
+    assert ImageToSVGConverter(holes=True, svg_backend='svgwrite', **CONFIG).convert_array(image) == svg
+    assert 'evenodd' not in ImageToSVGConverter(**CONFIG).convert_array(image)
+
+    compact = ImageToSVGConverter(holes=True, compact=True, **CONFIG).convert_array(image)
+    assert '<g fill-opacity=".9" fill-rule="evenodd"><path d="M' in compact
+
+    # 预览档位放大回原图坐标后仍是复合轮廓
+    preview = ImageToSVGConverter(holes=True, quality='preview', **CONFIG)
+    large = cv2.resize(image, (1200, 800), interpolation=cv2.INTER_NEAREST)
+    trace = preview.trace_array(large)
+    assert any(isinstance(c, CompoundContour) for c in trace.contours)
+    assert max(int(ring[:, 0, 0].max()) for c in trace.contours for ring in contour_rings(c)) > 1000
+
+
+def test_holes_with_layers_and_instancing():
+    """多色模式下各颜色层使用复合路径；复合轮廓不参与实例化"""
+    image = np.full((160, 320, 3), 255, np.uint8)
+    for x in (60, 160, 260):
+        cv2.circle(image, (x, 80), 40, (200, 30, 30), -1)
+        cv2.circle(image, (x, 80), 20, (255, 255, 255), -1)
+    cv2.rectangle(image, (10, 140), (40, 155), (30, 30, 200), -1)
+    cv2.rectangle(image, (280, 140), (310, 155), (30, 30, 200), -1)
+    svg = ImageToSVGConverter(color_mode='color', num_colors=3, holes=True, instancing='translate',
+                              edge_detection=False).convert_array(image)
+    red = svg[svg.index('<g fill="#c81e1e"'):]
+    red = red[:red.index('</g>')]
+    # 三个圆环各自是一条复合路径，不替换为引用
+    assert red.count('fill-rule="evenodd" />') == 3 and '<use ' not in red
+    # 孔洞中的白色圆盘是简单轮廓，仍然实例化
+    assert svg.count('<use ') == 3
+
+
+def test_skip_flood_fill_and_legacy_bitmap():
+    """孔洞模式不做漫水填充；兼容函数 bitmap_to_svg 输出 evenodd 复合路径"""
+    image = _make_rings()
+    converter = ImageToSVGConverter(holes=True, **CONFIG)
+    mask = converter.plan.run(image, fill=False).copy()
+    assert mask[100, 100 - 30] == 0 and mask[100, 100] == 255
+    assert converter.plan.run(image)[100, 100 - 30] == 255
+
+    svg = bitmap_to_svg((image < 128).astype(np.uint8) * 255, 300, 200)
+    assert svg.count('<path') == 3 and svg.count('fill-rule="evenodd"') == 1
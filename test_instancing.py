@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+测试形状实例化
+"""
+
+import re
+
+import cv2
+import numpy as np
+import pytest
+
+from converter import ImageToSVGConverter
+from instancing import build_index
+
+STAR = np.array([[10, 0], [13, 7], [20, 7], [14, 12], [16, 20],
+                 [10, 15], [4, 20], [6, 12], [0, 7], [7, 7]], np.int32)
+
+
+def _apply(transform, points):
+    """按 SVG transform（translate/rotate/scale，从右向左作用）变换点"""
+    result = points.reshape(-1, 2).astype(float)
+    for name, args in reversed(re.findall(r'(\w+)\(([^)]*)\)', transform)):
+        values = [float(v) for v in args.split()]
+        if name == 'scale':
+            result = result * values[0]
+        elif name == 'rotate':
+            angle = np.radians(values[0])
+            c, s = round(np.cos(angle)), round(np.sin(angle))
+            result = np.column_stack((result[:, 0] * c - result[:, 1] * s,
+                                      result[:, 0] * s + result[:, 1] * c))
+        else:
+            result = result + values
+    return result
+
+
+def _point_set(points):
+    return sorted(map(tuple, np.rint(points).astype(int).reshape(-1, 2).tolist()))
+
+
+def _check_placements(contours, index):
+    """每个引用经 transform 还原后与原轮廓的点集相同"""
+    for contour, placement in zip(contours, index.placements):
+        if placement is not None:
+            instance, transform = placement
+            assert _point_set(_apply(transform, instance.points)) == _point_set(contour)
+
+
+def _rotate(points, k):
+    for _ in range(k):
+        points = np.column_stack((-points[:, 1], points[:, 0]))
+    return points
+
+
+def test_translate_index():
+    """平移后相同的轮廓共享一个定义，点序保持不变"""
+    print("🔁 测试平移实例化...")
+    contours = [(STAR + (40 * i, 7 * i)).reshape(-1, 1, 2) for i in range(5)]
+    contours.append(np.array([[[0, 0]], [[3, 0]], [[3, 3]]], np.int32))
+    index = build_index(contours, 'translate')
+    assert len(index.instances) == 1 and index.instanced_count == 5
+    assert index.placements[-1] is None
+    assert index.placements[2][1] == 'translate(80 14)'
+    assert index.instances[0].points.reshape(-1, 2).tolist() == STAR.tolist()
+    _check_placements(contours, index)
+
+    with pytest.raises(ValueError):
+        build_index(contours, 'off')
+
+
+def test_rotate_and_scale_index():
+    """rotate 匹配90°旋转的副本，full 再匹配整数倍缩放的副本"""
+    print("🔁 测试旋转和缩放实例化...")
+    contours = []
+    for k in range(4):
+        rotated = _rotate(STAR, k)
+        contours.append((rotated - rotated.min(axis=0) + (100 * k, 50)).reshape(-1, 1, 2))
+    contours.append((STAR * 3 + (20, 300)).reshape(-1, 1, 2))
+    contours.append((np.roll(STAR, 3, axis=0) * 3 + (200, 300)).reshape(-1, 1, 2))
+
+    translated = build_index(contours, 'translate')
+    assert translated.instanced_count == 0
+
+    rotated = build_index(contours, 'rotate')
+    assert rotated.instanced_count == 6 and len(rotated.instances) == 2
+    assert any('rotate(' in p[1] for p in rotated.placements)
+    _check_placements(contours, rotated)
+
+    full = build_index(contours, 'full')
+    assert full.instanced_count == 6 and len(full.instances) == 1
+    assert 'scale(3)' in full.placements[4][1]
+    _check_placements(contours, full)
+
+
+def test_instanced_svg_output():
+    """重复形状写入 <defs> 并用 <use> 引用；没有重复时输出与不实例化相同"""
+    image = np.full((270, 270), 255, np.uint8)
+    for i in range(6):
+        for j in range(6):
+            cv2.fillPoly(image, [STAR * 2 + (j * 44 + 4, i * 44 + 4)], 0)
+    config = {'edge_detection': False, 'threshold_method': 'otsu'}
+    plain = ImageToSVGConverter(**config).convert_array(image)
+    svg = ImageToSVGConverter(instancing='translate', **config).convert_array(image)
+    assert svg.count('<use ') == 36 and '<defs><path d="' in svg
+    assert 'id="s0"' in svg and 'xlink:href="#s0"' in svg
+    assert len(svg) < len(plain) / 2
+
+    single = np.full((100, 100), 255, np.uint8)
+    cv2.fillPoly(single, [STAR * 3 + 10], 0)
+    assert ImageToSVGConverter(instancing='full', **config).convert_array(single) == \
+        ImageToSVGConverter(**config).convert_array(single)
+
+
+def test_instanced_layers():
+    """多色模式下定义不带样式，颜色由 <use> 所在的分组决定"""
+    image = np.full((120, 240, 3), 255, np.uint8)
+    for j in range(5):
+        color = (200, 30, 30) if j % 2 else (30, 30, 200)
+        cv2.fillPoly(image, [STAR * 2 + (j * 45 + 4, 30)], color)
+    svg = ImageToSVGConverter(color_mode='color', num_colors=3, instancing='translate',
+                              edge_detection=False).convert_array(image)
+    assert svg.count('<use ') == 5
+    definition = re.search(r'<defs>(.*?)</defs>', svg).group(1)
+    assert 'fill=' not in definition
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+测试异步转换任务和任务库
+"""
+
+import asyncio
+
+import cv2
+
+from converter import ImageToSVGConverter
+from executor import ConversionExecutor, ExecutorConfig
+from jobs import (CANCELLED, DONE, FAILED, MAX_ATTEMPTS, QUEUED, RUNNING, JobManager,
+                  JobStore, run_job)
+from test_tiling import _make_scan
+
+
+def _scan_png():
+    ok, encoded = cv2.imencode('.png', _make_scan())
+    assert ok
+    return encoded.tobytes()
+
+
+def test_run_job_reports_stages(tmp_path):
+    """任务逐阶段记录进度，结果与直接转换相同"""
+    print("🧾 测试任务执行...")
+    store = JobStore(tmp_path / 'jobs')
+    assert not store.exists
+    data = _scan_png()
+    config = {'threshold_method': 'otsu', 'quality': 'high'}
+    job_id = store.create(data, config, filename='scan.png')
+    assert store.get(job_id)['status'] == QUEUED and store.exists
+
+    stages = []
+    report_stage = store.report_stage
+    store.report_stage = lambda job, stage: stages.append(stage) or report_stage(job, stage)
+    assert store.start(job_id)
+    assert run_job(store, job_id) == DONE
+
+    job = store.get(job_id)
+    assert job['status'] == DONE and job['progress'] == 1.0 and job['attempts'] == 1
+    assert stages[0] == 'decode' and stages[-1] == 'svg' and 'contours' in stages
+    assert {'decode', 'threshold', 'svg'} <= set(job['stage_timings'])
+    assert job['expires'] == job['finished'] + store.ttl
+    assert not store.input_path(job_id).exists()
+    expected = ImageToSVGConverter(**config).convert(data)
+    assert store.result_path(job_id).read_text() == expected
+    assert job['result_bytes'] == len(expected.encode())
+
+
+def test_cancel_and_failure(tmp_path):
+    """取消的任务不再执行或在下一阶段停止，转换错误记录在任务中"""
+    store = JobStore(tmp_path)
+    data = _scan_png()
+
+    queued = store.create(data, {})
+    assert store.cancel(queued) and not store.start(queued)
+    assert store.get(queued)['status'] == CANCELLED and not store.cancel(queued)
+
+    running = store.create(data, {})
+    assert store.start(running)
+    report_stage = store.report_stage
+
+    def cancel_during_threshold(job_id, stage):
+        if stage == 'threshold':
+            store.cancel(job_id)
+        return report_stage(job_id, stage)
+
+    store.report_stage = cancel_during_threshold
+    assert run_job(store, running) == CANCELLED
+    job = store.get(running)
+    # 取消后阈值阶段不再开始，停留在上一个阶段
+    assert job['status'] == CANCELLED and job['stage'] == 'preprocess'
+    assert not store.result_path(running).exists()
+
+    broken = store.create(b'not an image', {})
+    store.start(broken)
+    assert run_job(store, broken) == FAILED
+    assert store.get(broken)['error']
+
+
+def test_recover_and_cleanup(tmp_path):
+    """重启后中断的任务重新排队，多次中断的任务失败；过期任务连同文件清理"""
+    store = JobStore(tmp_path, ttl=60)
+    data = _scan_png()
+    first, second, crashed = (store.create(data, {}) for _ in range(3))
+    store.start(first)
+    for _ in range(MAX_ATTEMPTS):
+        store.start(crashed)
+        store._transition(crashed, (RUNNING,), "status = ?", (QUEUED,))
+    store.start(crashed)
+
+    restarted = JobStore(tmp_path, ttl=60)
+    assert restarted.recover() == [first, second]
+    assert restarted.get(first)['status'] == QUEUED
+    assert restarted.get(crashed)['status'] == FAILED
+
+    restarted.start(first)
+    run_job(restarted, first)
+    finished = restarted.get(first)['finished']
+    assert restarted.cleanup(now=finished + 30) == 0
+    assert restarted.cleanup(now=finished + 61) == 2
+    assert restarted.get(first) is None and not restarted.result_path(first).exists()
+    assert restarted.counts() == {QUEUED: 1, RUNNING: 0, DONE: 0, FAILED: 0, CANCELLED: 0}
+
+
+def test_job_manager(tmp_path):
+    """任务管理器在工作池中执行排队的任务，启动时恢复未完成的任务"""
+    store = JobStore(tmp_path)
+    leftover = store.create(_scan_png(), {'quality': 'preview'})
+    store.start(leftover)
+
+    async def scenario():
+        executor = ConversionExecutor(ExecutorConfig(mode='thread', max_workers=2, warmup=False))
+        manager = JobManager(store, executor, concurrency=2)
+        await manager.start()
+        submitted = await manager.submit(_scan_png(), {'threshold_method': 'otsu'}, 'scan.png')
+        for _ in range(200):
+            if all(store.get(job)['status'] == DONE for job in (leftover, submitted)):
+                break
+            await asyncio.sleep(0.05)
+        await manager.stop()
+        executor.shutdown()
+        return submitted
+
+    submitted = asyncio.run(scenario())
+    assert store.get(leftover)['status'] == DONE and store.get(leftover)['attempts'] == 2
+    assert store.get(submitted)['status'] == DONE
+    assert store.get(submitted)['filename'] == 'scan.png'
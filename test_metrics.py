@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+测试进程内指标
+"""
+
+import pytest
+
+from converter import TraceResult
+from metrics import MetricsRegistry, record_trace, STAGE_DURATION, CONTOUR_COUNT
+
+
+def test_render_prometheus_text():
+    """计数器、仪表和直方图按Prometheus文本格式输出"""
+    print("📈 测试指标输出格式...")
+    registry = MetricsRegistry()
+    counter = registry.counter('demo_total', '示例计数器', ('kind',))
+    gauge = registry.gauge('demo_in_flight', '示例仪表')
+    histogram = registry.histogram('demo_seconds', '示例直方图', buckets=(0.1, 1.0))
+
+    counter.inc(kind='a')
+    counter.inc(2, kind='a')
+    with gauge.track_inprogress():
+        assert gauge.value() == 1
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+
+    text = registry.render()
+    assert '# TYPE demo_total counter' in text
+    assert 'demo_total{kind="a"} 3' in text
+    assert 'demo_in_flight 0' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert 'demo_seconds_count 3' in text
+
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+    with pytest.raises(ValueError):
+        registry.counter('demo_total', '重复注册')
+
+
+def test_record_trace():
+    """追踪结果的各阶段耗时和轮廓数量写入标准指标"""
+    trace = TraceResult(contours=[None, None], width=10, height=10,
+                        stage_timings={'decode': 0.002, 'contours': 0.001})
+    labels = {'threshold_method': 'test', 'preset': 'test_record'}
+    record_trace(trace, **labels)
+    _, total, count = STAGE_DURATION.snapshot(stage='decode', **labels)
+    assert count == 1 and total == pytest.approx(0.002)
+    cumulative, _, _ = CONTOUR_COUNT.snapshot(**labels)
+    assert cumulative[-1] == 1
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+测试编译后的流水线计划和缓冲区池
+"""
+
+import cv2
+import numpy as np
+
+from converter import ImageToSVGConverter
+from pipeline import BufferPool, compile_plan
+
+
+def _make_gray():
+    rng = np.random.default_rng(0)
+    gray = np.full((120, 160), 230, np.uint8)
+    cv2.circle(gray, (60, 60), 35, 20, -1)
+    cv2.rectangle(gray, (100, 30), (150, 100), 40, 3)
+    return np.clip(gray + rng.normal(0, 10, gray.shape), 0, 255).astype(np.uint8)
+
+
+def test_plan_matches_stage_methods():
+    """流水线计划与逐阶段方法的结果逐像素一致"""
+    print("🧩 测试流水线计划...")
+    gray = _make_gray()
+    for config in ({}, {'threshold_method': 'otsu'},
+                   {'threshold_method': 'fixed', 'edge_detection': False},
+                   {'quality': 'preview'}):
+        converter = ImageToSVGConverter(**config)
+        expected = converter.improve_morphology(
+            converter.apply_threshold(converter.preprocess_image(gray)))
+        assert np.array_equal(converter.plan.run(gray, pool=BufferPool()), expected)
+
+
+def test_steady_state_reuses_buffers():
+    """相同形状的后续调用不再分配缓冲区"""
+    plan = compile_plan('adaptive', True, 5, 5)
+    assert compile_plan('adaptive', True, 5, 5) is plan
+    pool = BufferPool()
+    gray = _make_gray()
+    plan.run(gray, pool=pool)
+    allocations = pool.allocations
+    for _ in range(3):
+        plan.run(gray, pool=pool)
+    assert pool.allocations == allocations
+
+
+def test_pool_evicts_old_shapes():
+    pool = BufferPool(max_bytes=3000)
+    pool.get('a', (30, 30))
+    pool.get('a', (40, 40))
+    pool.get('a', (30, 30))
+    pool.get('b', (25, 25))
+    assert pool.stats()['bytes'] <= 3000
+    # 超过容量的缓冲区直接分配，不进入池
+    assert pool.get('big', (100, 100)).shape == (100, 100)
+    assert pool.stats()['bytes'] <= 3000
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+测试颜色量化和多色分层转换
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from converter import ImageToSVGConverter
+from quantize import TRANSPARENT, quantize
+
+
+def _make_color_image():
+    image = np.full((160, 200, 3), 255, np.uint8)
+    cv2.rectangle(image, (20, 20), (90, 90), (220, 30, 30), -1)
+    cv2.circle(image, (150, 80), 30, (30, 160, 30), -1)
+    cv2.circle(image, (55, 55), 15, (30, 30, 220), -1)
+    return image
+
+
+@pytest.mark.parametrize("method", ["kmeans", "median_cut"])
+def test_quantize_palette(method):
+    """四种颜色的图像量化后调色板与原颜色一致"""
+    print(f"🎨 测试颜色量化 ({method})...")
+    image = _make_color_image()
+    labels, palette = quantize(image, num_colors=4, method=method)
+    assert labels.shape == image.shape[:2]
+    expected = {(255, 255, 255), (220, 30, 30), (30, 160, 30), (30, 30, 220)}
+    assert {tuple(int(c) for c in color) for color in palette} == expected
+    assert np.array_equal(palette[labels[55, 55]], [30, 30, 220])
+
+
+def test_quantize_transparent_pixels():
+    image = _make_color_image()
+    alpha = np.full(image.shape[:2], 255, np.uint8)
+    alpha[:, :10] = 0
+    labels, _ = quantize(image, num_colors=4, alpha=alpha)
+    assert (labels[:, :10] == TRANSPARENT).all()
+    assert (labels[:, 10:] != TRANSPARENT).all()
+
+
+def test_color_mode_layers():
+    """多色模式每种颜色输出一个分组，像素最多的颜色在最下层"""
+    print("🖌 测试多色分层转换...")
+    ok, encoded = cv2.imencode(".png", cv2.cvtColor(_make_color_image(), cv2.COLOR_RGB2BGR))
+    assert ok
+    converter = ImageToSVGConverter(color_mode="color", num_colors=4, min_contour_area=20)
+    trace = converter.trace(encoded.tobytes())
+    fills = [fill for fill, _ in trace.layers]
+    assert fills[0] == "#ffffff"
+    assert set(fills) == {"#ffffff", "#dc1e1e", "#1ea01e", "#1e1edc"}
+
+    svg = "".join(converter.iter_svg(trace))
+    assert svg.count("<g ") == 4
+    assert '<g fill="#1e1edc" stroke="none"><path d="' in svg
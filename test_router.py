@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+测试内容感知的流水线路由
+"""
+
+import cv2
+import numpy as np
+
+from converter import ImageToSVGConverter, TraceResult
+from metrics import ROUTE_DECISIONS, record_trace
+from pipeline import BufferPool
+from router import analyze
+
+
+def _line_art():
+    """白底上的实心圆和矩形框（抗锯齿边缘）"""
+    image = np.full((600, 800), 255, np.uint8)
+    for x in (150, 400, 650):
+        cv2.circle(image, (x, 200), 80, 0, -1, cv2.LINE_AA)
+    cv2.rectangle(image, (100, 380), (700, 540), 40, 6, cv2.LINE_AA)
+    return image
+
+
+def _text(seed=0):
+    """多行细笔画文字"""
+    rng = np.random.default_rng(seed)
+    image = np.full((600, 800), 255, np.uint8)
+    for row in range(16):
+        line = ''.join(rng.choice(list('abcdefghijklmnopqrstuvwxyz  '), 32))
+        cv2.putText(image, line, (20, 35 + row * 35), cv2.FONT_HERSHEY_SIMPLEX, 0.9, 0, 2,
+                    cv2.LINE_AA)
+    return image
+
+
+def _scan():
+    """光照不均、带高斯噪声的文字扫描件"""
+    image = _text().astype(np.float32)
+    light = 0.65 + 0.35 * np.arange(image.shape[1]) / image.shape[1]
+    noise = np.random.default_rng(1).normal(0, 10, image.shape)
+    return np.clip(image * light + noise, 0, 255).astype(np.uint8)
+
+
+def _photo():
+    """连续色调的平滑明暗变化加细纹理"""
+    rng = np.random.default_rng(2)
+    base = cv2.GaussianBlur(rng.random((600, 800)).astype(np.float32), (0, 0), 25)
+    base = (base - base.min()) / (base.max() - base.min()) * 200
+    texture = cv2.GaussianBlur(rng.random((600, 800)).astype(np.float32), (0, 0), 2) * 60
+    return np.clip(base + texture, 0, 255).astype(np.uint8)
+
+
+def test_classify():
+    """各类输入分到对应的类别"""
+    print("🧭 测试内容路由...")
+    for image, kind in ((_line_art(), 'line_art'), (_text(), 'text'),
+                        (_scan(), 'noisy_scan'), (_photo(), 'photo')):
+        decision = analyze(image)
+        assert decision['kind'] == kind, decision
+    # 单一灰度和很小的图像
+    assert analyze(np.full((5, 7), 200, np.uint8))['kind'] == 'line_art'
+
+
+def test_routed_pipeline():
+    """干净输入跳过降噪、边缘增强和形态学操作；各阶段方法与编译的计划一致"""
+    text = _text()
+    converter = ImageToSVGConverter(route='auto')
+    trace = converter.trace_array(text)
+    assert trace.route['kind'] == 'text' and 'analyze' in trace.stage_timings
+    plan = converter.plan
+    assert plan.threshold_method == 'otsu' and not plan.edge_detection
+    assert plan.median_ksize == 0 and plan.close_kernel is None
+    # 细笔画不再被闭操作连成片，与直接阈值的结果更接近
+    truth = text < 128
+    routed = plan.run(text, pool=BufferPool(), fill=False) > 0
+    fixed = ImageToSVGConverter().plan.run(text, pool=BufferPool(), fill=False) > 0
+    assert np.count_nonzero(routed != truth) * 2 < np.count_nonzero(fixed != truth)
+    assert len(trace.contours) > len(ImageToSVGConverter().trace_array(text).contours)
+
+    for image in (_line_art(), _scan(), _photo()):
+        converter = ImageToSVGConverter(route='auto')
+        converter.choose_route(image)
+        expected = converter.improve_morphology(
+            converter.apply_threshold(converter.preprocess_image(image)))
+        assert np.array_equal(converter.plan.run(image, pool=BufferPool()), expected)
+
+    # 照片使用配置的完整流水线，输出与固定流水线相同
+    photo = _photo()
+    assert (ImageToSVGConverter(route='auto').convert_array(photo)
+            == ImageToSVGConverter().convert_array(photo))
+    # 固定流水线和多色模式不做分析
+    assert ImageToSVGConverter().trace_array(text).route is None
+    color = cv2.cvtColor(_line_art(), cv2.COLOR_GRAY2RGB)
+    assert ImageToSVGConverter(route='auto', color_mode='color',
+                               num_colors=2).trace_array(color).route is None
+
+
+def test_route_metrics():
+    """路由决策按类别计数"""
+    labels = {'threshold_method': 'test', 'preset': 'test_route'}
+    trace = TraceResult(contours=[], width=10, height=10)
+    record_trace(trace, **labels)
+    trace.route = {'kind': 'line_art'}
+    record_trace(trace, **labels)
+    record_trace(trace, **labels)
+    assert ROUTE_DECISIONS.value(kind='line_art', **labels) == 2
+    assert ROUTE_DECISIONS.value(kind='photo', **labels) == 0
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试冷启动：惰性导入、预热和就绪检查
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import benchmark
+import main
+from executor import ConversionExecutor, ExecutorConfig
+
+HEAVY_MODULES = ('cv2', 'numpy', 'svgwrite', 'PIL')
+
+LOADED_SCRIPT = f"""
+import asyncio, json, sys
+import cli, main
+cli.parse_args(['in', '-o', 'out'])
+asyncio.run(main.get_config_presets())
+print(json.dumps([name for name in {HEAVY_MODULES!r} if name in sys.modules]))
+"""
+
+
+def test_lazy_imports():
+    """导入服务和命令行模块、获取预设不加载 OpenCV、NumPy、PIL 和 svgwrite"""
+    print("🚀 测试惰性导入...")
+    completed = subprocess.run([sys.executable, '-c', LOADED_SCRIPT],
+                               cwd=Path(__file__).resolve().parent,
+                               capture_output=True, text=True, check=True)
+    assert json.loads(completed.stdout.splitlines()[-1]) == []
+
+
+def test_warm_up_ready(monkeypatch):
+    """启动预热完成后就绪检查才返回200，并报告启动耗时"""
+    executor = ConversionExecutor(ExecutorConfig(mode='thread', max_workers=1, warmup=True))
+    monkeypatch.setattr(main, 'executor', executor)
+    monkeypatch.setitem(main.startup_info, 'ready', False)
+    try:
+        assert asyncio.run(main.get_readiness()).status_code == 503
+        asyncio.run(main.warm_up_executor())
+        response = asyncio.run(main.get_readiness())
+        assert response.status_code == 200
+        info = json.loads(response.body)
+        assert info['ready'] and info['import_seconds'] > 0
+        assert set(info['warmup']) == {'local', 'workers'} and executor.started
+        assert 'png2svg_startup_seconds{phase="warmup"}' in main.metrics.REGISTRY.render()
+    finally:
+        executor.shutdown()
+
+
+def test_process_warm_up_without_fork():
+    """进程模式的预热：工作进程不从已有 OpenCV 线程的本进程直接 fork"""
+    executor = ConversionExecutor(ExecutorConfig(mode='process', max_workers=1, warmup=True))
+    try:
+        timings = executor.warm_up()
+        assert timings['workers'] > 0 and timings['local'] > 0
+        assert executor._pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+    finally:
+        executor.shutdown()
+
+
+def test_startup_benchmark(tmp_path):
+    """冷启动基准测试报告各用例的耗时"""
+    output = tmp_path / "startup.json"
+    assert benchmark.main(["--startup", "--repeats", "1", "--output", str(output)]) == 0
+    startup = json.loads(output.read_text(encoding="utf-8"))["startup"]
+    assert set(startup) == set(benchmark.STARTUP_CASES) | {'first_conversion',
+                                                          'second_conversion'}
+    assert all(value > 0 for value in startup.values())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+测试向量化SVG路径编码
+"""
+
+import re
+import time
+
+import numpy as np
+
+from svg_path import CompactPathEncoder, encode_compact, encode_contour, encode_polyline
+
+_TOKEN = re.compile(r'[MmCcSsLlHhVvZz]|-?(?:\d+\.?\d*|\.\d+)')
+_ARITY = {'m': 2, 'l': 2, 'h': 1, 'v': 1, 'c': 6, 's': 4, 'z': 0}
+
+
+def _reference_contour_path(contour):
+    """逐点拼接的旧实现，用作对照"""
+    if len(contour) < 3:
+        return ""
+    path_data = ""
+    contour = contour.reshape(-1, 2)
+    path_data += f"M{contour[0][0]},{contour[0][1]} "
+    if len(contour) <= 4:
+        for point in contour[1:]:
+            path_data += f"L{point[0]},{point[1]} "
+    else:
+        for i in range(1, len(contour)):
+            if i % 3 == 1 and i + 2 < len(contour):
+                cp1 = contour[i]
+                cp2 = contour[i + 1]
+                end = contour[i + 2]
+                path_data += f"C{cp1[0]},{cp1[1]} {cp2[0]},{cp2[1]} {end[0]},{end[1]} "
+            elif i % 3 != 1:
+                continue
+            else:
+                path_data += f"L{contour[i][0]},{contour[i][1]} "
+    path_data += "Z"
+    return path_data
+
+
+def _absolute_segments(d):
+    """把路径数据（绝对或相对命令）展开为绝对坐标的 M/L/C/Z 分段列表"""
+    tokens = _TOKEN.findall(d)
+    segments = []
+    x = y = start_x = start_y = 0.0
+    cp2 = None
+    i = 0
+    command = None
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            command = tokens[i]
+            i += 1
+        lower = command.lower()
+        relative = command.islower()
+        values = [float(v) for v in tokens[i:i + _ARITY[lower]]]
+        i += _ARITY[lower]
+        ox, oy = (x, y) if relative else (0.0, 0.0)
+        if lower == 'z':
+            segments.append(('Z',))
+            x, y = start_x, start_y
+            cp2 = None
+            continue
+        if lower == 'm':
+            x, y = start_x, start_y = ox + values[0], oy + values[1]
+            segments.append(('M', x, y))
+            cp2 = None
+            continue
+        if lower in 'lhv':
+            if lower == 'h':
+                x = ox + values[0]
+            elif lower == 'v':
+                y = oy + values[0]
+            else:
+                x, y = ox + values[0], oy + values[1]
+            segments.append(('L', x, y))
+            cp2 = None
+            continue
+        if lower == 's':
+            c1 = (2 * x - cp2[0], 2 * y - cp2[1]) if cp2 else (x, y)
+            values = [c1[0] - ox, c1[1] - oy] + values
+        points = [(ox + values[k], oy + values[k + 1]) for k in range(0, 6, 2)]
+        segments.append(('C',) + tuple(v for p in points for v in p))
+        cp2 = points[1]
+        x, y = points[2]
+    return segments
+
+
+def test_encode_contour_byte_identical():
+    """批量编码与逐点拼接的输出逐字节一致"""
+    print("🧮 测试路径编码一致性...")
+    rng = np.random.default_rng(0)
+    for n in range(0, 40):
+        contour = rng.integers(-50, 5000, size=(n, 1, 2)).astype(np.int32)
+        assert encode_contour(contour) == _reference_contour_path(contour), n
+
+
+def test_encode_polyline_and_precision():
+    """直线路径和定点小数精度"""
+    points = np.array([[[1, 2]], [[3, 4]], [[5, 6]]], np.int32)
+    assert encode_polyline(points) == "M1,2 L3,4 L5,6 Z"
+    assert encode_polyline(points, precision=1) == "M1.0,2.0 L3.0,4.0 L5.0,6.0 Z"
+    floats = np.array([[0.125, 1.0], [2.5, 3.333], [4.0, 5.0]])
+    assert encode_contour(floats, precision=2) == "M0.12,1.00 L2.50,3.33 L4.00,5.00 Z"
+
+
+def test_encode_contour_performance():
+    """长轮廓的编码速度"""
+    print("⚡ 路径编码性能...")
+    rng = np.random.default_rng(1)
+    contour = rng.integers(0, 8000, size=(20000, 1, 2)).astype(np.int32)
+    start = time.time()
+    encoded = encode_contour(contour)
+    vectorized = time.time() - start
+    start = time.time()
+    reference = _reference_contour_path(contour)
+    per_point = time.time() - start
+    assert encoded == reference
+    print(f"  批量编码: {vectorized:.4f}s, 逐点拼接: {per_point:.4f}s")
+
+
+def test_compact_path_same_geometry():
+    """紧凑编码与标准编码展开后的绝对坐标分段完全一致，合并后的子路径依次衔接"""
+    print("🗜️ 测试紧凑路径编码...")
+    rng = np.random.default_rng(2)
+    contours = [rng.integers(-50, 500, size=(n, 1, 2)).astype(np.int32) for n in range(3, 30)]
+    # 轴对齐直线（h/v 简写）和平滑曲线（s 简写）
+    contours.append(np.array([[0, 0], [10, 0], [10, 10], [0, 10]]))
+    contours.append(np.array([[0, 0], [1, 2], [3, 2], [4, 0], [5, -2], [7, -2], [8, 0]]))
+    expected = []
+    for contour in contours:
+        expected.extend(_absolute_segments(encode_contour(contour)))
+    compact = encode_compact(contours)
+    assert _absolute_segments(compact) == expected
+    assert len(compact) < sum(len(encode_contour(c)) for c in contours)
+
+    encoder = CompactPathEncoder()
+    assert encoder.encode(contours[-2]) == "M0 0h10v10h-10z"
+    assert encoder.encode(contours[-1]) == "m0 0c1 2 3 2 4 0s3-2 4 0z"
+
+
+def test_compact_path_precision():
+    """小数精度：去掉多余的0和前导0，相对坐标不累积舍入误差"""
+    floats = np.array([[0.5, 1.25], [3.333, -1.0], [2.0, 2.0]])
+    assert encode_compact([floats], precision=2) == "M.5 1.25l2.83-2.25-1.33 3z"
+    assert encode_compact([floats], precision=0) == "M0 1l3-2-1 3z"
+    # 默认：浮点坐标保留2位
+    assert encode_compact([floats]) == encode_compact([floats], precision=2)
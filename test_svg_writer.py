@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+测试流式SVG写入器
+"""
+
+import cv2
+import numpy as np
+
+from converter import ImageToSVGConverter
+from svg_writer import iter_compact_svg, iter_svg
+from test_tiling import _make_scan
+
+
+def test_stream_matches_svgwrite():
+    """流式写入器与svgwrite后端输出逐字节一致"""
+    print("🌊 测试流式写入一致性...")
+    blank = np.full((77, 121), 255, np.uint8)
+    for image in (_make_scan(), blank):
+        for has_transparency in (False, True):
+            stream = ImageToSVGConverter().convert_array(image, has_transparency)
+            legacy = ImageToSVGConverter(svg_backend='svgwrite').convert_array(image, has_transparency)
+            assert stream == legacy
+
+
+def test_stream_yields_chunks():
+    """路径较多时分多个分块输出，且惰性消费路径"""
+    consumed = []
+
+    def paths():
+        for i in range(200):
+            consumed.append(i)
+            yield f"M{i},0 L{i},1 L{i + 1},1 Z"
+
+    chunks = iter_svg(paths(), 10, 10, chunk_size=256)
+    head = next(chunks)
+    assert head.startswith('<svg') and not consumed
+    rest = list(chunks)
+    assert len(rest) > 1
+    assert rest[-1].endswith('</svg>')
+    assert len(consumed) == 200
+
+
+def test_compact_output():
+    """紧凑输出合并路径、样式提升到 <g>，并报告节省的字节数"""
+    print("🗜️ 测试紧凑SVG输出...")
+    image = _make_scan()
+    standard = ImageToSVGConverter().convert_array(image)
+    converter = ImageToSVGConverter(compact=True)
+    compact = converter.convert_array(image)
+    assert compact.count('<path') == 1
+    assert '<g fill-opacity=".9"><path d="M' in compact
+    report = converter.compact_report
+    assert report['original_bytes'] == len(standard.encode('utf-8'))
+    assert report['compact_bytes'] == len(compact.encode('utf-8'))
+    assert report['saved_bytes'] > 0
+
+    # 按编码长度计算的标准输出大小：孔洞、小数位数、曲线拟合、多色分层和空结果
+    color = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
+    cv2.circle(color, (300, 220), 20, (200, 40, 40), -1)
+    for config, pixels in (({'holes': True}, 255 - image), ({'precision': 2}, image),
+                           ({'fit_tolerance': 1.0}, image),
+                           ({'color_mode': 'color', 'num_colors': 3, 'holes': True}, color),
+                           ({}, np.full((30, 30), 255, np.uint8))):
+        converter = ImageToSVGConverter(**config)
+        trace = converter.trace_array(pixels)
+        expected = ''.join(converter.iter_svg(trace)).encode('utf-8')
+        assert converter.standard_size(trace) == len(expected), config
+
+    # 空结果与多色分组
+    groups = [('fill="#f00"', iter(())), ('fill="#00f"', iter(['M1 1h2v2z']))]
+    svg = ''.join(iter_compact_svg(groups, 10, 10, has_transparency=True))
+    assert svg.count('<g') == 1 and '<g fill="#00f"><path d="M1 1h2v2z"/></g>' in svg
+    empty = ''.join(iter_compact_svg([('fill="#000"', iter(()))], 40, 40))
+    assert '未检测到有效轮廓' in empty
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试CPU线程治理
+"""
+
+import asyncio
+import json
+import os
+
+import cv2
+import pytest
+
+import benchmark
+import converter
+import threads
+from executor import ConversionExecutor, ExecutorConfig
+from threads import THREAD_ENV_VARS, apply_thread_limits, split_cores
+
+
+@pytest.fixture
+def restore_threads(monkeypatch):
+    """测试结束后恢复进程的线程设置"""
+    for name in THREAD_ENV_VARS:
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr(threads, '_intra_op_threads', None)
+    monkeypatch.setattr(threads, '_process_workers', 1)
+    original = cv2.getNumThreads()
+    yield
+    cv2.setNumThreads(original)
+
+
+def _worker_threads():
+    return cv2.getNumThreads(), threads.intra_op_threads()
+
+
+def test_split_cores():
+    """按核数拆分工作者数和算子线程数"""
+    print("🧵 测试线程拆分...")
+    assert split_cores(32) == (32, 1)
+    assert split_cores(32, workers=8) == (8, 4)
+    assert split_cores(32, intra_op_threads=4) == (8, 4)
+    assert split_cores(32, workers=5) == (5, 6)
+    assert split_cores(2, workers=8) == (8, 1)
+    assert split_cores(2, intra_op_threads=8) == (1, 8)
+    assert split_cores(32, workers=4, intra_op_threads=16) == (4, 16)
+
+    config = ExecutorConfig(cores=16, intra_op_threads=4)
+    assert (config.max_workers, config.intra_op_threads) == (4, 4)
+    config = ExecutorConfig(cores=16, max_workers=2)
+    assert (config.max_workers, config.intra_op_threads) == (2, 8)
+
+
+def test_apply_limits(restore_threads):
+    """设置 OpenCV 线程数、BLAS/OpenMP 环境变量和转换器线程池大小"""
+    assert apply_thread_limits(2) == 2
+    assert cv2.getNumThreads() == 2 and threads.intra_op_threads() == 2
+    assert all(os.environ[name] == '2' for name in THREAD_ENV_VARS)
+    pool = converter._layer_executor()
+    assert pool._max_workers == 2 and converter._layer_executor() is pool
+
+    converter.ImageToSVGConverter(threads=3)
+    assert cv2.getNumThreads() == 3
+    assert converter._layer_executor()._max_workers == 3
+    assert converter._frame_executor()._max_workers == 3
+
+
+def test_worker_threads(restore_threads):
+    """工作进程和线程模式的工作池按拆分结果设置算子线程数"""
+    executor = ConversionExecutor(ExecutorConfig(mode='process', max_workers=1,
+                                                 intra_op_threads=3, warmup=False))
+    try:
+        assert asyncio.run(executor.call(_worker_threads)) == (3, 3)
+    finally:
+        executor.shutdown()
+
+    executor = ConversionExecutor(ExecutorConfig(mode='thread', max_workers=2,
+                                                 intra_op_threads=2, warmup=False))
+    try:
+        assert asyncio.run(executor.call(_worker_threads)) == (2, 2)
+    finally:
+        executor.shutdown()
+
+    # 线程模式的工作者共用分层和多帧线程池：线程数为 工作者数 × 算子线程数
+    executor = ConversionExecutor(ExecutorConfig(mode='thread', cores=4, warmup=False))
+    try:
+        assert asyncio.run(executor.call(_worker_threads)) == (1, 1)
+        assert converter._layer_executor()._max_workers == 4
+        assert converter._frame_executor()._max_workers == 4
+    finally:
+        executor.shutdown()
+
+
+def test_thread_split_benchmark(tmp_path, restore_threads):
+    """拆分基准测试报告各拆分的吞吐量和延迟分位数"""
+    output = tmp_path / "splits.json"
+    assert benchmark.main(["--thread-splits", "1x1", "2x1", "--sizes", "64",
+                           "--kinds", "line_art", "--requests", "6",
+                           "--output", str(output)]) == 0
+    report = json.loads(output.read_text(encoding="utf-8"))
+    splits = report["thread_splits"]
+    assert [(s["workers"], s["intra_op_threads"]) for s in splits] == [(1, 1), (2, 1)]
+    for split in splits:
+        latency = split["latency_ms"]
+        assert split["throughput_rps"] > 0
+        assert 0 < latency["p50"] <= latency["p95"] <= latency["p99"] <= latency["max"]
+    with pytest.raises(SystemExit):
+        benchmark.parse_args(["--thread-splits", "4"])
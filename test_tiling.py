@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+测试分块转换模式
+"""
+
+import cv2
+import numpy as np
+
+from converter import ImageToSVGConverter, convert_file
+from tiling import fill_holes_tiled, otsu_threshold_from_hist
+
+
+def _make_scan():
+    """生成包含跨分块接缝图形的测试图像（图形不接触图像边界）"""
+    image = np.full((300, 420), 255, np.uint8)
+    cv2.rectangle(image, (20, 120), (400, 140), 0, -1)
+    cv2.circle(image, (128, 64), 40, 0, -1)
+    cv2.circle(image, (300, 220), 50, 0, -1)
+    cv2.ellipse(image, (200, 250), (30, 15), 30, 0, 360, 0, -1)
+    cv2.rectangle(image, (70, 180), (90, 200), 0, -1)
+    return image
+
+
+def _paths(svg_content):
+    return sorted(svg_content.split('<path')[1:])
+
+
+def test_tiled_matches_full_frame():
+    """分块处理的结果与整幅处理一致"""
+    print("🧩 测试分块与整幅结果一致...")
+    image = _make_scan()
+    for method in ('otsu', 'fixed', 'adaptive'):
+        config = {'threshold_method': method, 'edge_detection': False}
+        full = ImageToSVGConverter(**config).convert_array(image)
+        tiled = ImageToSVGConverter(tile_size=64, **config).convert_array(image)
+        assert _paths(full) == _paths(tiled), method
+
+
+def _make_border_scan(corner=False):
+    """生成接触图像边界的图形：向左边界开口的C形和边界上的圆，corner为True时(0,0)为前景"""
+    image = np.full((300, 420), 255, np.uint8)
+    cv2.rectangle(image, (0, 100), (200, 110), 0, -1)
+    cv2.rectangle(image, (0, 100), (10, 220), 0, -1)
+    cv2.rectangle(image, (0, 210), (200, 220), 0, -1)
+    cv2.circle(image, (300, 299), 60, 0, -1)
+    cv2.circle(image, (419, 120), 40, 0, -1)
+    if corner:
+        cv2.circle(image, (0, 0), 30, 0, -1)
+    return image
+
+
+def test_tiled_fill_matches_full_frame():
+    """跨分块的孔洞填充与整幅漫水填充一致，包括接触边界的图形和(0,0)为前景的情况"""
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        height, width = rng.integers(20, 160, 2)
+        mask = ((rng.random((height, width)) < rng.uniform(0.2, 0.6)) * 255).astype(np.uint8)
+        expected = ImageToSVGConverter().fill_holes(mask)
+        for tile_size in (7, 16, 33):
+            assert np.array_equal(fill_holes_tiled(mask.copy(), tile_size), expected)
+
+    for corner in (False, True):
+        image = _make_border_scan(corner)
+        for method in ('otsu', 'fixed', 'adaptive'):
+            config = {'threshold_method': method, 'edge_detection': False}
+            full = ImageToSVGConverter(**config).convert_array(image)
+            tiled = ImageToSVGConverter(tile_size=64, **config).convert_array(image)
+            assert _paths(full) == _paths(tiled), (method, corner)
+
+
+def test_otsu_from_hist_matches_opencv():
+    """直方图Otsu阈值与OpenCV一致"""
+    image = _make_scan()
+    cv2.GaussianBlur(image, (9, 9), 0, dst=image)
+    expected, _ = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    hist = cv2.calcHist([image], [0], None, [256], [0, 256])
+    assert otsu_threshold_from_hist(hist) == int(expected)
+
+
+def test_convert_file_memory_map(tmp_path):
+    """内存映射方式读取文件的结果与普通读取一致"""
+    print("🗺 测试内存映射转换...")
+    path = tmp_path / "scan.png"
+    cv2.imwrite(str(path), _make_scan())
+    expected = convert_file(path, tile_size=64)
+    assert convert_file(path, memory_map=True, tile_size=64) == expected
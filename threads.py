@@ -0,0 +1,119 @@
+"""
+CPU线程治理
+
+请求级并行（工作池的工作者）和算子内并行（OpenCV内部的并行循环、BLAS/OpenMP线程池、
+多色分层和多帧追踪的线程池）默认都按CPU核数开线程，同时满载时线程数是核数的平方，
+导致争抢和不稳定的尾延迟。这里把可用核数拆分为 工作者数 × 每个工作者的算子线程数，
+并在每个工作者中显式设置 cv2.setNumThreads 和 BLAS/OpenMP 的线程数。
+
+BLAS/OpenMP 线程数只能通过环境变量在库加载前设置，因此在创建工作进程之前先写入环境变量，
+由工作进程继承；已加载的库在安装了可选依赖 threadpoolctl 时在运行时限制。
+OpenCV 和 threadpoolctl 在设置时才导入，只拆分核数（如命令行参数解析）时不加载。
+
+线程模式的工作池中多个工作者共用本进程的分层和多帧线程池，线程池大小为
+工作者数 × 算子线程数（见 pool_threads），避免所有工作者的分层追踪排在一个线程后面。
+"""
+
+import os
+import threading
+
+# 在库加载前生效的线程数环境变量
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+)
+
+_lock = threading.Lock()
+# 当前进程的算子线程数，None 表示未设置（按可用核数）
+_intra_op_threads = None
+# 共用本进程分层/多帧线程池的工作者数（线程模式的工作池），进程模式下每个工作进程为1
+_process_workers = 1
+
+
+def available_cores():
+    """当前进程可用的CPU核数（考虑CPU亲和性/cpuset限制）"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def split_cores(cores=None, workers=None, intra_op_threads=None):
+    """
+    把核数拆分为 (工作者数, 每个工作者的算子线程数)
+
+    两者都未指定时每个核一个工作者、每个工作者单线程；只指定一项时另一项按核数整除，
+    至少为1。两者都指定时原样使用（乘积可以超过核数，由调用方决定）。
+    """
+    cores = cores or available_cores()
+    if workers and intra_op_threads:
+        return int(workers), int(intra_op_threads)
+    if intra_op_threads:
+        return max(1, cores // int(intra_op_threads)), int(intra_op_threads)
+    if workers:
+        return int(workers), max(1, cores // int(workers))
+    return cores, 1
+
+
+def set_thread_env(threads):
+    """设置 BLAS/OpenMP 线程数环境变量（对之后加载这些库的进程生效，如新启动的工作进程）"""
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(int(threads))
+
+
+def apply_thread_limits(threads, workers=None):
+    """
+    设置当前进程的算子线程数
+
+    包括 OpenCV 内部并行、BLAS/OpenMP 线程池（环境变量和 threadpoolctl）以及
+    转换器的多色分层、多帧追踪线程池大小（见 pool_threads）。
+    workers 为共用本进程的工作者数（线程模式的工作池），None 表示保持不变。
+    """
+    global _intra_op_threads, _process_workers
+    import cv2
+
+    threads = max(1, int(threads))
+    with _lock:
+        set_thread_env(threads)
+        cv2.setNumThreads(threads)
+        threadpool_limits = _threadpool_limits()
+        if threadpool_limits is not None:
+            threadpool_limits(limits=threads)
+        _intra_op_threads = threads
+        if workers:
+            _process_workers = max(1, int(workers))
+    return threads
+
+
+def _threadpool_limits():
+    """可选依赖 threadpoolctl：运行时限制已加载的 BLAS/OpenMP 线程池"""
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return None
+    return threadpool_limits
+
+
+def intra_op_threads():
+    """当前进程的算子线程数，未设置时为可用核数"""
+    return _intra_op_threads or available_cores()
+
+
+def pool_threads():
+    """本进程分层/多帧线程池的线程数：算子线程数 × 共用本进程的工作者数"""
+    return intra_op_threads() * _process_workers
+
+
+def thread_settings():
+    """当前进程的线程设置（用于诊断和基准测试报告）"""
+    import cv2
+
+    return {
+        'intra_op_threads': intra_op_threads(),
+        'pool_threads': pool_threads(),
+        'opencv_threads': cv2.getNumThreads(),
+        'env': {name: os.environ.get(name) for name in THREAD_ENV_VARS},
+        'threadpoolctl': _threadpool_limits() is not None,
+    }
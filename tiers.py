@@ -0,0 +1,21 @@
+"""
+质量档位定义
+
+单独成模块，命令行参数解析等不需要图像处理库的路径可以只导入档位而不加载 OpenCV/NumPy。
+"""
+
+# 质量档位：处理分辨率和各阶段参数
+#   max_side: 处理前把图像缩小到长边不超过该值（None表示原分辨率），轮廓坐标再放大回原图坐标
+#   median_ksize: 降噪中值滤波核大小
+#   edge_detection: 是否允许边缘增强（最终还取决于 edge_detection 参数）
+#   close_ksize: 形态学闭操作核大小
+#   epsilon: 轮廓简化的 Douglas-Peucker 容差（相对轮廓周长）
+#   latency_target_ms: 2048x2048 输入除解码外的处理耗时目标（由 benchmark.py --check-latency 检查）
+QUALITY_TIERS = {
+    'preview': {'max_side': 512, 'median_ksize': 3, 'edge_detection': False,
+                'close_ksize': 3, 'epsilon': 0.02, 'latency_target_ms': 50},
+    'standard': {'max_side': None, 'median_ksize': 5, 'edge_detection': True,
+                 'close_ksize': 5, 'epsilon': 0.02, 'latency_target_ms': 300},
+    'high': {'max_side': None, 'median_ksize': 5, 'edge_detection': True,
+             'close_ksize': 5, 'epsilon': 0.005, 'latency_target_ms': 400},
+}
@@ -0,0 +1,261 @@
+"""
+分块转换
+
+超大图像按重叠的分块处理：每个分块带有按卷积核尺寸计算的边缘余量（halo），
+只把分块中心区域的二值结果写回输出掩码，因此中间临时数组的内存占用与分块大小成正比，
+而不是与整幅图像成正比。输出掩码可以使用磁盘内存映射。
+
+孔洞填充需要全局连通性：背景连通分量在每个分块内单独标记，接缝两侧相邻的背景标签用并查集合并，
+再逐块把不与(0,0)连通的背景写为前景，与整幅漫水填充的结果一致，内存只与分块数和接缝长度成正比。
+
+轮廓在每个分块内单独查找；接触分块接缝的轮廓会按包围盒合并成组，
+再在组的区域内重新查找，从而得到跨接缝的完整轮廓。
+限制：重新查找时复制整组的包围盒区域，跨越多个分块的大图形（例如贯穿全图的边框或线条）
+会使这一步的临时内存接近整幅掩码的大小，分块只限制了二值化和孔洞填充阶段的峰值内存。
+"""
+
+import bisect
+import tempfile
+
+import cv2
+import numpy as np
+
+# 各阶段卷积核的影响半径
+MEDIAN_RADIUS = 2        # medianBlur 5x5
+CANNY_RADIUS = 1         # Canny 内部 3x3 Sobel
+ADAPTIVE_RADIUS = 5      # adaptiveThreshold blockSize=11
+CLOSE_RADIUS = 4         # MORPH_CLOSE 5x5 = 膨胀 + 腐蚀
+OPEN_RADIUS = 2          # MORPH_OPEN 3x3 = 腐蚀 + 膨胀
+
+# 分块边缘余量：各阶段半径之和，向上取整到8的倍数
+HALO = -(-(MEDIAN_RADIUS + CANNY_RADIUS + ADAPTIVE_RADIUS + CLOSE_RADIUS + OPEN_RADIUS) // 8) * 8
+
+
+def iter_tiles(height, width, tile_size):
+    """按行优先顺序生成分块中心区域 (y0, y1, x0, x1)"""
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def _with_halo(y0, y1, x0, x1, height, width, halo):
+    return max(y0 - halo, 0), min(y1 + halo, height), max(x0 - halo, 0), min(x1 + halo, width)
+
+
+def allocate_mask(shape, memmap=False):
+    """分配输出掩码，memmap为True时使用临时文件做内存映射"""
+    if memmap:
+        return np.memmap(tempfile.TemporaryFile(), dtype=np.uint8, mode='w+', shape=shape)
+    return np.empty(shape, np.uint8)
+
+
+def otsu_threshold_from_hist(hist):
+    """根据256级直方图计算Otsu阈值（与OpenCV的最大类间方差准则一致）"""
+    hist = np.asarray(hist, np.float64).ravel()
+    total = hist.sum()
+    if total == 0:
+        return 0
+    p = hist / total
+    omega = np.cumsum(p)
+    mu = np.cumsum(p * np.arange(256))
+    mu_t = mu[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma = (mu_t * omega - mu) ** 2 / (omega * (1.0 - omega))
+    sigma[~np.isfinite(sigma)] = 0
+    return int(np.argmax(sigma))
+
+
+def _preprocess_tile(converter, gray, window):
+    wy0, wy1, wx0, wx1 = window
+    return converter.preprocess_image(np.ascontiguousarray(gray[wy0:wy1, wx0:wx1]))
+
+
+def _background_labels(mask, y0, y1, x0, x1):
+    """分块内背景像素的4连通分量标签（0为前景）及分量数"""
+    background = (mask[y0:y1, x0:x1] == 0).view(np.uint8)
+    count, labels = cv2.connectedComponents(background, connectivity=4, ltype=cv2.CV_32S)
+    return labels, count
+
+
+def fill_holes_tiled(mask, tile_size):
+    """
+    分块就地填充孔洞，结果与从(0,0)整幅漫水填充（4连通）后取反合并一致
+
+    第一遍标记各分块的背景连通分量并通过接缝合并；第二遍把不与(0,0)所在分量连通的背景置为255。
+    (0,0)为前景时整幅漫水填充不会到达任何背景，整幅掩码都被填充。
+    """
+    height, width = mask.shape[:2]
+    if mask[0, 0]:
+        mask[...] = 255
+        return mask
+
+    parent = [0]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(a, b):
+        # a、b 为接缝两侧相邻像素的全局标签数组，两侧都是背景时合并
+        both = (a > 0) & (b > 0)
+        for i, j in np.unique(np.column_stack([a[both], b[both]]), axis=0):
+            ri, rj = find(int(i)), find(int(j))
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    offsets = {}
+    bottoms = {}
+    right = None
+    for y0, y1, x0, x1 in iter_tiles(height, width, tile_size):
+        labels, count = _background_labels(mask, y0, y1, x0, x1)
+        offset = len(parent) - 1
+        offsets[y0, x0] = offset
+        parent.extend(range(offset + 1, offset + count))
+        labels = np.where(labels > 0, labels + offset, 0)
+        if y0 > 0:
+            union(bottoms.pop((y0 - tile_size, x0)), labels[0])
+        if x0 > 0:
+            union(right, labels[:, 0])
+        bottoms[y0, x0] = labels[-1]
+        right = labels[:, -1]
+
+    seed = find(1)
+    for y0, y1, x0, x1 in iter_tiles(height, width, tile_size):
+        labels, count = _background_labels(mask, y0, y1, x0, x1)
+        offset = offsets[y0, x0]
+        reached = np.array([False] + [find(offset + i) == seed for i in range(1, count)])
+        mask[y0:y1, x0:x1] = np.where(reached[labels], 0, 255).astype(np.uint8)
+    return mask
+
+
+def binarize_tiled(converter, gray, tile_size, memmap=False, fill=True):
+    """
+    分块执行预处理、阈值和形态学操作，返回整幅二值掩码
+
+    Otsu是全局阈值，需要先统计所有分块预处理结果的直方图再做第二遍阈值处理。
+    孔洞填充依赖全局连通性，在所有分块写入后由 fill_holes_tiled 跨接缝执行。
+    """
+    height, width = gray.shape[:2]
+    mask = allocate_mask((height, width), memmap=memmap)
+
+    fixed_threshold = None
+    if converter.plan.threshold_method == 'otsu':
+        hist = np.zeros((256, 1), np.float32)
+        for y0, y1, x0, x1 in iter_tiles(height, width, tile_size):
+            window = _with_halo(y0, y1, x0, x1, height, width, HALO)
+            pre = _preprocess_tile(converter, gray, window)
+            core = pre[y0 - window[0]:y1 - window[0], x0 - window[2]:x1 - window[2]]
+            hist += cv2.calcHist([np.ascontiguousarray(core)], [0], None, [256], [0, 256])
+        fixed_threshold = otsu_threshold_from_hist(hist)
+
+    for y0, y1, x0, x1 in iter_tiles(height, width, tile_size):
+        window = _with_halo(y0, y1, x0, x1, height, width, HALO)
+        pre = _preprocess_tile(converter, gray, window)
+        if fixed_threshold is not None:
+            _, binary = cv2.threshold(pre, fixed_threshold, 255, cv2.THRESH_BINARY_INV)
+        else:
+            binary = converter.apply_threshold(pre)
+        improved = converter.improve_morphology(binary, fill=False)
+        mask[y0:y1, x0:x1] = improved[y0 - window[0]:y1 - window[0], x0 - window[2]:x1 - window[2]]
+
+    if fill:
+        fill_holes_tiled(mask, tile_size)
+    return mask
+
+
+def _touches(lo, size, seams):
+    """区间 [lo, lo+size-1] 是否接触某条接缝（接缝两侧的像素列/行）"""
+    i = bisect.bisect_left(seams, lo)
+    return i < len(seams) and seams[i] <= lo + size
+
+
+def _find_external(image, offset):
+    result = cv2.findContours(image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+    return result[1] if len(result) == 3 else result[0]
+
+
+def _group_boxes(boxes, gap=2):
+    """把相交或相距不超过gap的包围盒合并成组，直到各组的外包框互不接触"""
+    boxes = np.asarray(boxes, np.int64).reshape(-1, 4)
+    # 转换为 [x0, y0, x1, y1)
+    rects = np.column_stack([boxes[:, 0], boxes[:, 1],
+                             boxes[:, 0] + boxes[:, 2], boxes[:, 1] + boxes[:, 3]])
+    while True:
+        n = len(rects)
+        parent = np.arange(n)
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i in range(n):
+            near = np.nonzero(
+                (rects[:, 0] <= rects[i, 2] + gap) & (rects[:, 2] + gap >= rects[i, 0]) &
+                (rects[:, 1] <= rects[i, 3] + gap) & (rects[:, 3] + gap >= rects[i, 1])
+            )[0]
+            root = find(i)
+            for j in near:
+                parent[find(j)] = root
+
+        roots = np.array([find(i) for i in range(n)])
+        labels = np.unique(roots)
+        if len(labels) == n:
+            return rects
+        merged = np.empty((len(labels), 4), np.int64)
+        for k, label in enumerate(labels):
+            members = rects[roots == label]
+            merged[k] = (members[:, 0].min(), members[:, 1].min(),
+                         members[:, 2].max(), members[:, 3].max())
+        rects = merged
+
+
+def find_contours_tiled(mask, tile_size):
+    """分块查找外轮廓，并拼接跨越分块接缝的轮廓"""
+    height, width = mask.shape[:2]
+    # 接缝两侧的像素：左侧分块的最后一列为 b-1，右侧分块的第一列为 b
+    seams_x = list(range(tile_size, width, tile_size))
+    seams_y = list(range(tile_size, height, tile_size))
+
+    def on_seam(x, y, w, h):
+        return _touches(x, w, seams_x) or _touches(y, h, seams_y)
+
+    interior = []
+    seam_boxes = []
+    for y0, y1, x0, x1 in iter_tiles(height, width, tile_size):
+        tile = np.ascontiguousarray(mask[y0:y1, x0:x1])
+        for contour in _find_external(tile, (x0, y0)):
+            box = cv2.boundingRect(contour)
+            if on_seam(*box):
+                seam_boxes.append(box)
+            else:
+                interior.append((contour, box))
+
+    stitched = []
+    if seam_boxes:
+        for gx0, gy0, gx1, gy1 in _group_boxes(seam_boxes):
+            # 多取一圈像素，保证组内轮廓不会被裁剪
+            cx0, cy0 = max(gx0 - 1, 0), max(gy0 - 1, 0)
+            cx1, cy1 = min(gx1 + 1, width), min(gy1 + 1, height)
+            region = np.ascontiguousarray(mask[cy0:cy1, cx0:cx1])
+            for contour in _find_external(region, (int(cx0), int(cy0))):
+                box = cv2.boundingRect(contour)
+                if on_seam(*box):
+                    stitched.append((contour, box))
+
+    # 位于跨接缝轮廓内部（孔洞中）的分块内轮廓在整图外轮廓查找中不会出现，需要去掉
+    contours = [contour for contour, _ in stitched]
+    for contour, (x, y, w, h) in interior:
+        enclosed = False
+        for outer, (ox, oy, ow, oh) in stitched:
+            if ox <= x and oy <= y and x + w <= ox + ow and y + h <= oy + oh:
+                px, py = contour[0][0]
+                if cv2.pointPolygonTest(outer, (float(px), float(py)), False) > 0:
+                    enclosed = True
+                    break
+        if not enclosed:
+            contours.append(contour)
+    return contours